@@ -1,9 +1,17 @@
 import json
+import os
 import uuid
+from http import HTTPStatus
+from typing import Any
 
-from flask import Blueprint, Response, current_app, request
+from flask import Blueprint, Response, current_app, make_response, request
 
 from api.judge.util import execute_task_with_specific_tracker_id
+from api.problem.util import check_problem_reference
+from storage.submission_queue import SubmissionQueue
+from utils.sandbox.enum import Comparator, StatusType
+from utils.sandbox.inititalize.util import prefetch_test_case
+from utils.sandbox.status.util import StatusNotifier
 
 judge_api_bp = Blueprint("judge", __name__, url_prefix="/api/judge")
 
@@ -18,16 +26,24 @@ def judge_route():
     option = data["options"]
     status = None
     tracker_id = str(uuid.uuid4())
+    if (error_response := _check_comparator(data)) is not None:
+        return error_response
+    if "problem" in data and (error_response := _check_problem_reference(data["problem"])) is not None:
+        return error_response
 
     storage_path: str = current_app.config["STORAGE_PATH"]
     open(f"{storage_path}/submission/{tracker_id}.json", "w").write(
         json.dumps(data)
     )
+    if option["threading"]:
+        prefetch_test_case(data.get("test_case", []))
     del data
 
     if option["threading"]:
-        submission_list: list[str] = current_app.config["submission"]
-        submission_list.append(tracker_id)
+        submission_queue: SubmissionQueue = current_app.config["submission"]
+        status_notifier: StatusNotifier = current_app.config["status_notifier"]
+        status_notifier.publish(tracker_id, StatusType.PENDING)
+        submission_queue.put(tracker_id)
     else:
         result = execute_task_with_specific_tracker_id(tracker_id)
 
@@ -37,3 +53,74 @@ def judge_route():
         response["data"] = result
 
     return Response(json.dumps(response), mimetype="application/json")
+
+
+@judge_api_bp.route("/batch", methods=["POST"])
+def judge_batch_route():
+    """
+    批次評測的 route function，共用的題目資料（solution、checker、測資與選項）只會傳送與儲存一次，再加上多份使用者的程式碼。
+    每份程式碼都會註冊成一個 tracker_id，依照 user_codes 的順序回傳。
+    排入佇列時第一份程式碼會先單獨評測，完成後才會排入其他的程式碼，讓之後的任務都可以直接使用快取的編譯結果與答案。
+    """
+    data = json.loads(request.data.decode("utf-8"))
+    execution_type = data["execute_type"]
+    option = data["options"]
+    user_codes: list[dict[str, Any]] = data.pop("user_codes")
+    if (error_response := _check_comparator(data)) is not None:
+        return error_response
+    if "problem" in data and (error_response := _check_problem_reference(data["problem"])) is not None:
+        return error_response
+    batch_id = str(uuid.uuid4())
+    tracker_ids: list[str] = [str(uuid.uuid4()) for _ in range(len(user_codes))]
+
+    storage_path: str = current_app.config["STORAGE_PATH"]
+    os.makedirs(f"{storage_path}/submission/batch", exist_ok=True)
+    open(f"{storage_path}/submission/batch/{batch_id}.json", "w").write(
+        json.dumps(data)
+    )
+    for tracker_id, user_code in zip(tracker_ids, user_codes):
+        open(f"{storage_path}/submission/{tracker_id}.json", "w").write(
+            json.dumps({"batch_id": batch_id, "user_code": user_code})
+        )
+
+    if option["threading"]:
+        prefetch_test_case(data.get("test_case", []))
+    del data, user_codes
+
+    if option["threading"] and len(tracker_ids) > 0:
+        submission_queue: SubmissionQueue = current_app.config["submission"]
+        status_notifier: StatusNotifier = current_app.config["status_notifier"]
+        for tracker_id in tracker_ids:
+            status_notifier.publish(tracker_id, StatusType.PENDING)
+        submission_queue.put_batch(tracker_ids)
+    elif not option["threading"]:
+        results = [execute_task_with_specific_tracker_id(tracker_id) for tracker_id in tracker_ids]
+
+    response = {"status": "OK", "type": execution_type, "batch_id": batch_id, "tracker_ids": tracker_ids}
+
+    if not option["threading"]:
+        response["data"] = results
+
+    return Response(json.dumps(response), mimetype="application/json")
+
+
+def _check_comparator(data: dict[str, Any]) -> Response | None:
+    """
+    提交時就拒絕不認識的比對方式，以及使用 checker 比對卻沒有提供 checker_code 的提交（引用題目時由題目包提供 checker）。
+    """
+    comparator: Any = data["options"].get("comparator", Comparator.CHECKER.value)
+    if comparator not in [item.value for item in Comparator]:
+        return make_response({"status": "Invalid comparator."}, HTTPStatus.BAD_REQUEST)
+    if comparator == Comparator.CHECKER.value and "problem" not in data and not data.get("checker_code"):
+        return make_response({"status": "The checker comparator requires checker_code."}, HTTPStatus.BAD_REQUEST)
+    return None
+
+
+def _check_problem_reference(problem: dict[str, Any]) -> Response | None:
+    try:
+        check_problem_reference(problem)
+    except ValueError:
+        return make_response({"status": "Invalid problem reference."}, HTTPStatus.BAD_REQUEST)
+    except FileNotFoundError:
+        return make_response({"status": "Problem not found."}, HTTPStatus.NOT_FOUND)
+    return None
@@ -1,126 +1,217 @@
 import json
-import time
 import threading
+from functools import lru_cache
 from typing import Any
-from threading import Semaphore
 
-import requests
 from flask import current_app
-
-from utils.isolate.util import cleanup_sandbox
-from utils.sandbox.util import CodePackage, Task, TestCase, Option
+from loguru import logger
+
+from api.problem.util import merge_problem_package
+from setting.util import Setting
+from storage.submission_queue import SubmissionQueue
+from utils.cache.testcase import TestcaseCache
+from utils.metrics.util import phase_duration_seconds, submissions
+from utils.sandbox.box.util import BoxPool
+from utils.sandbox.enum import StatusType
+from utils.sandbox.util import CodePackage, Task, TestCase, Option, record_phase
 from utils.sandbox.finish.util import finish_task
 from utils.sandbox.inititalize.util import initialize_task, initialize_test_case_to_sandbox
 from utils.sandbox.running.util import run_task
-from storage.util import TunnelCode, write_file
+from utils.sandbox.status.util import StatusNotifier
+from utils.webhook.util import WebhookDispatcher
+from storage.result_store import ResultStore
     
 
-def execute_queueing_task_when_exist_empty_box():
+def execute_queueing_task():
     """
-    這是一個執行序，會去找當前有沒有空的 box 可以做評測
-    如果有的話，就會把提交丟到空的 box，沒有的話就會跳過，每一秒確認一次
+    這是一個常駐的評測執行序，數量與 sandbox_number 相同。會阻塞等待佇列中的提交，取得後再取得一個已經初始化好的 box 評測，
+    因此不論佇列多長，執行序數量與記憶體用量都是固定的。
+    開始與完成評測時都會記錄在持久化的佇列中，重新啟動時才知道哪些任務被中斷。
     """
+    submission_queue: SubmissionQueue = current_app.config["submission"]
+    box_pool: BoxPool = current_app.config["box_pool"]
     while True:
-        submission_list: list[str] = current_app.config["submission"]
-        available_box: set[int] = current_app.config["avaliable_box"]
-        if len(submission_list) > 0 and len(available_box) > 0:
-            tracker_id = submission_list.pop(0)
-            thread = FlaskThread(
-                target=execute_task_with_specific_tracker_id,
-                kwargs={"tracker_id": tracker_id},
-            )
-            thread.start()
-        time.sleep(0.05)
-
-
-def execute_task_with_specific_tracker_id(tracker_id):
+        tracker_id = submission_queue.get()
+        box_id = box_pool.acquire()
+        try:
+            submission_queue.mark_started(tracker_id, box_id)
+            execute_task_with_specific_tracker_id(tracker_id=tracker_id, box_id=box_id)
+        except Exception:
+            logger.exception(f"Failed to execute the task {tracker_id} on box {box_id}.")
+        finally:
+            submission_queue.mark_done(tracker_id)
+
+
+def recover_submission_queue() -> None:
     """
-    這是主要處理測資評測的函數，首先會從檔案堆裡找出提交的 json file 與測資的 json file。
-    接著會進行初始化、編譯、執行、評測、完成這五個動作，主要設計成盡量不要使用記憶體的空間，避免大量提交導致記憶體耗盡。
+    app 建立時恢復上次關閉前的佇列，執行到一半被中斷的任務在嘗試次數未達 queue.max_attempts 前會重新排入佇列的最前面，
+    否則直接以錯誤結束並通知 webhook。還在等待與重新排入的任務會發布 Pending，等待結果的請求才找得到這些任務。
     """
-    submission_data: dict[str, Any] = _fetch_json_object_from_storage(tracker_id)
-    test_case: list[dict[str, Any]] = submission_data["test_case"]
-    task = Task(
-        checker_code=CodePackage(**submission_data["checker_code"]),
-        solution_code=CodePackage(**submission_data["solution_code"]),
-        user_code=CodePackage(**submission_data["user_code"]),
-        execute_type=submission_data["execute_type"],
-        test_case=[TestCase(**test_case[i]) for i in range(len(test_case))],
-        test_case_size=0,
-        options=Option(**submission_data["options"])
-    )
-    test_case: list[TestCase] = task.test_case
-
-    available_box: set[int] = current_app.config["avaliable_box"]
-    semaphores: Semaphore = current_app.config["semaphores"]
-
-    # Bind thread with acquire
-    semaphores.acquire()
-    box_id = available_box.pop()
-
-    # Send debug serve webook url
-    _send_webhook_with_debug_webhook_initialize_url(task, tracker_id)
+    setting: Setting = current_app.config["setting"]
+    submission_queue: SubmissionQueue = current_app.config["submission"]
+    waiting, interrupted = submission_queue.recover()
+    for tracker_id in waiting:
+        _notify_status(tracker_id, StatusType.PENDING)
+    # requeue 會放到佇列的最前面，反向處理才能維持原本開始執行的順序。
+    for tracker_id, box_id, attempts in reversed(interrupted):
+        if attempts < setting.queue.max_attempts:
+            logger.warning(f"Requeue the task {tracker_id} interrupted on box {box_id}.")
+            _notify_status(tracker_id, StatusType.PENDING)
+            submission_queue.requeue(tracker_id)
+        else:
+            logger.warning(f"Fail the task {tracker_id} interrupted on box {box_id} after {attempts} attempts.")
+            _fail_task(tracker_id, "The task was interrupted.")
+            submission_queue.mark_done(tracker_id)
+    if submission_queue.qsize() > 0:
+        logger.info(f"Recover {submission_queue.qsize()} queued tasks.")
 
-    # Execute the task
-    initialize_task(task, box_id)
-    initialize_test_case_to_sandbox(task, test_case, box_id)
-    run_task(task, test_case, box_id)
-    finish_task(task)
 
-    # Store result to the storage
-    _dump_task_result_to_storage(task, tracker_id)
+def execute_task_with_specific_tracker_id(tracker_id, box_id: int | None = None):
+    """
+    這是主要處理測資評測的函數，首先會從檔案堆裡找出提交的 json file 與測資的 json file。
+    接著會進行初始化、編譯、執行、評測、完成這五個動作，主要設計成盡量不要使用記憶體的空間，避免大量提交導致記憶體耗盡。
+    """
+    box_pool: BoxPool = current_app.config["box_pool"]
+    testcase_cache: TestcaseCache = current_app.config["testcase_cache"]
+
+    # Bind thread with a box, the worker has already acquired a box for queued submission.
+    if box_id is None:
+        box_id = box_pool.acquire()
+
+    try:
+        with phase_duration_seconds.time(phase="storage", code_type=""):
+            submission_data: dict[str, Any] = _fetch_json_object_from_storage(tracker_id)
+        test_case: list[dict[str, Any]] = submission_data["test_case"]
+        task = Task(
+            checker_code=CodePackage(**submission_data["checker_code"]) if submission_data.get("checker_code") else None,
+            solution_code=CodePackage(**submission_data["solution_code"]),
+            user_code=CodePackage(**submission_data["user_code"]),
+            execute_type=submission_data["execute_type"],
+            test_case=[TestCase(**test_case[i]) for i in range(len(test_case))],
+            test_case_size=0,
+            options=Option(**submission_data["options"])
+        )
+        test_case: list[TestCase] = task.test_case
+
+        # Send debug serve webook url
+        _send_webhook_with_debug_webhook_initialize_url(task, tracker_id)
+
+        # Execute the task
+        _notify_status(tracker_id, StatusType.INITIAL)
+        with phase_duration_seconds.time(phase="init", code_type=""):
+            with record_phase(task, "initialize"):
+                initialize_task(task, box_id)
+            with record_phase(task, "prepare_testcase"):
+                initialize_test_case_to_sandbox(task, test_case, box_id)
+        _notify_status(tracker_id, StatusType.RUNNING)
+        with record_phase(task, "run"):
+            run_task(task, test_case, box_id)
+        finish_task(task)
+
+        # Store result to the storage, the result should be stored before the waiting clients are notified.
+        with phase_duration_seconds.time(phase="storage", code_type=""):
+            _dump_task_result_to_storage(task, tracker_id)
+        submissions.inc(execute_type=task.execute_type)
+        _notify_status(tracker_id, StatusType.FINISH)
+    except Exception as error:
+        # 評測失敗時也要儲存結果並發布 Finish，等待結果的請求才不會一直等到逾時。
+        _fail_task(tracker_id, f"The task failed: {error!r}")
+        raise
+    finally:
+        # Free the box, the box pool will cleanup the box before it can be acquired again.
+        testcase_cache.release(box_id)
+        box_pool.release(box_id)
+
+    # The webhook is delivered by the webhook dispatcher after the box is released.
     _send_webhook_with_webhook_url(task, tracker_id)
 
-    # Free thread with release function.
-    available_box.add(box_id)
-    cleanup_sandbox(box_id)
-    semaphores.release()
     return task.result
 
 
+def _notify_status(tracker_id: str, status: StatusType) -> None:
+    status_notifier: StatusNotifier = current_app.config["status_notifier"]
+    status_notifier.publish(tracker_id, status)
+
+
 def _dump_task_result_to_storage(task: Task, tracker_id: int):
     result: dict[str, Any] = {
         "status": task.status.value,
         "flow": task.flow,
         "result": task.result
     }
-    write_file(tracker_id + ".result", json.dumps(result), TunnelCode.RESULT)
+    result_store: ResultStore = current_app.config["result_store"]
+    result_store.put(tracker_id, task.status.value, json.dumps(result).encode("utf-8"))
+
+
+def _fail_task(tracker_id: str, message: str) -> None:
+    """
+    以錯誤結束沒有完成的任務（執行時發生例外或是被中斷），儲存錯誤的結果、發布 Finish 並通知 webhook。
+    """
+    result: dict[str, Any] = {"error": message}
+    result_store: ResultStore = current_app.config["result_store"]
+    result_store.put(
+        tracker_id,
+        StatusType.FINISH.value,
+        json.dumps({"status": StatusType.FINISH.value, "flow": {}, "result": result}).encode("utf-8")
+    )
+    _notify_status(tracker_id, StatusType.FINISH)
+    try:
+        webhook_url: str | None = _fetch_json_object_from_storage(tracker_id).get("options", {}).get("webhook_url")
+    except Exception:
+        logger.exception(f"Failed to read the submission of the failed task {tracker_id}.")
+        return
+    if webhook_url is not None:
+        webhook_dispatcher: WebhookDispatcher = current_app.config["webhook_dispatcher"]
+        webhook_dispatcher.enqueue(
+            webhook_url,
+            {"status": "OK", "data": result, "tracker_id": tracker_id},
+            "webhook_url",
+            tracker_id
+        )
 
 
 def _fetch_json_object_from_storage(tracker_id: int) -> dict[str, Any]:
+    """
+    批次提交的任務只儲存使用者的程式碼與 batch_id，共用的題目資料從批次的檔案取得；引用已註冊題目的提交則從題目包取得。
+    """
     raw_json_object: str
     storage_path: str = current_app.config["STORAGE_PATH"]
     with open(f"{storage_path}/submission/{tracker_id}.json") as f:
         raw_json_object = f.read()
-    return json.loads(raw_json_object)
+    submission_data: dict[str, Any] = json.loads(raw_json_object)
+    if "batch_id" in submission_data:
+        submission_data = _fetch_batch_json_object_from_storage(storage_path, submission_data["batch_id"]) | submission_data
+    if "problem" in submission_data:
+        submission_data = merge_problem_package(submission_data)
+    return submission_data
+
 
+@lru_cache(maxsize=16)
+def _fetch_batch_json_object_from_storage(storage_path: str, batch_id: str) -> dict[str, Any]:
+    with open(f"{storage_path}/submission/batch/{batch_id}.json") as f:
+        return json.loads(f.read())
 
-def _send_webhook_with_webhook_url(task: Task, tracker_id: int):
+
+def _send_webhook_with_webhook_url(task: Task, tracker_id: str):
     if task.options.webhook_url is not None:
-        resp = requests.post(
+        webhook_dispatcher: WebhookDispatcher = current_app.config["webhook_dispatcher"]
+        webhook_dispatcher.enqueue(
             task.options.webhook_url,
-            data=json.dumps({"status": "OK", "data": task.result, "tracker_id": tracker_id}),
-            headers={"content-type": "application/json"},
-            timeout=10
+            {"status": "OK", "data": task.result, "tracker_id": tracker_id},
+            "webhook_url",
+            tracker_id
         )
-        if resp.status_code != 200:
-            print(f"webhook_url {task.options.webhook_url} has error that occur result {tracker_id} has error.")
-        else:
-            print(f"webhook_url {task.options.webhook_url} send successfully.")
 
 
-def _send_webhook_with_debug_webhook_initialize_url(task: Task, tracker_id: int):
+def _send_webhook_with_debug_webhook_initialize_url(task: Task, tracker_id: str):
     if task.options.debug_webhook_initialize_url is not None:
-        resp = requests.post(
+        webhook_dispatcher: WebhookDispatcher = current_app.config["webhook_dispatcher"]
+        webhook_dispatcher.enqueue(
             task.options.debug_webhook_initialize_url,
-            data=json.dumps({"status": "OK", "tracker_id": tracker_id}),
-            headers={"content-type": "application/json"},
-            timeout=10
+            {"status": "OK", "tracker_id": tracker_id},
+            "debug serve webhook_url",
+            tracker_id
         )
-        if resp.status_code != 200:
-            print(f"debug serve webhook_url {task.options.debug_webhook_initialize_url} has error that occur result {tracker_id} has error.")
-        else:
-            print(f"debug serve webhook_url {task.options.debug_webhook_initialize_url} send successfully.")
 
 
 class FlaskThread(threading.Thread):
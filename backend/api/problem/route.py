@@ -0,0 +1,46 @@
+import json
+from http import HTTPStatus
+
+from flask import Blueprint, Response, make_response, request
+
+from api.problem.util import get_problem_status, prepare_problem_in_background, register_problem, resolve_problem_version
+
+problem_api_bp = Blueprint("problem", __name__, url_prefix="/api/problem")
+
+
+@problem_api_bp.route("", methods=["POST"])
+def register_problem_route():
+    """
+    註冊題目包的 route function，題目包包含 solution_code、checker_code、test_case 與 options（時間、記憶體限制與比對方式）。
+    新的版本會在背景預先編譯並計算每筆測資的答案，可以用 GET /api/problem/<problem_id>/<version> 查詢準備的狀態。
+    """
+    data = json.loads(request.data.decode("utf-8"))
+    try:
+        problem_id, version, should_prepare = register_problem(data)
+    except ValueError:
+        return make_response({"status": "Invalid problem id."}, HTTPStatus.BAD_REQUEST)
+    if should_prepare:
+        prepare_problem_in_background(problem_id, version)
+
+    response = {"status": "OK", "problem_id": problem_id, "version": version}
+    return Response(json.dumps(response), mimetype="application/json")
+
+
+@problem_api_bp.route("/<problem_id>/", defaults={"version": None})
+@problem_api_bp.route("/<problem_id>/<version>")
+def problem_status_route(problem_id, version):
+    """
+    查詢題目包的準備狀態，沒有指定版本時回傳最後註冊的版本。
+    """
+    try:
+        version = resolve_problem_version(problem_id, version)
+    except ValueError:
+        return make_response({}, HTTPStatus.BAD_REQUEST)
+    except FileNotFoundError:
+        return make_response({}, HTTPStatus.NOT_FOUND)
+    status = get_problem_status(problem_id, version)
+    if status is None:
+        return make_response({}, HTTPStatus.NOT_FOUND)
+
+    response = {"problem_id": problem_id, "version": version} | status
+    return Response(json.dumps(response), mimetype="application/json")
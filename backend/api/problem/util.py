@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from flask import Flask, current_app
+from loguru import logger
+
+from utils.cache.answer import fetch_answer, make_solution_digest, store_answer
+from utils.cache.testcase import TestcaseCache
+from utils.sandbox.box.util import BoxPool
+from utils.sandbox.enum import CodeType, Comparator, ExecuteType, ProblemStatus
+from utils.sandbox.function.util import compile_code, execute_code
+from utils.sandbox.inititalize.util import initialize_task, initialize_test_case_to_sandbox
+from utils.sandbox.util import CodePackage, Option, Task, TestCase
+
+PACKAGE_FIELDS: tuple[str, ...] = ("solution_code", "checker_code", "test_case", "options")
+PROBLEM_ID_PATTERN: re.Pattern[str] = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{0,63}")
+VERSION_PATTERN: re.Pattern[str] = re.compile(r"[0-9a-f]{16}")
+
+
+def register_problem(data: dict[str, Any]) -> tuple[str, str, bool]:
+    """
+    註冊題目包（solution、checker、測資與限制），版本為題目包內容的雜湊值，相同內容重複註冊會得到相同的版本。
+    回傳 problem_id、version 與是否需要準備，新的版本或上次準備失敗的版本需要再呼叫 prepare_problem 預先編譯與計算答案。
+    """
+    problem_id: str = data.get("problem_id")
+    validate_problem_id(problem_id)
+    package: dict[str, Any] = {field: data.get(field) for field in PACKAGE_FIELDS}
+    version: str = hashlib.sha256(json.dumps(package, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    problem_directory: str = _get_problem_directory(problem_id)
+    os.makedirs(problem_directory, exist_ok=True)
+    status: dict[str, Any] | None = get_problem_status(problem_id, version)
+    should_prepare: bool = status is None or status["status"] == ProblemStatus.FAILED.value
+    if should_prepare:
+        _write_json_atomically(f"{problem_directory}/{version}.json", package)
+        _write_status(problem_id, version, {"status": ProblemStatus.PREPARING.value})
+    with open(f"{problem_directory}/latest", "w") as file:
+        file.write(version)
+    return problem_id, version, should_prepare
+
+
+def prepare_problem_in_background(problem_id: str, version: str) -> None:
+    app: Flask = current_app._get_current_object()  # type: ignore[attr-defined]
+
+    def prepare() -> None:
+        with app.app_context():
+            try:
+                prepare_problem(problem_id, version)
+            except Exception as error:
+                logger.exception(f"Failed to prepare the problem {problem_id} version {version}.")
+                _write_status(problem_id, version, {"status": ProblemStatus.FAILED.value, "message": repr(error)})
+
+    threading.Thread(target=prepare, daemon=True).start()
+
+
+def resume_problem_preparation() -> None:
+    """
+    app 建立時重新準備上次關閉前還在準備中的版本，否則這些版本會一直停在 Preparing，重新註冊也不會再準備。
+    """
+    for status_path in Path(current_app.config["STORAGE_PATH"]).glob("problem/*/*.status.json"):
+        try:
+            with open(status_path) as file:
+                status: dict[str, Any] = json.loads(file.read())
+        except (OSError, ValueError):
+            continue
+        if status.get("status") != ProblemStatus.PREPARING.value:
+            continue
+        problem_id: str = status_path.parent.name
+        version: str = status_path.name[:-len(".status.json")]
+        logger.warning(f"Resume the preparation of the problem {problem_id} version {version}.")
+        prepare_problem_in_background(problem_id, version)
+
+
+def prepare_problem(problem_id: str, version: str) -> dict[str, Any]:
+    """
+    在一個 box 中編譯 solution 與 checker 並執行 solution 產生每筆測資的答案，結果會存進編譯與答案的快取，
+    之後引用這個題目的提交只需要編譯與執行使用者的程式碼。
+    """
+    box_pool: BoxPool = current_app.config["box_pool"]
+    testcase_cache: TestcaseCache = current_app.config["testcase_cache"]
+    package: dict[str, Any] = fetch_problem_package(problem_id, version)
+    task = Task(
+        checker_code=CodePackage(**package["checker_code"]) if package["checker_code"] else None,
+        solution_code=CodePackage(**package["solution_code"]),
+        user_code=None,
+        execute_type=ExecuteType.JUDGE.value,
+        test_case=[TestCase(**test_case) for test_case in package["test_case"]],
+        options=Option(**({"threading": False} | package["options"]))
+    )
+
+    box_id: int = box_pool.acquire()
+    try:
+        initialize_task(task, box_id)
+        initialize_test_case_to_sandbox(task, task.test_case, box_id)
+        status: dict[str, Any] = _compile_and_compute_answers(task, box_id)
+    finally:
+        testcase_cache.release(box_id)
+        box_pool.release(box_id)
+
+    _write_status(problem_id, version, status)
+    logger.info(f"Prepare the problem {problem_id} version {version}: {status['status']}.")
+    return status
+
+
+def get_problem_status(problem_id: str, version: str) -> dict[str, Any] | None:
+    status_path: str = f"{_get_problem_directory(problem_id)}/{version}.status.json"
+    if not os.path.exists(status_path):
+        return None
+    with open(status_path) as file:
+        return json.loads(file.read())
+
+
+def resolve_problem_version(problem_id: str, version: str | None) -> str:
+    """
+    沒有指定版本時使用最後註冊的版本，problem_id 或 version 的格式不正確時會產生 ValueError。
+    """
+    if version is None:
+        with open(f"{_get_problem_directory(problem_id)}/latest") as file:
+            version = file.read().strip()
+    validate_problem_version(version)
+    return version
+
+
+def check_problem_reference(problem: dict[str, Any]) -> str:
+    """
+    檢查提交引用的題目（{"id": ..., "version": ...}）是否已經註冊，回傳使用的版本。
+    格式不正確時會產生 ValueError，題目或版本不存在時會產生 FileNotFoundError。
+    """
+    if not isinstance(problem, dict):
+        raise ValueError("Unexcepted problem reference:", problem)
+    version: str = resolve_problem_version(problem.get("id"), problem.get("version"))
+    if not os.path.exists(f"{_get_problem_directory(problem['id'])}/{version}.json"):
+        raise FileNotFoundError("The problem version is not registered:", problem["id"], version)
+    return version
+
+
+def validate_problem_id(problem_id: str) -> None:
+    if not isinstance(problem_id, str) or PROBLEM_ID_PATTERN.fullmatch(problem_id) is None:
+        raise ValueError("Unexcepted problem id:", problem_id)
+
+
+def validate_problem_version(version: str) -> None:
+    if not isinstance(version, str) or VERSION_PATTERN.fullmatch(version) is None:
+        raise ValueError("Unexcepted problem version:", version)
+
+
+@lru_cache(maxsize=64)
+def _fetch_problem_package(storage_path: str, problem_id: str, version: str) -> dict[str, Any]:
+    with open(f"{storage_path}/problem/{problem_id}/{version}.json") as file:
+        return json.loads(file.read())
+
+
+def fetch_problem_package(problem_id: str, version: str) -> dict[str, Any]:
+    """
+    題目包註冊後不會再改變，所以可以快取解析好的內容。
+    """
+    validate_problem_id(problem_id)
+    validate_problem_version(version)
+    return _fetch_problem_package(current_app.config["STORAGE_PATH"], problem_id, version)
+
+
+def merge_problem_package(submission_data: dict[str, Any]) -> dict[str, Any]:
+    """
+    將引用題目的提交（{"problem": {"id": ..., "version": ...}}）補上題目包的內容，題目包的限制會覆蓋提交的選項，
+    才能使用預先計算好的答案。
+    """
+    problem: dict[str, Any] = submission_data["problem"]
+    version: str = check_problem_reference(problem)
+    package: dict[str, Any] = fetch_problem_package(problem["id"], version)
+    return submission_data | {
+        "solution_code": package["solution_code"],
+        "checker_code": package["checker_code"],
+        "test_case": package["test_case"],
+        "options": submission_data.get("options", {}) | package["options"],
+    }
+
+
+def _compile_and_compute_answers(task: Task, box_id: int) -> dict[str, Any]:
+    status: dict[str, Any] = {"status": ProblemStatus.READY.value, "compile_detail": {}, "answers": 0, "failed_test_case": []}
+
+    code_types: list[tuple[CodeType, CodePackage]] = [(CodeType.SOLUTION, task.solution_code)]
+    if task.options.comparator == Comparator.CHECKER.value:
+        code_types.append((CodeType.CHECKER, task.checker_code))
+    for type, code_package in code_types:
+        meta: dict[str, Any] = compile_code(type, code_package.compiler, box_id)
+        status["compile_detail"][type.value] = {"time": meta["time"], "exitcode": meta["exitcode"]}
+        if meta["exitcode"] != "0":
+            return status | {"status": ProblemStatus.FAILED.value, "message": f"The {type.value} compile failed."}
+
+    solution_digest: str = make_solution_digest(task.solution_code.compiler, box_id)
+    for i in range(task.test_case_size):
+        if fetch_answer(solution_digest, task.options, i, box_id) is not None:
+            status["answers"] += 1
+            continue
+        meta = execute_code(CodeType.SOLUTION, task.solution_code.compiler, task.options, i, box_id)
+        if "exitsig" in meta or "status" in meta:
+            status["failed_test_case"].append(i)
+            continue
+        store_answer(solution_digest, task.options, i, box_id, meta)
+        status["answers"] += 1
+
+    if len(status["failed_test_case"]) > 0:
+        return status | {"status": ProblemStatus.FAILED.value, "message": "The solution failed on some test cases."}
+    return status
+
+
+def _get_problem_directory(problem_id: str) -> str:
+    validate_problem_id(problem_id)
+    return f"{current_app.config['STORAGE_PATH']}/problem/{problem_id}"
+
+
+def _write_status(problem_id: str, version: str, status: dict[str, Any]) -> None:
+    _write_json_atomically(f"{_get_problem_directory(problem_id)}/{version}.status.json", status)
+
+
+def _write_json_atomically(path: str, data: dict[str, Any]) -> None:
+    temporary_path: str = f"{path}.{threading.get_ident()}.tmp"
+    with open(temporary_path, "w") as file:
+        file.write(json.dumps(data))
+    os.rename(temporary_path, path)
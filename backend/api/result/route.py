@@ -1,8 +1,17 @@
 import json
+import time
 from http import HTTPStatus
-from pathlib import Path
+from typing import Final, Iterator
 
-from flask import Blueprint, Response, current_app, make_response
+from flask import Blueprint, Response, current_app, make_response, request
+
+from storage.result_store import ResultStore
+from utils.sandbox.enum import StatusType
+from utils.sandbox.status.util import StatusNotifier
+
+MAX_WAIT_TIMEOUT: Final[float] = 60
+MAX_STREAM_TIMEOUT: Final[float] = 600
+KEEP_ALIVE_INTERVAL: Final[float] = 15
 
 
 result_api_bp = Blueprint("result", __name__, url_prefix="/api/result")
@@ -11,14 +20,106 @@ result_api_bp = Blueprint("result", __name__, url_prefix="/api/result")
 @result_api_bp.route("/<uuid>/")
 def result_return(uuid):
     """
-    這是一個回傳的 route function，主要拿來獲取某個評測 uuid 的結果。
+    這是一個回傳的 route function，主要拿來獲取某個評測 uuid 的結果，儲存的內容會直接回傳，不會重新序列化。
+    """
+    result_store: ResultStore = current_app.config["result_store"]
+    result: bytes | None = result_store.get_raw(uuid)
+
+    if result is None:
+        return make_response({}, HTTPStatus.NOT_FOUND)
+
+    return Response(result, mimetype="application/json")
+
+
+@result_api_bp.route("/<uuid>/wait")
+def result_wait(uuid):
+    """
+    長輪詢版本的結果查詢，會等到評測完成或是逾時（timeout 秒，最多 60 秒）才回傳。
+    評測完成時回傳結果，逾時時回傳 202 與目前的狀態，不知道的 uuid 則直接回傳 404，不會等待。
     """
-    storage_path: str = current_app.config["STORAGE_PATH"]
-    result_path: Path = Path(f"{storage_path}/result/{uuid}.result")
-    
-    if not result_path.exists():
+    result_store: ResultStore = current_app.config["result_store"]
+    status_notifier: StatusNotifier = current_app.config["status_notifier"]
+    timeout: float = min(request.args.get("timeout", 30, type=float), MAX_WAIT_TIMEOUT)
+    deadline: float = time.monotonic() + timeout
+
+    statuses: list[StatusType] = status_notifier.get_statuses(uuid)
+    result: bytes | None = result_store.get_raw(uuid)
+    while result is None and statuses and StatusType.FINISH not in statuses and time.monotonic() < deadline:
+        statuses = status_notifier.wait_for_transition(uuid, len(statuses), deadline - time.monotonic())
+        result = result_store.get_raw(uuid)
+
+    if result is not None:
+        return Response(result, mimetype="application/json")
+
+    if not statuses:
         return make_response({}, HTTPStatus.NOT_FOUND)
-    
-    with open(result_path) as file:
-        result = json.loads(file.read())
-        return Response(json.dumps(result), mimetype="application/json")
+
+    return make_response({"tracker_id": uuid, "status": statuses[-1].value}, HTTPStatus.ACCEPTED)
+
+
+@result_api_bp.route("/<uuid>/events")
+def result_events(uuid):
+    """
+    以 server-sent events 推送評測的狀態轉換，每次狀態改變會送出 status 事件，完成時送出 result 事件後結束。
+    串流最多維持 timeout 秒（預設 300 秒，最多 600 秒），等待期間會定期送出註解保持連線，不知道的 uuid 則直接回傳 404。
+    """
+    result_store: ResultStore = current_app.config["result_store"]
+    status_notifier: StatusNotifier = current_app.config["status_notifier"]
+    if result_store.get_raw(uuid) is None and not status_notifier.get_statuses(uuid):
+        return make_response({}, HTTPStatus.NOT_FOUND)
+    timeout: float = min(request.args.get("timeout", 300, type=float), MAX_STREAM_TIMEOUT)
+
+    return Response(
+        _generate_status_events(uuid, result_store, status_notifier, timeout),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _generate_status_events(tracker_id: str, result_store: ResultStore, status_notifier: StatusNotifier, timeout: float) -> Iterator[str]:
+    deadline: float = time.monotonic() + timeout
+    sent_count: int = 0
+    statuses: list[StatusType] = status_notifier.get_statuses(tracker_id)
+
+    while True:
+        for status in statuses[sent_count:]:
+            yield _make_event("status", json.dumps({"tracker_id": tracker_id, "status": status.value}))
+        sent_count = len(statuses)
+
+        result: bytes | None = result_store.get_raw(tracker_id)
+        if result is not None:
+            if StatusType.FINISH not in statuses:
+                yield _make_event("status", json.dumps({"tracker_id": tracker_id, "status": StatusType.FINISH.value}))
+            yield _make_event("result", result.decode("utf-8"))
+            return
+
+        # 狀態記錄被淘汰時沒有辦法再等到狀態轉換，直接結束串流。
+        if time.monotonic() >= deadline or not statuses:
+            yield _make_event("timeout", json.dumps({"tracker_id": tracker_id}))
+            return
+
+        statuses = status_notifier.wait_for_transition(
+            tracker_id, sent_count, min(KEEP_ALIVE_INTERVAL, deadline - time.monotonic())
+        )
+        if len(statuses) == sent_count:
+            yield ": keep-alive\n\n"
+
+
+def _make_event(event: str, data: str) -> str:
+    data_lines: str = "".join(f"data: {line}\n" for line in data.split("\n"))
+    return f"event: {event}\n{data_lines}\n"
+
+
+@result_api_bp.route("/")
+def result_list():
+    """
+    列出評測結果的 tracker_id 與狀態，可以用 status、since、until（UNIX timestamp）與 limit 篩選。
+    """
+    result_store: ResultStore = current_app.config["result_store"]
+    results = result_store.query(
+        status=request.args.get("status"),
+        since=request.args.get("since", type=float),
+        until=request.args.get("until", type=float),
+        limit=request.args.get("limit", 100, type=int)
+    )
+    return make_response({"results": results}, HTTPStatus.OK)
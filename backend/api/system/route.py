@@ -2,6 +2,12 @@ import json
 
 from flask import Blueprint, Response, current_app
 
+from storage.minio_util import get_metrics
+from storage.submission_queue import SubmissionQueue
+from utils.cache.testcase import TestcaseCache
+from utils.metrics.util import free_boxes, queue_depth, registry
+from utils.sandbox.box.util import BoxPool
+
 system_api_bp = Blueprint("system", __name__)
 
 
@@ -10,12 +16,28 @@ def heartbeat():
     """
     這是一個心跳的 route function，主要會讓連接的機器確認是否活著，並且會回傳當前 judge server 的 core 與正在等待的評測數量。
     """
-    available_box: set[int] = current_app.config["avaliable_box"]
-    submission_list: list[str] = current_app.config["submission_list"]
+    box_pool: BoxPool = current_app.config["box_pool"]
+    submission_queue: SubmissionQueue = current_app.config["submission"]
+    testcase_cache: TestcaseCache = current_app.config["testcase_cache"]
     
     result = {
         "status": "OK",
-        "free_worker": len(available_box),
-        "waiting_task": len(submission_list),
+        "free_worker": box_pool.get_available_count(),
+        "waiting_task": submission_queue.qsize(),
+        "box_pool": box_pool.get_statistics(),
+        "minio": get_metrics(),
+        "testcase_cache": testcase_cache.get_statistics(),
     }
     return Response(json.dumps(result), mimetype="application/json")
+
+
+@system_api_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    以 Prometheus 的格式回傳評測流程的指標，計數器在評測時就會在記憶體中更新，這裡只會讀取目前的數值。
+    """
+    box_pool: BoxPool = current_app.config["box_pool"]
+    submission_queue: SubmissionQueue = current_app.config["submission"]
+    queue_depth.set(submission_queue.qsize())
+    free_boxes.set(box_pool.get_available_count())
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
@@ -3,19 +3,31 @@ import time
 import threading
 import traceback
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from os import environ
+from pathlib import Path
 from typing import Any
-from threading import Semaphore
 
 from api.judge.route import judge_api_bp
-from api.judge.util import execute_queueing_task_when_exist_empty_box
+from api.judge.util import execute_queueing_task, recover_submission_queue
+from api.problem.route import problem_api_bp
+from api.problem.util import resume_problem_preparation
 from api.result.route import result_api_bp
 from api.system.route import system_api_bp
 from api.test.route import test_bp
 from setting.util import Setting, SettingBuilder
+from storage.result_store import ResultStore, make_result_store
+from storage.submission_queue import SubmissionQueue
+from utils.cache.precompiled_header import remove_outdated_precompiled_headers
+from utils.cache.store import FileCache
+from utils.cache.testcase import TestcaseCache
+from utils.sandbox.box.util import BoxPool, make_box_resetter, reclaim_orphan_boxes
+from utils.sandbox.status.util import StatusNotifier
+from utils.webhook.util import WebhookDispatcher
 
 from flask import Flask, current_app
+from loguru import logger
 
 
 def create_app(config_mapping: dict[str, str] = None) -> Flask:
@@ -28,25 +40,80 @@ def create_app(config_mapping: dict[str, str] = None) -> Flask:
         app.config.from_pyfile("config.py")
         
     setting: Setting = SettingBuilder().from_file("setting.json")
-    app.config["avaliable_box"] = set([i for i in range(setting.sandbox_number)])
+    warm_box_pool: bool = app.config.get("WARM_BOX_POOL", False)
+    box_ids: list[int] = [i for i in range(setting.sandbox_number + setting.warm_box_number)]
     app.config["setting"] = setting
-    app.config["submission"] = []
-    app.config["result_mapping"] = {}
-    app.config["semaphores"] = Semaphore(setting.sandbox_number)
     app.config["control_group"] = enable_cg
+    # 暖機的 box pool 建立時就會重置所有 box，否則要先清除上次關閉前沒有釋放的 box。
+    if not warm_box_pool:
+        with app.app_context():
+            reclaim_orphan_boxes(box_ids)
+    app.config["box_pool"] = BoxPool(
+        box_ids,
+        reset_box=make_box_resetter(app, initialize=warm_box_pool),
+        background=warm_box_pool
+    )
+    app.config["submission"] = SubmissionQueue(Path(app.config["STORAGE_PATH"]) / "queue" / "submission.db")
+    app.config["result_mapping"] = {}
+    app.config["status_notifier"] = StatusNotifier()
+    app.config["artifact_cache"] = FileCache(
+        Path(app.config["STORAGE_PATH"]) / "cache" / "artifact", setting.cache.artifact_capacity
+    )
+    app.config["answer_cache"] = FileCache(
+        Path(app.config["STORAGE_PATH"]) / "cache" / "answer", setting.cache.answer_capacity
+    )
+    app.config["testcase_cache"] = TestcaseCache(
+        Path(app.config["STORAGE_PATH"]) / "testcase" / "cache",
+        setting.cache.testcase_capacity,
+        setting.cache.testcase_validation_interval
+    )
+    app.config["testcase_prefetcher"] = ThreadPoolExecutor(
+        max_workers=setting.cache.testcase_prefetch_worker_number, thread_name_prefix="testcase-prefetch"
+    )
+    app.config["result_store"] = make_result_store(setting.result_store, app.config["STORAGE_PATH"])
+    imported: int = app.config["result_store"].import_legacy_results(Path(app.config["STORAGE_PATH"]) / "result")
+    if imported > 0:
+        logger.info(f"Import {imported} legacy results into the result store.")
+    app.config["webhook_dispatcher"] = WebhookDispatcher(
+        Path(app.config["STORAGE_PATH"]) / "webhook" / "outbox", setting.webhook
+    )
+    app.config["webhook_dispatcher"].start()
+    with app.app_context():
+        recover_submission_queue()
+        resume_problem_preparation()
+        remove_outdated_precompiled_headers()
     
     app.register_blueprint(judge_api_bp)
+    app.register_blueprint(problem_api_bp)
     app.register_blueprint(result_api_bp)
     app.register_blueprint(system_api_bp)
     app.register_blueprint(test_bp)
 
-    pop_work_timer = FlaskThread(app, target=execute_queueing_task_when_exist_empty_box)
-    pop_work_timer.daemon = True
-    pop_work_timer.start()
+    for _ in range(setting.sandbox_number):
+        worker = FlaskThread(app, target=execute_queueing_task)
+        worker.daemon = True
+        worker.start()
+
+    compactor = threading.Thread(
+        target=compact_result_store_periodically,
+        args=(app.config["result_store"], setting.result_store.ttl, setting.result_store.compact_interval),
+        daemon=True
+    )
+    compactor.start()
 
     return app
 
 
+def compact_result_store_periodically(result_store: ResultStore, ttl: int, interval: int) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            removed: int = result_store.compact(ttl)
+            logger.info(f"Compact the result store, {removed} expired results are removed.")
+        except Exception:
+            logger.exception("Failed to compact the result store.")
+
+
 class FlaskThread(threading.Thread):
     def __init__(self, app, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
@@ -0,0 +1,99 @@
+"""
+Microbenchmark of the enqueue-to-start latency of the judge workers.
+
+The real judge is replaced by a fake task that only holds the box for `--task-time` seconds,
+so the numbers only contain the cost of queueing and dispatching.
+
+    cd backend && python3 -m benchmarks.bench_dispatcher --submissions 10000
+"""
+import argparse
+import statistics
+import threading
+import time
+from queue import Queue
+from tempfile import mkdtemp
+
+import api.judge.util
+import app as app_module
+from app import create_app
+from utils.sandbox.box.util import BoxPool
+
+
+def run_worker_pool(submissions: int, task_time: float) -> list[float]:
+    enqueue_time: dict[str, float] = {}
+    latency: list[float] = []
+    finished = threading.Semaphore(0)
+
+    def fake_task(tracker_id: str, box_id: int) -> None:
+        latency.append(time.perf_counter() - enqueue_time[tracker_id])
+        time.sleep(task_time)
+        box_pool.release(box_id)
+        finished.release()
+
+    api.judge.util.execute_task_with_specific_tracker_id = fake_task
+    app_module.make_box_resetter = lambda app, initialize: lambda box_id: {}
+    app = create_app({"STORAGE_PATH": mkdtemp()})
+    submission_queue: Queue[str] = app.config["submission"]
+    box_pool: BoxPool = app.config["box_pool"]
+
+    for i in range(submissions):
+        enqueue_time[str(i)] = time.perf_counter()
+        submission_queue.put(str(i))
+    for _ in range(submissions):
+        finished.acquire()
+    return latency
+
+
+def run_polling_dispatcher(submissions: int, task_time: float, box_number: int) -> list[float]:
+    """
+    The previous dispatcher: poll a list every 50 ms and pop the head with list.pop(0).
+    """
+    enqueue_time: dict[str, float] = {}
+    latency: list[float] = []
+    available_box: set[int] = set(range(box_number))
+    submission_list: list[str] = []
+    finished = threading.Semaphore(0)
+
+    def fake_task(tracker_id: str, box_id: int) -> None:
+        latency.append(time.perf_counter() - enqueue_time[tracker_id])
+        time.sleep(task_time)
+        available_box.add(box_id)
+        finished.release()
+
+    def dispatcher() -> None:
+        while True:
+            if len(submission_list) > 0 and len(available_box) > 0:
+                tracker_id = submission_list.pop(0)
+                threading.Thread(target=fake_task, args=(tracker_id, available_box.pop())).start()
+            time.sleep(0.05)
+
+    for i in range(submissions):
+        enqueue_time[str(i)] = time.perf_counter()
+        submission_list.append(str(i))
+    threading.Thread(target=dispatcher, daemon=True).start()
+    for _ in range(submissions):
+        finished.acquire()
+    return latency
+
+
+def report(name: str, latency: list[float]) -> None:
+    latency = sorted(latency)
+    print(
+        f"{name:>14}: n={len(latency)} "
+        f"p50={statistics.median(latency) * 1000:.3f}ms "
+        f"p99={latency[int(len(latency) * 0.99) - 1] * 1000:.3f}ms "
+        f"max={latency[-1] * 1000:.3f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--submissions", type=int, default=10000)
+    parser.add_argument("--task-time", type=float, default=0.0)
+    parser.add_argument("--polling-submissions", type=int, default=200)
+    args = parser.parse_args()
+
+    latency = run_worker_pool(args.submissions, args.task_time)
+    report("worker pool", latency)
+    latency = run_polling_dispatcher(args.polling_submissions, args.task_time, 5)
+    report("polling", latency)
@@ -0,0 +1,91 @@
+"""
+Benchmark of comparing a large numeric output with the built-in float comparators and a testlib checker.
+
+The testlib checker is a `rcmp6`-style `doubleCompare` checker compiled with g++ and run directly,
+without isolate, so its numbers are a lower bound of the checker path of a judged testcase.
+
+    cd backend && python3 -m benchmarks.bench_float_comparator --numbers 1000000
+"""
+import argparse
+import random
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable
+
+from utils.comparator.util import ComparisonResult, compare_floats, compare_floats_by_token
+
+TESTLIB_PATH = Path(__file__).parent.parent / "testlib.h"
+CHECKER_SOURCE = r"""
+#include "testlib.h"
+
+int main(int argc, char *argv[]) {
+    registerTestlibCmd(argc, argv);
+    int n = 0;
+    while (!ans.seekEof()) {
+        n++;
+        double expected = ans.readDouble();
+        double found = ouf.readDouble();
+        if (!doubleCompare(expected, found, 1E-6))
+            quitf(_wa, "%d%s numbers differ - expected: '%.6f', found: '%.6f', error = '%.6f'",
+                  n, englishEnding(n).c_str(), expected, found, doubleDelta(expected, found));
+    }
+    quitf(_ok, "%d numbers", n);
+}
+"""
+
+
+def make_testcase(directory: Path, numbers: int) -> tuple[Path, Path, Path]:
+    random.seed(0)
+    answer: list[float] = [random.uniform(-1e6, 1e6) for _ in range(numbers)]
+    (directory / "1.in").write_text("")
+    (directory / "1.ans").write_text("\n".join(f"{value:.9f}" for value in answer))
+    (directory / "1.out").write_text(" ".join(f"{value * (1 + 1e-8):.7f}" for value in answer))
+    return directory / "1.in", directory / "1.out", directory / "1.ans"
+
+
+def compile_checker(directory: Path) -> Path | None:
+    if shutil.which("g++") is None:
+        return None
+    (directory / "checker.cpp").write_text(CHECKER_SOURCE)
+    shutil.copyfile(TESTLIB_PATH, directory / "testlib.h")
+    subprocess.run(["g++", "-O2", "-std=c++14", "checker.cpp", "-o", "checker"], cwd=directory, check=True)
+    return directory / "checker"
+
+
+def measure(name: str, function: Callable[[], str], repeat: int) -> None:
+    elapsed: list[float] = []
+    for _ in range(repeat):
+        start_time: float = time.perf_counter()
+        log: str = function()
+        elapsed.append(time.perf_counter() - start_time)
+    print(f"{name:>16}: best={min(elapsed) * 1000:.1f}ms log={log.strip()!r}")
+
+
+def run_checker(checker: Path, input_path: Path, output_path: Path, answer_path: Path) -> str:
+    process = subprocess.run([str(checker), str(input_path), str(output_path), str(answer_path)], capture_output=True, text=True)
+    return process.stderr
+
+
+def get_log(result: ComparisonResult) -> str:
+    return result.log
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--numbers", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        input_path, output_path, answer_path = make_testcase(Path(directory), args.numbers)
+
+        measure("vectorized", lambda: get_log(compare_floats(output_path, answer_path, 1e-6)), args.repeat)
+        measure("token by token", lambda: get_log(compare_floats_by_token(output_path, answer_path, 1e-6)), args.repeat)
+        checker: Path | None = compile_checker(Path(directory))
+        if checker is None:
+            print("g++ is not available, skip the testlib checker.")
+        else:
+            measure("testlib checker", lambda: run_checker(checker, input_path, output_path, answer_path), args.repeat)
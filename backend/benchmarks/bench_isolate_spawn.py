@@ -0,0 +1,51 @@
+"""
+Benchmark of the per-run process spawn overhead of isolate invocations for a 200-testcase task.
+
+A judged testcase runs isolate three times (solution, submit and checker), the benchmark replaces
+isolate with a stand-in program that exits immediately, so only the spawn overhead is measured.
+
+    cd backend && python3 -m benchmarks.bench_isolate_spawn --testcases 200
+"""
+import argparse
+import shlex
+import shutil
+import subprocess
+import time
+
+from utils.isolate.util import spawn_isolate
+
+
+def make_argv(program: str, testcase_index: int, run: str) -> list[str]:
+    return [
+        program, "--box-id=0", "--time=1", "--wall-time=1", f"--stdin={testcase_index}.in",
+        f"--stdout={testcase_index}.{run}", f"--meta={testcase_index}.{run}.mt", "--open-files=2048",
+        "--full-env", "--processes", "--run", "--", f"./{run}.o"
+    ]
+
+
+def run_with_shell(program: str, testcases: int) -> float:
+    start_time: float = time.perf_counter()
+    for i in range(testcases):
+        for run in ("solution", "submit", "checker"):
+            subprocess.call(shlex.join(make_argv(program, i, run)), shell=True)
+    return time.perf_counter() - start_time
+
+
+def run_with_argv(program: str, testcases: int) -> float:
+    start_time: float = time.perf_counter()
+    for i in range(testcases):
+        for run in ("solution", "submit", "checker"):
+            spawn_isolate(make_argv(program, i, run))
+    return time.perf_counter() - start_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--testcases", type=int, default=200)
+    parser.add_argument("--program", default=shutil.which("true"))
+    args = parser.parse_args()
+
+    runs: int = args.testcases * 3
+    for name, runner in (("shell=True", run_with_shell), ("argv spawn", run_with_argv)):
+        elapsed_time: float = runner(args.program, args.testcases)
+        print(f"{name:>11}: {runs} runs in {elapsed_time:.3f}s, {elapsed_time / runs * 1e6:.1f}us per run")
@@ -0,0 +1,64 @@
+"""
+Benchmark of fetching a large testcase pack as a single stream versus parallel byte ranges.
+
+The storage server is a local MinIO-compatible stand-in that throttles every response stream to
+`--stream-bandwidth` MiB/s, which emulates the per-connection throughput of the storage network.
+
+    cd backend && python3 -m benchmarks.bench_minio_download --size 256 --stream-bandwidth 64
+"""
+import argparse
+import os
+import time
+from copy import deepcopy
+from tempfile import TemporaryDirectory
+
+from flask import Flask
+
+from benchmarks.local_s3 import LocalS3Server
+from setting.util import Setting, SettingBuilder
+from storage.minio_util import fetch
+
+BUCKET_NAME = "testcase"
+OBJECT_NAME = "large.pack"
+
+
+def run_fetch(server: LocalS3Server, part_size: int, concurrency: int, repeat: int) -> list[float]:
+    app = Flask(__name__)
+    setting: Setting = deepcopy(SettingBuilder().from_file("setting.json"))
+    setting.minio.endpoint = server.endpoint
+    setting.minio.download_part_size = part_size
+    setting.minio.download_concurrency = concurrency
+    app.config["setting"] = setting
+
+    elapsed: list[float] = []
+    with app.app_context(), TemporaryDirectory() as directory:
+        for _ in range(repeat):
+            start_time: float = time.perf_counter()
+            fetch(BUCKET_NAME, OBJECT_NAME, os.path.join(directory, OBJECT_NAME))
+            elapsed.append(time.perf_counter() - start_time)
+    return elapsed
+
+
+def report(name: str, size: int, elapsed: list[float]) -> None:
+    best: float = min(elapsed)
+    print(f"{name:>24}: best={best:.3f}s throughput={size / best / (1 << 20):.1f}MiB/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=256, help="object size in MiB")
+    parser.add_argument("--stream-bandwidth", type=float, default=64, help="MiB/s of a single connection, 0 for unlimited")
+    parser.add_argument("--part-size", type=int, default=16, help="MiB")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    size: int = args.size << 20
+    with LocalS3Server(args.stream_bandwidth * (1 << 20) or None) as server:
+        server.put_object(BUCKET_NAME, OBJECT_NAME, os.urandom(size))
+
+        report("single stream", size, run_fetch(server, size, 1, args.repeat))
+        report(
+            f"{args.concurrency} x {args.part_size}MiB ranges", size,
+            run_fetch(server, args.part_size << 20, args.concurrency, args.repeat)
+        )
@@ -0,0 +1,33 @@
+"""
+Microbenchmark of the enqueue throughput of the persistent submission queue.
+
+Every put is committed to the SQLite database (WAL, synchronous=NORMAL) before it returns,
+the target is at least 5000 enqueues per second.
+
+    cd backend && python3 -m benchmarks.bench_submission_queue --submissions 5000
+"""
+import argparse
+import time
+from pathlib import Path
+from tempfile import mkdtemp
+
+from storage.submission_queue import SubmissionQueue
+
+
+def run_put(submissions: int) -> float:
+    submission_queue = SubmissionQueue(Path(mkdtemp()) / "queue" / "submission.db")
+    submission_queue.put("warm")
+
+    start_time: float = time.perf_counter()
+    for i in range(submissions):
+        submission_queue.put(f"tracker-{i}")
+    return time.perf_counter() - start_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--submissions", type=int, default=5000)
+    args = parser.parse_args()
+
+    elapsed_time = run_put(args.submissions)
+    print(f"put: n={args.submissions} total={elapsed_time * 1000:.3f}ms rate={args.submissions / elapsed_time:.0f}/s")
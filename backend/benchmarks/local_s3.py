@@ -0,0 +1,110 @@
+"""
+A minimal in-memory stand-in of the MinIO / S3 GET API, enough for `storage.minio_util.fetch`.
+
+It understands bucket location lookups, HEAD, Range, If-None-Match, If-Match and returns user metadata,
+and can throttle every response stream to emulate the per-connection bandwidth of a storage network.
+"""
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+LOCATION_RESPONSE = (
+    b'<?xml version="1.0" encoding="UTF-8"?>'
+    b'<LocationConstraint xmlns="http://s3.amazonaws.com/doc/2006-03-01/"></LocationConstraint>'
+)
+
+
+class LocalS3Server:
+    def __init__(self, stream_bandwidth: float | None = None) -> None:
+        """
+        stream_bandwidth is the maximum bytes per second of a single response, None means unlimited.
+        """
+        self.objects: dict[str, tuple[bytes, str, dict[str, str]]] = {}
+        self.stream_bandwidth: float | None = stream_bandwidth
+        self.requests: list[dict[str, Any]] = []
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(self))
+        self._server.daemon_threads = True
+
+    @property
+    def endpoint(self) -> str:
+        return f"127.0.0.1:{self._server.server_address[1]}"
+
+    def put_object(self, bucket_name: str, object_name: str, data: bytes, metadata: dict[str, str] | None = None) -> None:
+        self.objects[f"/{bucket_name}/{object_name}"] = (data, hashlib.md5(data).hexdigest(), metadata or {})
+
+    def start(self) -> "LocalS3Server":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "LocalS3Server":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+def _make_handler(server: LocalS3Server) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            path: str = self.path.split("?")[0]
+            server.requests.append({"method": self.command, "path": path, "headers": dict(self.headers)})
+            if "location" in self.path:
+                return self._respond(200, LOCATION_RESPONSE, {"Content-Type": "application/xml"})
+            if path.count("/") < 2:
+                return self._respond(404, b"", {})
+            if path not in server.objects:
+                return self._respond_error(404, "NoSuchKey")
+
+            data, etag, metadata = server.objects[path]
+            headers: dict[str, str] = {"ETag": f'"{etag}"', "Accept-Ranges": "bytes"}
+            headers |= {f"x-amz-meta-{key}": value for key, value in metadata.items()}
+            if self.headers.get("If-None-Match", "").strip('"') == etag:
+                return self._respond(304, None, headers)
+            if "If-Match" in self.headers and self.headers["If-Match"].strip('"') != etag:
+                return self._respond_error(412, "PreconditionFailed")
+
+            if "Range" not in self.headers:
+                return self._respond(200, data, headers)
+            start, end = self.headers["Range"].removeprefix("bytes=").split("-")
+            if int(start) >= len(data):
+                return self._respond_error(416, "InvalidRange")
+            end = min(int(end) if end else len(data) - 1, len(data) - 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            return self._respond(206, memoryview(data)[int(start):end + 1], headers)
+
+        do_HEAD = do_GET
+
+        def _respond(self, status: int, body: bytes | memoryview | None, headers: dict[str, str]) -> None:
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            if body is not None:
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body is None or self.command == "HEAD":
+                return
+            view = memoryview(body)
+            for offset in range(0, len(view), 1 << 18):
+                chunk = view[offset:offset + (1 << 18)]
+                self.wfile.write(chunk)
+                if server.stream_bandwidth is not None:
+                    time.sleep(len(chunk) / server.stream_bandwidth)
+
+        def _respond_error(self, status: int, code: str) -> None:
+            body: bytes = (
+                f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code><Message>{code}</Message></Error>'
+            ).encode("utf-8")
+            self._respond(status, body, {"Content-Type": "application/xml"})
+
+        def log_message(self, *args) -> None:
+            pass
+
+    return Handler
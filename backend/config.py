@@ -1 +1,2 @@
 STORAGE_PATH="/etc/nuoj-sandbox/storage"
+WARM_BOX_POOL=True
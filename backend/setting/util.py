@@ -1,5 +1,5 @@
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any
 
 
@@ -22,8 +22,16 @@ class CompilerSetting:
     def get_solution_execute_command(self):
         return self.replace_parameter_in_command(self.execute, "solution")
 
-    def get_checker_compile_command(self):
-        return self.replace_parameter_in_command(self.compile, "checker")
+    def get_checker_compile_command(self, precompiled_header: str | None = None):
+        command = self.replace_parameter_in_command(self.compile, "checker")
+        if precompiled_header is not None:
+            command = self.include_header_in_command(command, precompiled_header)
+        return command
+
+    def get_header_compile_command(self, header: str):
+        command = self.compile.replace("{source}", header)
+        command = command.replace("{dist}", f"{header}.gch")
+        return command
 
     def get_source_filename(self, type: str):
         if type not in self.file_name:
@@ -39,11 +47,53 @@ class CompilerSetting:
         command = command.replace("{dist}", self.file_name[type]["dist"])
         return command
 
+    def include_header_in_command(self, command: str, header: str):
+        compiler, arguments = command.split(" ", 1)
+        return f"{compiler} -include {header} {arguments}"
+
 
 @dataclass
 class MinIOConfig:
     enable: bool
     endpoint: str
+    health_check_interval: float = 5
+    download_part_size: int = 16777216
+    download_concurrency: int = 8
+
+
+@dataclass
+class CacheConfig:
+    artifact_capacity: int = 1073741824
+    answer_capacity: int = 4294967296
+    testcase_capacity: int = 10737418240
+    testcase_validation_interval: float = 5
+    testcase_prefetch_worker_number: int = 4
+
+
+@dataclass
+class OutputConfig:
+    capture_limit: int = 65536
+    file_size_limit: int = 262144
+
+
+@dataclass
+class ResultStoreConfig:
+    backend: str = "sqlite"
+    ttl: int = 604800
+    compact_interval: int = 3600
+
+
+@dataclass
+class WebhookConfig:
+    worker_number: int = 2
+    max_attempts: int = 5
+    backoff: float = 1.0
+    timeout: float = 10
+
+
+@dataclass
+class QueueConfig:
+    max_attempts: int = 2
 
 
 @dataclass
@@ -51,6 +101,13 @@ class Setting:
     sandbox_number: int
     compiler: dict[str, CompilerSetting]
     minio: MinIOConfig
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    output: OutputConfig = field(default_factory=OutputConfig)
+    result_store: ResultStoreConfig = field(default_factory=ResultStoreConfig)
+    webhook: WebhookConfig = field(default_factory=WebhookConfig)
+    queue: QueueConfig = field(default_factory=QueueConfig)
+    parallel_box_limit: int = 1
+    warm_box_number: int = 0
 
 
 class SettingBuilder:
@@ -64,7 +121,14 @@ class SettingBuilder:
         return Setting(
             sandbox_number=mapping["sandbox_number"],
             compiler=convert_compiler_dict_to_compiler_setting_object(mapping["compiler"]),
-            minio=MinIOConfig(**mapping["minio"])
+            minio=MinIOConfig(**mapping["minio"]),
+            cache=CacheConfig(**mapping.get("cache", {})),
+            output=OutputConfig(**mapping.get("output", {})),
+            result_store=ResultStoreConfig(**mapping.get("result_store", {})),
+            webhook=WebhookConfig(**mapping.get("webhook", {})),
+            queue=QueueConfig(**mapping.get("queue", {})),
+            parallel_box_limit=mapping.get("parallel_box_limit", 1),
+            warm_box_number=mapping.get("warm_box_number", 0)
         )
 
 
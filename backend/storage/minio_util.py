@@ -1,45 +1,234 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from os import environ
 from traceback import format_exc
-from typing import Final
+from typing import Any, Final
 
+import urllib3
 from flask import current_app
 from loguru import logger
 from minio import Minio
+from minio.error import S3Error
 
-from setting.util import Setting
+from setting.util import MinIOConfig, Setting
+from utils.metrics.util import minio_fetched_bytes, minio_fetches, minio_requests
 
+_clients_lock = threading.Lock()
+_clients: dict[tuple[str, str | None, str | None], Minio] = {}
+_health_checkers: dict[tuple[str, str | None, str | None], "_HealthChecker"] = {}
+_MD5_ETAG: Final[re.Pattern[str]] = re.compile(r"[0-9a-f]{32}")
+
+
+class _CountingPoolManager(urllib3.PoolManager):
+    """
+    所有 MinIO client 共用的連線池，並記錄每個執行序送出的 request 數量，用來計算每次取得檔案用了幾個 request。
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._local = threading.local()
+
+    def urlopen(self, method, url, *args, **kwargs):
+        self._local.request_count = self.get_request_count() + 1
+        return super().urlopen(method, url, *args, **kwargs)
+
+    def get_request_count(self) -> int:
+        return getattr(self._local, "request_count", 0)
+
+
+_http_client: Final[_CountingPoolManager] = _CountingPoolManager(
+    timeout=urllib3.Timeout(connect=10, read=60),
+    maxsize=32,
+    retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+)
+
+
+@dataclass
+class FetchResult:
+    modified: bool
+    etag: str | None
+    version_id: str | None
+    size: int
+
+
+class MinIOMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.fetches: int = 0
+        self.not_modified: int = 0
+        self.requests: int = 0
+        self.bytes: int = 0
+        self.health_checks: int = 0
+
+    def record_fetch(self, request_count: int, size: int, modified: bool) -> None:
+        with self._lock:
+            self.fetches += 1
+            self.requests += request_count
+            self.bytes += size
+            if not modified:
+                self.not_modified += 1
+        minio_fetches.inc(modified=str(modified).lower())
+        minio_requests.inc(request_count)
+        minio_fetched_bytes.inc(size)
+
+    def record_health_check(self) -> None:
+        with self._lock:
+            self.health_checks += 1
+
+    def get_statistics(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "fetches": self.fetches,
+                "not_modified": self.not_modified,
+                "requests": self.requests,
+                "requests_per_fetch": self.requests / self.fetches if self.fetches > 0 else 0.0,
+                "bytes": self.bytes,
+                "health_checks": self.health_checks,
+            }
+
+
+metrics: Final[MinIOMetrics] = MinIOMetrics()
 
-def get_client() -> Minio:
-    setting: Setting = current_app.config["setting"]
 
-    ACCESS_KEY: Final[str] = environ.get("MINIO_ACCESS_KEY")
-    SECRET_KEY: Final[str] = environ.get("MINIO_SECRET_KEY")
-    ENDPOINT: Final[str] = setting.minio.endpoint
+class _HealthChecker:
+    """
+    在背景定期檢查 MinIO 是否可以使用，heartbeat 直接回傳最後一次檢查的結果，不需要每次都送出 request。
+    """
 
-    client = Minio(endpoint=ENDPOINT, access_key=ACCESS_KEY, secret_key=SECRET_KEY, secure=False)
+    def __init__(self, client: Minio, interval: float) -> None:
+        self.client: Minio = client
+        self.interval: float = interval
+        self.healthy: bool | None = None
+        self._lock = threading.Lock()
+        self._started: bool = False
 
-    return client
+    def is_healthy(self) -> bool:
+        with self._lock:
+            if not self._started:
+                self._started = True
+                self.refresh()
+                threading.Thread(target=self._refresh_forever, daemon=True).start()
+            return self.healthy is True
+
+    def refresh(self) -> None:
+        metrics.record_health_check()
+        try:
+            self.client.bucket_exists("notexistbucket")
+            healthy: bool = True
+        except:
+            if self.healthy is not False:
+                print(format_exc())
+            healthy = False
+        if healthy != self.healthy:
+            logger.info(f"MinIO health state changes to {'healthy' if healthy else 'unhealthy'}.")
+        self.healthy = healthy
+
+    def _refresh_forever(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            self.refresh()
+
+
+def get_client() -> Minio:
+    """
+    回傳共用的 MinIO client，相同的 endpoint 與金鑰只會建立一次 client，所有 client 共用同一個連線池。
+    """
+    with _clients_lock:
+        key = _get_client_key()
+        if key not in _clients:
+            _clients[key] = Minio(
+                endpoint=key[0], access_key=key[1], secret_key=key[2], secure=False, http_client=_http_client
+            )
+        return _clients[key]
 
 
 def heartbeat() -> bool:
+    setting: Setting = current_app.config["setting"]
     client: Minio = get_client()
+    with _clients_lock:
+        key = _get_client_key()
+        if key not in _health_checkers:
+            _health_checkers[key] = _HealthChecker(client, setting.minio.health_check_interval)
+        health_checker: _HealthChecker = _health_checkers[key]
+    return health_checker.is_healthy()
 
-    try:
-        client.bucket_exists("notexistbucket")
-        return True
-    except:
-        print(format_exc())
-        return False
 
+def get_metrics() -> dict[str, Any]:
+    return metrics.get_statistics()
 
-def download(bucket_name: str, object_name: str, file_name: str) -> None:
+
+def fetch(bucket_name: str, object_name: str, file_name: str, etag: str | None = None) -> FetchResult | None:
+    """
+    第一個 GET request 只取得第一段（download_part_size）內容，同時取得 ETag、版本與檔案大小，不需要先 stat 再下載。
+    檔案比一段大時，剩下的部分以 download_concurrency 個執行序平行下載不同的範圍，寫入預先配置好大小的檔案，完成後驗證 checksum。
+    有提供 etag 時會帶上 If-None-Match，物件沒有變動時不會下載內容，回傳的 modified 為 False；物件不存在時回傳 None。
+    """
     assert heartbeat()
-    
+
+    setting: Setting = current_app.config["setting"]
     client: Minio = get_client()
+    request_count: int = _http_client.get_request_count()
+    request_headers: dict[str, str] = {} if etag is None else {"If-None-Match": f'"{etag}"'}
+
+    try:
+        try:
+            response = client.get_object(
+                bucket_name, object_name, length=setting.minio.download_part_size, request_headers=request_headers
+            )
+        except S3Error as error:
+            # 空的物件沒有可以滿足的範圍。
+            if error.code != "InvalidRange":
+                raise
+            response = client.get_object(bucket_name, object_name, request_headers=request_headers)
+    except Exception as error:
+        if _is_not_modified(error):
+            metrics.record_fetch(_http_client.get_request_count() - request_count, 0, modified=False)
+            return FetchResult(modified=False, etag=etag, version_id=None, size=0)
+        if isinstance(error, S3Error) and error.code in ("NoSuchKey", "NoSuchBucket"):
+            return None
+        raise
 
-    client.fget_object(bucket_name, object_name, file_name)
+    object_etag: str | None = _strip_etag(response.headers.get("ETag"))
+    object_size: int = _get_object_size(response.headers)
+    first_part_size: int = int(response.headers.get("Content-Length", object_size))
+    temporary_file_name: str = f"{file_name}.{threading.get_ident()}.part"
+    range_request_count: int = 0
+    try:
+        with open(temporary_file_name, "wb") as file:
+            _preallocate(file.fileno(), object_size)
+        # 收到第一段的 header 就知道檔案大小，剩下的範圍與第一段的內容同時下載。
+        with ThreadPoolExecutor(max_workers=setting.minio.download_concurrency) as executor:
+            range_downloads = executor.map(
+                lambda part: _download_range(client, bucket_name, object_name, temporary_file_name, object_etag, *part),
+                _split_ranges(first_part_size, object_size, setting.minio.download_part_size)
+            )
+            _write_response(response, object_name, temporary_file_name, 0, first_part_size)
+            range_request_count = sum(range_downloads)
+        _verify_checksum(temporary_file_name, object_etag, response.headers.get("x-amz-meta-sha256"))
+        os.rename(temporary_file_name, file_name)
+    finally:
+        response.close()
+        response.release_conn()
+        if os.path.exists(temporary_file_name):
+            os.remove(temporary_file_name)
 
+    metrics.record_fetch(_http_client.get_request_count() - request_count + range_request_count, object_size, modified=True)
     logger.info(f"Fetch the file {object_name} from {bucket_name}.")
+    return FetchResult(
+        modified=True,
+        etag=object_etag,
+        version_id=response.headers.get("x-amz-version-id"),
+        size=object_size
+    )
+
+
+def download(bucket_name: str, object_name: str, file_name: str) -> None:
+    assert fetch(bucket_name, object_name, str(file_name)) is not None
 
 
 def is_testcase_in_storage_server(bucket_name: str, object_name: str) -> bool:
@@ -51,4 +240,105 @@ def is_testcase_in_storage_server(bucket_name: str, object_name: str) -> bool:
         client.stat_object(bucket_name, object_name)
         return True
     except:
-        return False
\ No newline at end of file
+        return False
+
+
+def upload(bucket_name: str, object_name: str, file_name: str) -> None:
+    assert heartbeat()
+
+    client: Minio = get_client()
+
+    if not client.bucket_exists(bucket_name):
+        client.make_bucket(bucket_name)
+    # 大檔案會以 multipart 上傳，ETag 不再是內容的 MD5，所以另外記錄 SHA-256 讓下載時可以驗證。
+    client.fput_object(bucket_name, object_name, file_name, metadata={"sha256": _hash_file(file_name, hashlib.sha256())})
+
+    logger.info(f"Upload the file {file_name} to {bucket_name} as {object_name}.")
+
+
+def _get_client_key() -> tuple[str, str | None, str | None]:
+    setting: Setting = current_app.config["setting"]
+    minio_config: MinIOConfig = setting.minio
+    return (minio_config.endpoint, environ.get("MINIO_ACCESS_KEY"), environ.get("MINIO_SECRET_KEY"))
+
+
+def _split_ranges(start: int, end: int, part_size: int) -> list[tuple[int, int]]:
+    return [(offset, min(part_size, end - offset)) for offset in range(start, end, part_size)]
+
+
+def _download_range(client: Minio, bucket_name: str, object_name: str, file_name: str, etag: str | None, offset: int, length: int) -> int:
+    """
+    下載物件 [offset, offset + length) 的內容並寫到檔案對應的位置，帶上 If-Match 確保每一段都來自同一個版本的物件。
+    回傳送出的 request 數量。
+    """
+    request_count: int = _http_client.get_request_count()
+    request_headers: dict[str, str] = {} if etag is None else {"If-Match": f'"{etag}"'}
+    response = client.get_object(bucket_name, object_name, offset=offset, length=length, request_headers=request_headers)
+    try:
+        _write_response(response, object_name, file_name, offset, length)
+    finally:
+        response.close()
+        response.release_conn()
+    return _http_client.get_request_count() - request_count
+
+
+def _write_response(response: Any, object_name: str, file_name: str, offset: int, length: int) -> None:
+    file_descriptor: int = os.open(file_name, os.O_WRONLY)
+    try:
+        position: int = offset
+        for chunk in response.stream(1 << 20):
+            os.pwrite(file_descriptor, chunk, position)
+            position += len(chunk)
+    finally:
+        os.close(file_descriptor)
+    if position != offset + length:
+        raise Exception("Unexcepted range size:", object_name, offset, position - offset, length)
+
+
+def _preallocate(file_descriptor: int, size: int) -> None:
+    if hasattr(os, "posix_fallocate") and size > 0:
+        os.posix_fallocate(file_descriptor, 0, size)
+    else:
+        os.ftruncate(file_descriptor, size)
+
+
+def _verify_checksum(file_name: str, etag: str | None, sha256: str | None) -> None:
+    """
+    上傳時記錄的 SHA-256 優先；沒有的話，非 multipart 上傳的物件 ETag 就是內容的 MD5。
+    multipart 上傳又沒有記錄 SHA-256 的物件無法驗證。
+    """
+    if sha256 is not None:
+        expected, actual = sha256, _hash_file(file_name, hashlib.sha256())
+    elif etag is not None and _MD5_ETAG.fullmatch(etag):
+        expected, actual = etag, _hash_file(file_name, hashlib.md5())
+    else:
+        logger.debug(f"Skip the checksum verification of {file_name}, the ETag {etag} is not a MD5 checksum.")
+        return
+    if expected != actual:
+        raise Exception("Unexcepted checksum:", file_name, expected, actual)
+
+
+def _hash_file(file_name: str, hash_object: Any) -> str:
+    with open(file_name, "rb") as file:
+        while chunk := file.read(1 << 20):
+            hash_object.update(chunk)
+    return hash_object.hexdigest()
+
+
+def _get_object_size(headers: Any) -> int:
+    """
+    Range request 的回應 Content-Range 為 bytes 0-{end}/{size}，伺服器忽略 Range 時則以 Content-Length 為準。
+    """
+    content_range: str | None = headers.get("Content-Range")
+    if content_range is not None:
+        return int(content_range.rsplit("/", 1)[1])
+    return int(headers.get("Content-Length", 0))
+
+
+def _is_not_modified(error: Exception) -> bool:
+    response = getattr(error, "response", None)
+    return getattr(error, "status_code", None) == 304 or getattr(response, "status", None) == 304
+
+
+def _strip_etag(etag: str | None) -> str | None:
+    return None if etag is None else etag.strip('"')
@@ -0,0 +1,213 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Final
+
+from setting.util import ResultStoreConfig
+
+LEGACY_IMPORT_BATCH_SIZE: Final[int] = 500
+
+
+class ResultStore(ABC):
+    """
+    評測結果的儲存後端，結果以序列化好的 bytes 儲存，讀取時直接回傳，不需要重新序列化。
+    """
+
+    @abstractmethod
+    def put(self, tracker_id: str, status: str, data: bytes) -> None:
+        pass
+
+    @abstractmethod
+    def get_raw(self, tracker_id: str) -> bytes | None:
+        pass
+
+    @abstractmethod
+    def query(self, status: str | None = None, since: float | None = None, until: float | None = None, limit: int = 100) -> list[dict[str, Any]]:
+        """
+        依照建立時間由新到舊列出結果的 tracker_id、狀態與時間，可以用狀態與建立時間的範圍篩選。
+        """
+        pass
+
+    @abstractmethod
+    def compact(self, ttl: float) -> int:
+        """
+        刪除超過 ttl 秒沒有更新的結果，回傳刪除的數量。
+        """
+        pass
+
+    def import_legacy_results(self, directory: Path) -> int:
+        """
+        匯入舊版每個 tracker_id 一個 <tracker_id>.result 檔案的結果，回傳匯入的數量，預設不需要匯入。
+        """
+        return 0
+
+
+class SQLiteResultStore(ResultStore):
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def put(self, tracker_id: str, status: str, data: bytes) -> None:
+        now: float = time.time()
+        with self._lock:
+            connection: sqlite3.Connection = self._get_connection()
+            connection.execute(
+                "INSERT INTO result (tracker_id, status, created_at, updated_at, data) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (tracker_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at, data = excluded.data",
+                (tracker_id, status, now, now, data)
+            )
+            connection.commit()
+
+    def get_raw(self, tracker_id: str) -> bytes | None:
+        with self._lock:
+            row = self._get_connection().execute("SELECT data FROM result WHERE tracker_id = ?", (tracker_id,)).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def query(self, status: str | None = None, since: float | None = None, until: float | None = None, limit: int = 100) -> list[dict[str, Any]]:
+        conditions: list[str] = []
+        parameters: list[Any] = []
+        if status is not None:
+            conditions.append("status = ?")
+            parameters.append(status)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            parameters.append(since)
+        if until is not None:
+            conditions.append("created_at < ?")
+            parameters.append(until)
+
+        statement: str = "SELECT tracker_id, status, created_at, updated_at FROM result"
+        if conditions:
+            statement += " WHERE " + " AND ".join(conditions)
+        statement += " ORDER BY created_at DESC LIMIT ?"
+
+        with self._lock:
+            rows = self._get_connection().execute(statement, (*parameters, limit)).fetchall()
+        return [
+            {"tracker_id": tracker_id, "status": status, "created_at": created_at, "updated_at": updated_at}
+            for tracker_id, status, created_at, updated_at in rows
+        ]
+
+    def compact(self, ttl: float) -> int:
+        with self._lock:
+            connection: sqlite3.Connection = self._get_connection()
+            cursor = connection.execute("DELETE FROM result WHERE updated_at < ?", (time.time() - ttl,))
+            connection.commit()
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return cursor.rowcount
+
+    def import_legacy_results(self, directory: Path) -> int:
+        """
+        app 建立時匯入一次，建立時間使用檔案的修改時間，資料庫已經有的 tracker_id 以資料庫為準。
+        每 LEGACY_IMPORT_BATCH_SIZE 個檔案在同一個 transaction 寫入後才刪除這些檔案，之後啟動不需要再匯入。
+        """
+        if not directory.exists():
+            return 0
+
+        imported: int = 0
+        result_paths: list[Path] = list(directory.glob("*.result"))
+        for start in range(0, len(result_paths), LEGACY_IMPORT_BATCH_SIZE):
+            batch: list[Path] = result_paths[start:start + LEGACY_IMPORT_BATCH_SIZE]
+            rows: list[tuple[str, str, float, float, bytes]] = [_read_legacy_result(result_path) for result_path in batch]
+            with self._lock:
+                connection: sqlite3.Connection = self._get_connection()
+                connection.executemany(
+                    "INSERT OR IGNORE INTO result (tracker_id, status, created_at, updated_at, data) VALUES (?, ?, ?, ?, ?)", rows
+                )
+                connection.commit()
+            for result_path in batch:
+                result_path.unlink()
+                result_path.with_suffix(".status").unlink(missing_ok=True)
+            imported += len(batch)
+        return imported
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """
+        第一次使用時才建立資料庫，app 建立時 storage 目錄不一定已經存在。
+        """
+        if self._connection is not None:
+            return self._connection
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS result ("
+            "tracker_id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL, data BLOB NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS result_created_at ON result (created_at)")
+        connection.execute("CREATE INDEX IF NOT EXISTS result_status_created_at ON result (status, created_at)")
+        connection.execute("CREATE INDEX IF NOT EXISTS result_updated_at ON result (updated_at)")
+        connection.commit()
+        self._connection = connection
+        return connection
+
+
+class FileResultStore(ResultStore):
+    """
+    每個 tracker_id 一個 <tracker_id>.result 檔案的儲存方式，查詢時需要掃描整個目錄，只適合少量的結果。
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory: Path = directory
+
+    def put(self, tracker_id: str, status: str, data: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary_path: Path = self.directory / f".{tracker_id}.result.tmp"
+        temporary_path.write_bytes(data)
+        os.rename(temporary_path, self.directory / f"{tracker_id}.result")
+        (self.directory / f"{tracker_id}.status").write_text(status)
+
+    def get_raw(self, tracker_id: str) -> bytes | None:
+        result_path: Path = self.directory / f"{tracker_id}.result"
+        return result_path.read_bytes() if result_path.exists() else None
+
+    def query(self, status: str | None = None, since: float | None = None, until: float | None = None, limit: int = 100) -> list[dict[str, Any]]:
+        results: list[dict[str, Any]] = []
+        for result_path in self.directory.glob("*.result"):
+            status_path: Path = result_path.with_suffix(".status")
+            result_status: str = status_path.read_text() if status_path.exists() else ""
+            created_at: float = result_path.stat().st_mtime
+            if status is not None and result_status != status:
+                continue
+            if (since is not None and created_at < since) or (until is not None and created_at >= until):
+                continue
+            results.append({"tracker_id": result_path.stem, "status": result_status, "created_at": created_at, "updated_at": created_at})
+        return sorted(results, key=lambda result: result["created_at"], reverse=True)[:limit]
+
+    def compact(self, ttl: float) -> int:
+        removed: int = 0
+        for result_path in self.directory.glob("*.result"):
+            if result_path.stat().st_mtime < time.time() - ttl:
+                result_path.unlink(missing_ok=True)
+                result_path.with_suffix(".status").unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+def make_result_store(config: ResultStoreConfig, storage_path: str) -> ResultStore:
+    if config.backend == "sqlite":
+        return SQLiteResultStore(Path(storage_path) / "result" / "result.db")
+    if config.backend == "file":
+        return FileResultStore(Path(storage_path) / "result")
+    raise Exception("Unexcepted result store backend:", config.backend)
+
+
+def _read_legacy_result(result_path: Path) -> tuple[str, str, float, float, bytes]:
+    data: bytes = result_path.read_bytes()
+    status_path: Path = result_path.with_suffix(".status")
+    if status_path.exists():
+        status: str = status_path.read_text()
+    else:
+        try:
+            status = json.loads(data).get("status", "")
+        except ValueError:
+            status = ""
+    created_at: float = result_path.stat().st_mtime
+    return result_path.stem, status, created_at, created_at, data
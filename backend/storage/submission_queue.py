@@ -0,0 +1,158 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from enum import IntEnum
+from pathlib import Path
+
+from utils.metrics.util import queue_wait_seconds
+
+
+class SubmissionState(IntEnum):
+    QUEUED = 0
+    RUNNING = 1
+    HELD = 2
+
+
+class SubmissionQueue:
+    """
+    以 SQLite（WAL）持久化的評測佇列，排隊中與執行中的 tracker_id 都記錄在資料庫中，重新啟動後可以用 recover 恢復。
+    資料庫只負責持久化，取出任務時使用記憶體中的 deque，所以 get 不需要查詢資料庫。
+    deque 中同時保存排入的時間，取出時記錄等待的時間。
+    批次提交中等待第一個任務完成的其他任務為 HELD，第一個任務完成後才會排入佇列。
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        self._lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._queued: deque[tuple[str, float]] = deque()
+        self._connection: sqlite3.Connection | None = None
+
+    def put(self, tracker_id: str) -> None:
+        self.put_batch([tracker_id])
+
+    def put_batch(self, tracker_ids: list[str]) -> None:
+        """
+        第一個 tracker_id 直接排入佇列，其他的 tracker_id 等第一個任務完成（mark_done）後才會排入佇列。
+        """
+        if len(tracker_ids) == 0:
+            return
+
+        now: float = time.time()
+        rows: list[tuple[str, int, str | None, float]] = [(tracker_ids[0], SubmissionState.QUEUED, None, now)]
+        rows += [(tracker_id, SubmissionState.HELD, tracker_ids[0], now) for tracker_id in tracker_ids[1:]]
+        with self._lock:
+            connection: sqlite3.Connection = self._get_connection()
+            connection.executemany(
+                "INSERT OR REPLACE INTO submission (tracker_id, state, leader, enqueued_at) VALUES (?, ?, ?, ?)", rows
+            )
+            connection.commit()
+        self._push([(tracker_ids[0], now)])
+
+    def get(self) -> str:
+        with self._condition:
+            while len(self._queued) == 0:
+                self._condition.wait()
+            tracker_id, enqueued_at = self._queued.popleft()
+        queue_wait_seconds.observe(max(time.time() - enqueued_at, 0))
+        return tracker_id
+
+    def qsize(self) -> int:
+        with self._condition:
+            return len(self._queued)
+
+    def mark_started(self, tracker_id: str, box_id: int) -> None:
+        with self._lock:
+            connection: sqlite3.Connection = self._get_connection()
+            connection.execute(
+                "UPDATE submission SET state = ?, box_id = ?, attempts = attempts + 1, started_at = ? WHERE tracker_id = ?",
+                (SubmissionState.RUNNING, box_id, time.time(), tracker_id)
+            )
+            connection.commit()
+
+    def mark_done(self, tracker_id: str) -> None:
+        """
+        任務完成（不論成功與否）後從資料庫移除，並將等待這個任務的批次任務排入佇列。
+        """
+        with self._lock:
+            connection: sqlite3.Connection = self._get_connection()
+            connection.execute("DELETE FROM submission WHERE tracker_id = ?", (tracker_id,))
+            followers: list[tuple[str, float]] = connection.execute(
+                "SELECT tracker_id, enqueued_at FROM submission WHERE leader = ? AND state = ? ORDER BY rowid",
+                (tracker_id, SubmissionState.HELD)
+            ).fetchall()
+            connection.execute(
+                "UPDATE submission SET state = ?, leader = NULL WHERE leader = ? AND state = ?",
+                (SubmissionState.QUEUED, tracker_id, SubmissionState.HELD)
+            )
+            connection.commit()
+        self._push(followers)
+
+    def requeue(self, tracker_id: str) -> None:
+        """
+        將中斷的任務放回佇列的最前面。
+        """
+        with self._lock:
+            connection: sqlite3.Connection = self._get_connection()
+            connection.execute(
+                "UPDATE submission SET state = ?, box_id = NULL WHERE tracker_id = ?", (SubmissionState.QUEUED, tracker_id)
+            )
+            connection.commit()
+        with self._condition:
+            self._queued.appendleft((tracker_id, time.time()))
+            self._condition.notify()
+
+    def recover(self) -> tuple[list[str], list[tuple[str, int | None, int]]]:
+        """
+        將上次關閉前排隊中的任務依照排入的順序放回佇列，回傳還在等待的任務（排隊中與等待批次第一個任務的 tracker_id），
+        以及執行到一半被中斷的任務 (tracker_id, box_id, attempts)，由呼叫者決定要重新排入（requeue）或是標記為失敗（mark_done）。
+        """
+        with self._lock:
+            connection: sqlite3.Connection = self._get_connection()
+            connection.execute(
+                "UPDATE submission SET state = ?, leader = NULL WHERE state = ? AND leader NOT IN "
+                "(SELECT tracker_id FROM submission WHERE state != ?)",
+                (SubmissionState.QUEUED, SubmissionState.HELD, SubmissionState.HELD)
+            )
+            connection.commit()
+            queued: list[tuple[str, float]] = connection.execute(
+                "SELECT tracker_id, enqueued_at FROM submission WHERE state = ? ORDER BY enqueued_at, rowid", (SubmissionState.QUEUED,)
+            ).fetchall()
+            held: list[tuple[str]] = connection.execute(
+                "SELECT tracker_id FROM submission WHERE state = ? ORDER BY rowid", (SubmissionState.HELD,)
+            ).fetchall()
+            interrupted: list[tuple[str, int | None, int]] = connection.execute(
+                "SELECT tracker_id, box_id, attempts FROM submission WHERE state = ? ORDER BY started_at", (SubmissionState.RUNNING,)
+            ).fetchall()
+        with self._condition:
+            self._queued.clear()
+        self._push(queued)
+        waiting: list[str] = [tracker_id for tracker_id, _ in queued] + [tracker_id for tracker_id, in held]
+        return waiting, interrupted
+
+    def _push(self, entries: list[tuple[str, float]]) -> None:
+        if len(entries) == 0:
+            return
+        with self._condition:
+            self._queued.extend(entries)
+            self._condition.notify(len(entries))
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is not None:
+            return self._connection
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        # WAL 與 synchronous = NORMAL 時 commit 不需要等待 fsync，程式當掉時已經 commit 的資料仍然會保留。
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS submission ("
+            "tracker_id TEXT PRIMARY KEY, state INTEGER NOT NULL, leader TEXT, box_id INTEGER, "
+            "attempts INTEGER NOT NULL DEFAULT 0, enqueued_at REAL NOT NULL, started_at REAL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS submission_leader ON submission (leader)")
+        connection.commit()
+        self._connection = connection
+        return connection
@@ -0,0 +1,121 @@
+"""
+The packed testcase format, all inputs of a testcase set are stored in one file with an offset index:
+
+    magic (8 bytes) | count (uint64) | count * (offset, length) (uint64, uint64) | input data ...
+
+The pack is memory-mapped, and each input is copied to the box in chunks without building a Python string.
+
+    python3 -m storage.testcase_pack convert <json_path> <pack_path>
+    python3 -m storage.testcase_pack upload <json_or_pack_path> <object_name>
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Final
+
+MAGIC: Final[bytes] = b"NUOJTCP1"
+HEADER: Final[struct.Struct] = struct.Struct("<8sQ")
+INDEX_ENTRY: Final[struct.Struct] = struct.Struct("<QQ")
+CHUNK_SIZE: Final[int] = 1 << 20
+
+
+class MappedTestcasePack:
+    def __init__(self, path: str | Path) -> None:
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = HEADER.unpack_from(self._mmap, 0) if len(self._mmap) >= HEADER.size else (b"", 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a testcase pack.")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> "MappedTestcasePack":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def get_range(self, index: int) -> tuple[int, int]:
+        if not 0 <= index < self._count:
+            raise IndexError(f"Testcase index {index} out of range.")
+        return INDEX_ENTRY.unpack_from(self._mmap, HEADER.size + index * INDEX_ENTRY.size)
+
+    def read(self, index: int) -> bytes:
+        offset, length = self.get_range(index)
+        return self._mmap[offset:offset + length]
+
+    def write_to(self, index: int, destination: str | Path) -> None:
+        """
+        將第 index 筆測資直接從 mmap 分段寫入目標檔案。
+        """
+        offset, length = self.get_range(index)
+        with memoryview(self._mmap) as view, open(destination, "wb") as file:
+            for position in range(offset, offset + length, CHUNK_SIZE):
+                file.write(view[position:min(position + CHUNK_SIZE, offset + length)])
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+
+def write_testcase_pack(test_case_list: list[str | bytes], pack_path: str | Path) -> None:
+    """
+    將測資寫成 pack，先寫到暫存檔再改名，讀取中的 pack 不會看到寫到一半的內容。
+    """
+    data_list: list[bytes] = [
+        test_case.encode("utf-8") if isinstance(test_case, str) else test_case for test_case in test_case_list
+    ]
+    temporary_path: str = f"{pack_path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(data_list)))
+        offset: int = HEADER.size + INDEX_ENTRY.size * len(data_list)
+        for data in data_list:
+            file.write(INDEX_ENTRY.pack(offset, len(data)))
+            offset += len(data)
+        for data in data_list:
+            file.write(data)
+    os.rename(temporary_path, pack_path)
+
+
+def convert_json_to_testcase_pack(json_path: str | Path, pack_path: str | Path) -> None:
+    with open(json_path, "r") as file:
+        test_case_list: list[str] = json.loads(file.read())
+    write_testcase_pack(test_case_list, pack_path)
+
+
+def is_testcase_pack(path: str | Path) -> bool:
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def _upload_testcase_pack(path: str, object_name: str) -> None:
+    from flask import Flask
+
+    from setting.util import SettingBuilder
+    from storage.minio_util import upload
+
+    pack_path: str = path
+    if not is_testcase_pack(path):
+        pack_path = f"{path}.pack"
+        convert_json_to_testcase_pack(path, pack_path)
+
+    app = Flask(__name__)
+    app.config["setting"] = SettingBuilder().from_file("setting.json")
+    with app.app_context():
+        upload("testcase", object_name, pack_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("convert", "upload"):
+        print(__doc__)
+        exit(1)
+
+    if sys.argv[1] == "convert":
+        convert_json_to_testcase_pack(sys.argv[2], sys.argv[3])
+    else:
+        _upload_testcase_pack(sys.argv[2], sys.argv[3])
@@ -1,5 +1,8 @@
 import json
+import os
+import threading
 from os import environ
+from queue import Queue
 
 from http import HTTPStatus
 from time import sleep
@@ -9,6 +12,9 @@ import pytest
 from flask.testing import FlaskClient
 from werkzeug.test import TestResponse
 
+import api.judge.util
+from utils.sandbox.status.util import StatusNotifier
+
 @pytest.fixture
 def payload(user_code: str, checker_code: str) -> dict[str, Any]:
     return {
@@ -61,6 +67,10 @@ def replace_time_and_memory_attribute(payload: dict[str, Any]) -> dict[str, Any]
             payload["data"]["judge_detail"][i]["runtime_info"]["submit"]["memory"] = "0"
             payload["data"]["judge_detail"][i]["runtime_info"]["checker"]["time"] = "0"
             payload["data"]["judge_detail"][i]["runtime_info"]["checker"]["memory"] = "0"
+            for runtime_info in payload["data"]["judge_detail"][i]["runtime_info"].values():
+                if "elapsed_ns" in runtime_info:
+                    runtime_info["elapsed_ns"] = 0
+                    runtime_info["overhead_ns"] = 0
 
     return payload
 
@@ -100,24 +110,42 @@ class TestSubmit:
                     {
                         "verdict": "AC",
                         "output_set": {
-                            "submit": "5",
-                            "answer": "5"
+                            "submit": {
+                                "head": "5",
+                                "tail": "",
+                                "size": 1,
+                                "sha256": "ef2d127de37b942baad06145e54b0c619a1f22327b2ebbcfbec78f5564afe39d",
+                                "truncated": False
+                            },
+                            "answer": {
+                                "head": "5",
+                                "tail": "",
+                                "size": 1,
+                                "sha256": "ef2d127de37b942baad06145e54b0c619a1f22327b2ebbcfbec78f5564afe39d",
+                                "truncated": False
+                            }
                         },
                         "runtime_info": {
                             "solution": {
                                 "time": "0.002",
                                 "memory": "3656",
-                                "exitcode": "0"
+                                "exitcode": "0",
+                                "elapsed_ns": 0,
+                                "overhead_ns": 0
                             },
                             "submit": {
                                 "time": "0.002",
                                 "memory": "3560",
-                                "exitcode": "0"
+                                "exitcode": "0",
+                                "elapsed_ns": 0,
+                                "overhead_ns": 0
                             },
                             "checker": {
                                 "time": "0.002",
                                 "memory": "3884",
-                                "exitcode": "0"
+                                "exitcode": "0",
+                                "elapsed_ns": 0,
+                                "overhead_ns": 0
                             }
                         },
                         "log": "ok single line: '5'\n"
@@ -125,24 +153,42 @@ class TestSubmit:
                     {
                         "verdict": "AC",
                         "output_set": {
-                            "submit": "7",
-                            "answer": "7"
+                            "submit": {
+                                "head": "7",
+                                "tail": "",
+                                "size": 1,
+                                "sha256": "7902699be42c8a8e46fbbb4501726517e86b22c56a189f7625a6da49081b2451",
+                                "truncated": False
+                            },
+                            "answer": {
+                                "head": "7",
+                                "tail": "",
+                                "size": 1,
+                                "sha256": "7902699be42c8a8e46fbbb4501726517e86b22c56a189f7625a6da49081b2451",
+                                "truncated": False
+                            }
                         },
                         "runtime_info": {
                             "solution": {
                                 "time": "0.002",
                                 "memory": "3628",
-                                "exitcode": "0"
+                                "exitcode": "0",
+                                "elapsed_ns": 0,
+                                "overhead_ns": 0
                             },
                             "submit": {
                                 "time": "0.002",
                                 "memory": "3656",
-                                "exitcode": "0"
+                                "exitcode": "0",
+                                "elapsed_ns": 0,
+                                "overhead_ns": 0
                             },
                             "checker": {
                                 "time": "0.003",
                                 "memory": "3832",
-                                "exitcode": "0"
+                                "exitcode": "0",
+                                "elapsed_ns": 0,
+                                "overhead_ns": 0
                             }
                         },
                         "log": "ok single line: '7'\n"
@@ -156,6 +202,23 @@ class TestSubmit:
         json: dict[str, Any] = response.get_json(silent=True)
         assert replace_time_and_memory_attribute(json) == replace_time_and_memory_attribute(expected_payload)
 
+    def test_submit_with_unknown_comparator_should_respond_bad_request(self, client: FlaskClient, payload: dict[str, Any]):
+        payload["options"]["comparator"] = "unknown"
+
+        response: TestResponse = client.post("/api/judge", json=payload)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert os.listdir(f"{client.application.config['STORAGE_PATH']}/submission") == []
+
+    def test_submit_checker_comparator_without_checker_code_should_respond_bad_request(self, client: FlaskClient, payload: dict[str, Any]):
+        payload["options"]["comparator"] = "checker"
+        payload.pop("checker_code")
+
+        response: TestResponse = client.post("/api/judge", json=payload)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert os.listdir(f"{client.application.config['STORAGE_PATH']}/submission") == []
+
     def test_submit_code_with_threading_should_respond_http_status_code_ok(self, client: FlaskClient, payload: dict[str, Any]):
         payload["options"]["threading"] = True
         
@@ -175,6 +238,7 @@ class TestSubmit:
         
         assert response.status_code == HTTPStatus.OK
         assert response.json["data"]["judge_detail"][0]["verdict"] == "AC"  
+        assert client.application.config["webhook_dispatcher"].join(timeout=30)
         out, _ = capfd.readouterr()
         assert "send successfully" in out.split("\n")[-2]
 
@@ -186,6 +250,7 @@ class TestSubmit:
         
         assert response.status_code == HTTPStatus.OK
         assert response.json["data"]["compile_detail"]["submit"]["exitcode"] == "1"  
+        assert client.application.config["webhook_dispatcher"].join(timeout=30)
         out, _ = capfd.readouterr()
         assert "has error that occur result" in out.split("\n")[-2]
 
@@ -196,9 +261,9 @@ class TestSubmit:
         
         assert response.status_code == HTTPStatus.OK
         assert response.json["data"]["compile_detail"]["submit"]["exitcode"] == "0"  
+        assert client.application.config["webhook_dispatcher"].join(timeout=30)
         out, _ = capfd.readouterr()
-        assert "debug serve webhook_url" in out.split("\n")[0]
-        assert "send successfully" in out.split("\n")[0]
+        assert any("debug serve webhook_url" in line and "send successfully" in line for line in out.split("\n"))
 
 
 def _wait_status_finished(client: FlaskClient, tracker_id: str):
@@ -215,3 +280,67 @@ def _wait_status_finished(client: FlaskClient, tracker_id: str):
             attempt += 1
             continue
         break
+
+
+class TestBatchSubmit:
+    def test_submit_batch_should_respond_a_tracker_id_for_each_user_code(self, client: FlaskClient, payload: dict[str, Any], monkeypatch: pytest.MonkeyPatch):
+        finished: Queue[str] = Queue()
+        monkeypatch.setattr(api.judge.util, "execute_task_with_specific_tracker_id", lambda tracker_id, box_id: finished.put(tracker_id) or client.application.config["box_pool"].release(box_id))
+        payload["options"]["threading"] = True
+        payload["user_codes"] = [payload.pop("user_code")] * 3
+
+        response: TestResponse = client.post("/api/judge/batch", json=payload)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json["status"] == "OK"
+        assert response.json["type"] == "Judge"
+        assert len(set(response.json["tracker_ids"])) == 3
+        assert sorted(finished.get(timeout=5) for _ in range(3)) == sorted(response.json["tracker_ids"])
+
+    def test_submit_batch_should_store_the_shared_material_once(self, client: FlaskClient, payload: dict[str, Any], monkeypatch: pytest.MonkeyPatch):
+        finished: Queue[str] = Queue()
+        monkeypatch.setattr(api.judge.util, "execute_task_with_specific_tracker_id", lambda tracker_id, box_id: finished.put(tracker_id) or client.application.config["box_pool"].release(box_id))
+        payload["options"]["threading"] = True
+        payload["user_codes"] = [payload.pop("user_code")] * 2
+        storage_path: str = client.application.config["STORAGE_PATH"]
+
+        response: TestResponse = client.post("/api/judge/batch", json=payload)
+
+        with open(f"{storage_path}/submission/batch/{response.json['batch_id']}.json") as file:
+            assert "user_codes" not in json.loads(file.read())
+        for tracker_id in response.json["tracker_ids"]:
+            with open(f"{storage_path}/submission/{tracker_id}.json") as file:
+                assert json.loads(file.read()) == {"batch_id": response.json["batch_id"], "user_code": payload["user_codes"][0]}
+        assert sorted(finished.get(timeout=5) for _ in range(2)) == sorted(response.json["tracker_ids"])
+
+    def test_submit_batch_with_invalid_comparator_should_respond_bad_request(self, client: FlaskClient, payload: dict[str, Any]):
+        payload["user_codes"] = [payload.pop("user_code")] * 2
+        payload["options"]["comparator"] = "unknown"
+        assert client.post("/api/judge/batch", json=payload).status_code == HTTPStatus.BAD_REQUEST
+
+        payload["options"]["comparator"] = "checker"
+        payload.pop("checker_code")
+        assert client.post("/api/judge/batch", json=payload).status_code == HTTPStatus.BAD_REQUEST
+
+    def test_submit_batch_larger_than_the_status_capacity_should_keep_every_queued_tracker_id(self, client: FlaskClient, payload: dict[str, Any], monkeypatch: pytest.MonkeyPatch):
+        started = threading.Event()
+        finished: Queue[str] = Queue()
+
+        def fake_task(tracker_id: str, box_id: int) -> None:
+            started.wait(timeout=5)
+            finished.put(tracker_id)
+            client.application.config["box_pool"].release(box_id)
+
+        monkeypatch.setattr(api.judge.util, "execute_task_with_specific_tracker_id", fake_task)
+        client.application.config["status_notifier"] = StatusNotifier(capacity=2)
+        payload["options"]["threading"] = True
+        payload["user_codes"] = [payload.pop("user_code")] * 4
+
+        response: TestResponse = client.post("/api/judge/batch", json=payload)
+
+        for tracker_id in response.json["tracker_ids"]:
+            wait_response: TestResponse = client.get(f"/api/result/{tracker_id}/wait?timeout=0.01")
+            assert wait_response.status_code == HTTPStatus.ACCEPTED
+            assert wait_response.json["status"] == "Pending"
+        started.set()
+        assert sorted(finished.get(timeout=5) for _ in range(4)) == sorted(response.json["tracker_ids"])
@@ -0,0 +1,92 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from queue import Queue
+from typing import Any
+
+import pytest
+from flask import Flask
+
+import api.judge.util
+from storage.result_store import ResultStore
+from storage.submission_queue import SubmissionQueue
+from utils.sandbox.box.util import BoxPool
+from utils.sandbox.enum import StatusType
+from utils.sandbox.status.util import StatusNotifier
+
+
+class TestDispatcher:
+    def test_queued_submission_should_start_with_an_acquired_box(self, app: Flask, monkeypatch: pytest.MonkeyPatch):
+        started: Queue[tuple[str, int]] = Queue()
+        monkeypatch.setattr(api.judge.util, "execute_task_with_specific_tracker_id", lambda tracker_id, box_id: started.put((tracker_id, box_id)))
+        submission_queue: Queue[str] = app.config["submission"]
+        box_pool: BoxPool = app.config["box_pool"]
+
+        submission_queue.put("tracker_id")
+
+        tracker_id, box_id = started.get(timeout=5)
+        assert tracker_id == "tracker_id"
+        assert box_id not in [box_pool.acquire() for _ in range(box_pool.get_available_count())]
+
+
+class TestFailedTask:
+    def test_failed_task_should_store_the_error_and_publish_finish(self, app: Flask):
+        result_store: ResultStore = app.config["result_store"]
+        status_notifier: StatusNotifier = app.config["status_notifier"]
+        box_pool: BoxPool = app.config["box_pool"]
+
+        with app.app_context():
+            with pytest.raises(FileNotFoundError):
+                api.judge.util.execute_task_with_specific_tracker_id("missing", box_pool.acquire())
+
+        assert status_notifier.get_statuses("missing")[-1] == StatusType.FINISH
+        assert json.loads(result_store.get_raw("missing"))["result"]["error"].startswith("The task failed:")
+
+
+class TestBatch:
+    def test_batch_followers_should_be_enqueued_after_the_leader_finished(self, app: Flask, monkeypatch: pytest.MonkeyPatch):
+        events: Queue[str] = Queue()
+        box_pool: BoxPool = app.config["box_pool"]
+
+        def fake_task(tracker_id: str, box_id: int) -> None:
+            events.put(f"start {tracker_id}")
+            if tracker_id == "leader":
+                time.sleep(0.2)
+            events.put(f"finish {tracker_id}")
+            box_pool.release(box_id)
+
+        submission_queue: SubmissionQueue = app.config["submission"]
+        mark_done = submission_queue.mark_done
+        done: Queue[str] = Queue()
+
+        def mark_done_and_notify(tracker_id: str) -> None:
+            mark_done(tracker_id)
+            done.put(tracker_id)
+
+        monkeypatch.setattr(api.judge.util, "execute_task_with_specific_tracker_id", fake_task)
+        monkeypatch.setattr(submission_queue, "mark_done", mark_done_and_notify)
+        submission_queue.put_batch(["leader", "first", "second"])
+
+        received: list[str] = [events.get(timeout=5) for _ in range(6)]
+        assert received[:2] == ["start leader", "finish leader"]
+        assert sorted(received[2:]) == ["finish first", "finish second", "start first", "start second"]
+        assert sorted(done.get(timeout=5) for _ in range(3)) == ["first", "leader", "second"]
+        with closing(sqlite3.connect(f"file:{submission_queue.path}?mode=ro", uri=True)) as connection:
+            assert connection.execute("SELECT COUNT(*) FROM submission").fetchone() == (0,)
+
+    def test_fetch_batch_submission_should_merge_the_shared_material(self, app: Flask):
+        storage_path: str = app.config["STORAGE_PATH"]
+        os.makedirs(f"{storage_path}/submission/batch", exist_ok=True)
+        with open(f"{storage_path}/submission/batch/batch.json", "w") as file:
+            file.write(json.dumps({"execute_type": "Judge", "options": {"threading": True}}))
+        with open(f"{storage_path}/submission/tracker.json", "w") as file:
+            file.write(json.dumps({"batch_id": "batch", "user_code": {"code": "code", "compiler": "c++14"}}))
+
+        with app.app_context():
+            submission_data: dict[str, Any] = api.judge.util._fetch_json_object_from_storage("tracker")
+
+        assert submission_data["execute_type"] == "Judge"
+        assert submission_data["options"] == {"threading": True}
+        assert submission_data["user_code"] == {"code": "code", "compiler": "c++14"}
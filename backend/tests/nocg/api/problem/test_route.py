@@ -0,0 +1,179 @@
+import json
+from http import HTTPStatus
+from typing import Any
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from werkzeug.test import TestResponse
+
+import api.judge.route
+import api.judge.util
+import api.problem.route
+import api.problem.util
+from api.problem.util import merge_problem_package, prepare_problem, resume_problem_preparation
+
+
+@pytest.fixture
+def problem_payload(user_code: str, checker_code: str) -> dict[str, Any]:
+    return {
+        "problem_id": "a-plus-b",
+        "solution_code": {"code": user_code, "compiler": "c++14"},
+        "checker_code": {"code": checker_code, "compiler": "c++14"},
+        "test_case": [{"type": "plain-text", "value": "5"}],
+        "options": {"time": 1, "wall_time": 2, "memory": 65536}
+    }
+
+
+@pytest.fixture
+def skip_preparation(monkeypatch: pytest.MonkeyPatch) -> list[tuple[str, str]]:
+    prepared: list[tuple[str, str]] = []
+    monkeypatch.setattr(api.problem.route, "prepare_problem_in_background", lambda problem_id, version: prepared.append((problem_id, version)))
+    return prepared
+
+
+class TestRegisterProblem:
+    def test_register_problem_should_respond_the_version(self, client: FlaskClient, problem_payload: dict[str, Any], skip_preparation: list[tuple[str, str]]):
+        response: TestResponse = client.post("/api/problem", json=problem_payload)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json["problem_id"] == "a-plus-b"
+        assert skip_preparation == [("a-plus-b", response.json["version"])]
+
+    def test_register_the_same_package_twice_should_prepare_it_once(self, client: FlaskClient, problem_payload: dict[str, Any], skip_preparation: list[tuple[str, str]]):
+        first: TestResponse = client.post("/api/problem", json=problem_payload)
+        second: TestResponse = client.post("/api/problem", json=problem_payload)
+
+        assert first.json["version"] == second.json["version"]
+        assert len(skip_preparation) == 1
+
+    def test_register_a_changed_package_should_create_a_new_version(self, client: FlaskClient, problem_payload: dict[str, Any], skip_preparation: list[tuple[str, str]]):
+        first: TestResponse = client.post("/api/problem", json=problem_payload)
+        problem_payload["options"]["time"] = 2
+        second: TestResponse = client.post("/api/problem", json=problem_payload)
+
+        assert first.json["version"] != second.json["version"]
+        assert client.get("/api/problem/a-plus-b/").json["version"] == second.json["version"]
+
+    def test_get_status_of_registered_problem_should_respond_preparing(self, client: FlaskClient, problem_payload: dict[str, Any], skip_preparation: list[tuple[str, str]]):
+        version: str = client.post("/api/problem", json=problem_payload).json["version"]
+
+        response: TestResponse = client.get(f"/api/problem/a-plus-b/{version}")
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json["status"] == "Preparing"
+
+    def test_get_status_of_unknown_problem_should_respond_not_found(self, client: FlaskClient):
+        assert client.get("/api/problem/unknown/").status_code == HTTPStatus.NOT_FOUND
+        assert client.get("/api/problem/unknown/0123456789abcdef").status_code == HTTPStatus.NOT_FOUND
+
+    def test_register_problem_with_invalid_id_should_respond_bad_request(self, client: FlaskClient, problem_payload: dict[str, Any], skip_preparation: list[tuple[str, str]]):
+        for problem_id in ["../submission", ".hidden", "a/b", "", 1]:
+            problem_payload["problem_id"] = problem_id
+
+            assert client.post("/api/problem", json=problem_payload).status_code == HTTPStatus.BAD_REQUEST
+        problem_payload.pop("problem_id")
+        assert client.post("/api/problem", json=problem_payload).status_code == HTTPStatus.BAD_REQUEST
+        assert skip_preparation == []
+
+    def test_get_status_with_invalid_version_should_respond_bad_request(self, client: FlaskClient):
+        assert client.get("/api/problem/a-plus-b/..%2F..%2Fsubmission").status_code in (HTTPStatus.BAD_REQUEST, HTTPStatus.NOT_FOUND)
+        assert client.get("/api/problem/a-plus-b/not-a-version").status_code == HTTPStatus.BAD_REQUEST
+
+
+class TestProblemSubmission:
+    def test_merge_problem_package_should_use_the_package_and_its_limits(self, app: Flask, client: FlaskClient, problem_payload: dict[str, Any], skip_preparation: list[tuple[str, str]]):
+        version: str = client.post("/api/problem", json=problem_payload).json["version"]
+
+        with app.app_context():
+            submission_data: dict[str, Any] = merge_problem_package({
+                "problem": {"id": "a-plus-b", "version": version},
+                "user_code": {"code": "code", "compiler": "c++14"},
+                "options": {"threading": True, "time": 10}
+            })
+
+        assert submission_data["solution_code"] == problem_payload["solution_code"]
+        assert submission_data["checker_code"] == problem_payload["checker_code"]
+        assert submission_data["test_case"] == problem_payload["test_case"]
+        assert submission_data["options"] == {"threading": True, "time": 1, "wall_time": 2, "memory": 65536}
+
+    def test_submit_with_problem_reference_should_fetch_the_package(self, app: Flask, client: FlaskClient, problem_payload: dict[str, Any], skip_preparation: list[tuple[str, str]], monkeypatch: pytest.MonkeyPatch):
+        client.post("/api/problem", json=problem_payload)
+        monkeypatch.setattr(api.judge.route, "execute_task_with_specific_tracker_id", lambda tracker_id: {"tracker_id": tracker_id})
+
+        response: TestResponse = client.post("/api/judge", json={
+            "problem": {"id": "a-plus-b"},
+            "user_code": {"code": "code", "compiler": "c++14"},
+            "execute_type": "Judge",
+            "options": {"threading": False}
+        })
+
+        with app.app_context():
+            submission_data: dict[str, Any] = api.judge.util._fetch_json_object_from_storage(response.json["tracker_id"])
+        assert submission_data["solution_code"] == problem_payload["solution_code"]
+        assert submission_data["options"]["memory"] == 65536
+
+
+    @pytest.mark.parametrize("problem", [
+        {"id": "a-plus-b", "version": "../../submission/tracker"},
+        {"id": "../submission", "version": "0123456789abcdef"},
+        {"id": "a-plus-b", "version": 1},
+        "a-plus-b",
+    ])
+    def test_submit_with_invalid_problem_reference_should_respond_bad_request(self, app: Flask, client: FlaskClient, problem_payload: dict[str, Any], skip_preparation: list[tuple[str, str]], problem: Any):
+        client.post("/api/problem", json=problem_payload)
+        storage_path: str = app.config["STORAGE_PATH"]
+        with open(f"{storage_path}/submission/tracker.json", "w") as file:
+            file.write(json.dumps(problem_payload))
+
+        response: TestResponse = client.post("/api/judge", json={
+            "problem": problem,
+            "user_code": {"code": "code", "compiler": "c++14"},
+            "execute_type": "Judge",
+            "options": {"threading": False}
+        })
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_submit_with_unknown_problem_version_should_respond_not_found(self, client: FlaskClient, problem_payload: dict[str, Any], skip_preparation: list[tuple[str, str]]):
+        client.post("/api/problem", json=problem_payload)
+
+        response: TestResponse = client.post("/api/judge/batch", json={
+            "problem": {"id": "a-plus-b", "version": "0123456789abcdef"},
+            "user_codes": [{"code": "code", "compiler": "c++14"}],
+            "execute_type": "Judge",
+            "options": {"threading": False}
+        })
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_merge_problem_package_with_traversal_version_should_raise_value_error(self, app: Flask):
+        with app.app_context():
+            with pytest.raises(ValueError):
+                merge_problem_package({"problem": {"id": "a-plus-b", "version": "../../submission/tracker"}})
+
+
+class TestPrepareProblem:
+    def test_prepare_problem_should_compile_and_compute_every_answer(self, app: Flask, client: FlaskClient, cleanup_test_sandbox: None, problem_payload: dict[str, Any], skip_preparation: list[tuple[str, str]]):
+        version: str = client.post("/api/problem", json=problem_payload).json["version"]
+
+        with app.app_context():
+            status: dict[str, Any] = prepare_problem("a-plus-b", version)
+
+        assert status["status"] == "Ready"
+        assert status["answers"] == 1
+        assert client.get(f"/api/problem/a-plus-b/{version}").json["status"] == "Ready"
+
+    def test_resume_problem_preparation_should_prepare_the_interrupted_versions_again(self, app: Flask, client: FlaskClient, problem_payload: dict[str, Any], skip_preparation: list[tuple[str, str]], monkeypatch: pytest.MonkeyPatch):
+        version: str = client.post("/api/problem", json=problem_payload).json["version"]
+        problem_payload["problem_id"] = "ready"
+        ready_version: str = client.post("/api/problem", json=problem_payload).json["version"]
+        with open(f"{app.config['STORAGE_PATH']}/problem/ready/{ready_version}.status.json", "w") as file:
+            file.write(json.dumps({"status": "Ready"}))
+        resumed: list[tuple[str, str]] = []
+        monkeypatch.setattr(api.problem.util, "prepare_problem_in_background", lambda problem_id, version: resumed.append((problem_id, version)))
+
+        with app.app_context():
+            resume_problem_preparation()
+
+        assert resumed == [("a-plus-b", version)]
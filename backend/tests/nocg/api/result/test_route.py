@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+from http import HTTPStatus
+
+from flask import Flask
+from flask.testing import FlaskClient
+
+from storage.result_store import ResultStore
+from utils.sandbox.enum import StatusType
+from utils.sandbox.status.util import StatusNotifier
+
+
+class TestResult:
+    def test_get_result_should_respond_the_stored_result(self, app: Flask, client: FlaskClient):
+        result_store: ResultStore = app.config["result_store"]
+        result_store.put("tracker", "Finish", b'{"status": "Finish", "flow": {}, "result": {}}')
+
+        response = client.get("/api/result/tracker/")
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.data == b'{"status": "Finish", "flow": {}, "result": {}}'
+        assert response.mimetype == "application/json"
+
+    def test_get_unknown_result_should_respond_not_found(self, client: FlaskClient):
+        response = client.get("/api/result/unknown/")
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_list_result_with_status_should_respond_the_results_with_the_status(self, app: Flask, client: FlaskClient):
+        result_store: ResultStore = app.config["result_store"]
+        result_store.put("first", "Finish", b"{}")
+        result_store.put("second", "Running", b"{}")
+
+        response = client.get("/api/result/?status=Finish")
+
+        assert response.status_code == HTTPStatus.OK
+        assert [result["tracker_id"] for result in response.json["results"]] == ["first"]
+
+
+class TestResultWait:
+    def test_wait_should_respond_the_result_after_the_task_finished(self, app: Flask, client: FlaskClient):
+        result_store: ResultStore = app.config["result_store"]
+        status_notifier: StatusNotifier = app.config["status_notifier"]
+        status_notifier.publish("tracker", StatusType.PENDING)
+
+        def finish_task():
+            result_store.put("tracker", "Finish", b'{"status": "Finish"}')
+            status_notifier.publish("tracker", StatusType.FINISH)
+
+        threading.Timer(0.05, finish_task).start()
+        response = client.get("/api/result/tracker/wait?timeout=5")
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.data == b'{"status": "Finish"}'
+
+    def test_wait_with_unfinished_task_should_respond_accepted_with_current_status(self, app: Flask, client: FlaskClient):
+        status_notifier: StatusNotifier = app.config["status_notifier"]
+        status_notifier.publish("tracker", StatusType.RUNNING)
+
+        response = client.get("/api/result/tracker/wait?timeout=0.05")
+
+        assert response.status_code == HTTPStatus.ACCEPTED
+        assert response.json == {"tracker_id": "tracker", "status": "Running"}
+
+    def test_wait_with_unknown_tracker_id_should_respond_not_found_without_waiting(self, app: Flask, client: FlaskClient):
+        status_notifier: StatusNotifier = app.config["status_notifier"]
+
+        start_time: float = time.monotonic()
+        response = client.get("/api/result/unknown/wait?timeout=5")
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        assert time.monotonic() - start_time < 1
+        assert "unknown" not in status_notifier._statuses
+
+
+class TestResultEvents:
+    def test_events_should_stream_every_status_transition_and_the_result(self, app: Flask, client: FlaskClient):
+        result_store: ResultStore = app.config["result_store"]
+        status_notifier: StatusNotifier = app.config["status_notifier"]
+        status_notifier.publish("tracker", StatusType.PENDING)
+
+        def run_task():
+            status_notifier.publish("tracker", StatusType.INITIAL)
+            status_notifier.publish("tracker", StatusType.RUNNING)
+            result_store.put("tracker", "Finish", b'{"status": "Finish"}')
+            status_notifier.publish("tracker", StatusType.FINISH)
+
+        threading.Timer(0.05, run_task).start()
+        response = client.get("/api/result/tracker/events?timeout=5")
+        events = [event for event in response.get_data(as_text=True).split("\n\n") if event.startswith("event:")]
+
+        assert response.mimetype == "text/event-stream"
+        assert [event.split("\n")[0] for event in events] == ["event: status"] * 4 + ["event: result"]
+        assert [json.loads(event.split("\n")[1][len("data: "):])["status"] for event in events[:4]] == ["Pending", "Initial", "Running", "Finish"]
+        assert events[4].split("\n")[1] == 'data: {"status": "Finish"}'
+
+    def test_events_with_unknown_tracker_id_should_respond_not_found(self, client: FlaskClient):
+        response = client.get("/api/result/unknown/events?timeout=5")
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,37 @@
+from http import HTTPStatus
+
+from flask import Flask
+from flask.testing import FlaskClient
+
+from utils.isolate.util import cleanup_sandbox
+from utils.metrics.util import isolate_invocations
+from utils.sandbox.box.util import BoxPool
+
+
+class TestMetrics:
+    def test_metrics_should_respond_the_prometheus_text_format(self, client: FlaskClient):
+        response = client.get("/metrics")
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.mimetype == "text/plain"
+        assert "# TYPE nuoj_queue_depth gauge" in response.text
+        assert "# TYPE nuoj_queue_wait_seconds histogram" in response.text
+        assert "# TYPE nuoj_phase_duration_seconds histogram" in response.text
+        assert "# TYPE nuoj_minio_fetched_bytes_total counter" in response.text
+
+    def test_metrics_should_report_the_queue_depth_and_free_boxes(self, app: Flask, client: FlaskClient):
+        box_pool: BoxPool = app.config["box_pool"]
+
+        lines: list[str] = client.get("/metrics").text.splitlines()
+
+        assert "nuoj_queue_depth 0.0" in lines
+        assert f"nuoj_free_boxes {box_pool.get_available_count():.1f}" in lines
+
+    def test_metrics_should_report_the_isolate_invocations(self, app: Flask, client: FlaskClient):
+        with app.app_context():
+            cleanup_sandbox(0)
+
+        lines: list[str] = client.get("/metrics").text.splitlines()
+
+        assert f'nuoj_isolate_invocations_total{{action="cleanup"}} {isolate_invocations.get(action="cleanup"):.1f}' in lines
+        assert isolate_invocations.get(action="cleanup") >= 1
@@ -49,4 +49,14 @@ class TestSetting:
         cpp14_compiler_setting = setting.compiler["c++14"]
 
         with raises(Exception):
-            cpp14_compiler_setting.get_source_filename("invalid_filename")
\ No newline at end of file
+            cpp14_compiler_setting.get_source_filename("invalid_filename")
+
+    def test_get_checker_compile_command_with_precompiled_header_should_include_the_header(self, setting: Setting):
+        cpp14_compiler_setting = setting.compiler["c++14"]
+
+        assert cpp14_compiler_setting.get_checker_compile_command("/testlib/testlib.h") == "/usr/bin/g++ -include /testlib/testlib.h --std=c++14 checker.cpp -o checker.o"
+
+    def test_get_header_compile_command_should_compile_the_header_to_gch(self, setting: Setting):
+        cpp14_compiler_setting = setting.compiler["c++14"]
+
+        assert cpp14_compiler_setting.get_header_compile_command("testlib.h") == "/usr/bin/g++ --std=c++14 testlib.h -o testlib.h.gch"
@@ -1,3 +1,4 @@
+import hashlib
 import os
 from copy import deepcopy
 from pathlib import Path
@@ -9,7 +10,9 @@ from minio import Minio
 from pytest import MonkeyPatch, fixture, raises
 
 import storage.minio_util
-from storage.minio_util import download, heartbeat, get_client
+from benchmarks.local_s3 import LocalS3Server
+from setting.util import Setting
+from storage.minio_util import FetchResult, download, fetch, heartbeat, get_client
 
 
 BUCKET_NAME: Final[str] = "testcase"
@@ -17,6 +20,20 @@ FILE_NAME: Final[str] = "test_file"
 FILE_STRING: Final[str] = "test_string"
 
 
+@fixture
+def local_s3(app: Flask) -> LocalS3Server:
+    """
+    將 MinIO 的 endpoint 換成本機的 S3 替身，下載每一段的大小設為 1000 bytes。
+    """
+    with LocalS3Server() as server:
+        setting: Setting = deepcopy(app.config["setting"])
+        setting.minio.endpoint = server.endpoint
+        setting.minio.download_part_size = 1000
+        setting.minio.download_concurrency = 4
+        app.config["setting"] = setting
+        yield server
+
+
 @fixture
 def storage_client(app: Flask) -> Minio:
     with app.app_context():
@@ -91,4 +108,102 @@ class TestMinIOStorage:
                 download(BUCKET_NAME, FILE_NAME, Path(temp_dir) / FILE_NAME)
 
                 with open(Path(temp_dir) / FILE_NAME, "r") as file:
-                    assert file.read() == FILE_STRING
\ No newline at end of file
+                    assert file.read() == FILE_STRING
+
+class TestMinIOClient:
+    def test_get_client_twice_should_return_the_same_client(self, app: Flask):
+        with app.app_context():
+
+            assert get_client() is get_client()
+
+    def test_get_client_with_different_secret_should_return_another_client(self, app: Flask, monkeypatch: MonkeyPatch):
+        with app.app_context():
+            client: Minio = get_client()
+            modified_environ: dict[str, str] = os.environ.copy()
+            modified_environ["MINIO_SECRET_KEY"] = "ANOTHER_SECRET_KEY"
+            monkeypatch.setattr(storage.minio_util, "environ", modified_environ)
+
+            assert get_client() is not client
+            assert get_client()._http is client._http
+
+    def test_heartbeat_should_reuse_the_cached_health_state(self, app: Flask, monkeypatch: MonkeyPatch):
+        modified_environ: dict[str, str] = os.environ.copy()
+        modified_environ["MINIO_SECRET_KEY"] = "CACHED_HEALTH_SECRET_KEY"
+        monkeypatch.setattr(storage.minio_util, "environ", modified_environ)
+        checked_buckets: list[str] = []
+        monkeypatch.setattr(Minio, "bucket_exists", lambda self, bucket_name: checked_buckets.append(bucket_name) or True)
+        with app.app_context():
+
+            assert heartbeat()
+            assert heartbeat()
+            assert heartbeat()
+
+        assert checked_buckets == ["notexistbucket"]
+
+
+class TestRangedFetch:
+    def test_fetch_large_object_should_download_every_range(self, app: Flask, local_s3: LocalS3Server, tmp_path: Path):
+        data: bytes = os.urandom(4500)
+        local_s3.put_object(BUCKET_NAME, FILE_NAME, data)
+        with app.app_context():
+
+            fetch_result: FetchResult | None = fetch(BUCKET_NAME, FILE_NAME, str(tmp_path / FILE_NAME))
+
+        assert fetch_result is not None
+        assert fetch_result.size == 4500
+        assert fetch_result.etag == hashlib.md5(data).hexdigest()
+        assert (tmp_path / FILE_NAME).read_bytes() == data
+        ranges: list[str] = sorted(request["headers"]["Range"] for request in local_s3.requests if "Range" in request["headers"])
+        assert ranges == ["bytes=0-999", "bytes=1000-1999", "bytes=2000-2999", "bytes=3000-3999", "bytes=4000-4499"]
+
+    def test_fetch_small_object_should_use_one_request(self, app: Flask, local_s3: LocalS3Server, tmp_path: Path):
+        local_s3.put_object(BUCKET_NAME, FILE_NAME, b"5 6")
+        with app.app_context():
+
+            fetch(BUCKET_NAME, FILE_NAME, str(tmp_path / FILE_NAME))
+
+        assert (tmp_path / FILE_NAME).read_bytes() == b"5 6"
+        assert len([request for request in local_s3.requests if request["path"] == f"/{BUCKET_NAME}/{FILE_NAME}"]) == 1
+
+    def test_fetch_empty_object_should_create_an_empty_file(self, app: Flask, local_s3: LocalS3Server, tmp_path: Path):
+        local_s3.put_object(BUCKET_NAME, FILE_NAME, b"")
+        with app.app_context():
+
+            fetch_result: FetchResult | None = fetch(BUCKET_NAME, FILE_NAME, str(tmp_path / FILE_NAME))
+
+        assert fetch_result is not None
+        assert (tmp_path / FILE_NAME).read_bytes() == b""
+
+    def test_fetch_with_wrong_checksum_should_raise_and_keep_no_file(self, app: Flask, local_s3: LocalS3Server, tmp_path: Path):
+        local_s3.put_object(BUCKET_NAME, FILE_NAME, os.urandom(2500), {"sha256": "0" * 64})
+        with app.app_context():
+
+            with raises(Exception):
+                fetch(BUCKET_NAME, FILE_NAME, str(tmp_path / FILE_NAME))
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_fetch_with_sha256_metadata_should_verify_it(self, app: Flask, local_s3: LocalS3Server, tmp_path: Path):
+        data: bytes = os.urandom(2500)
+        local_s3.put_object(BUCKET_NAME, FILE_NAME, data, {"sha256": hashlib.sha256(data).hexdigest()})
+        with app.app_context():
+
+            fetch(BUCKET_NAME, FILE_NAME, str(tmp_path / FILE_NAME))
+
+        assert (tmp_path / FILE_NAME).read_bytes() == data
+
+    def test_fetch_with_the_same_etag_should_not_download(self, app: Flask, local_s3: LocalS3Server, tmp_path: Path):
+        data: bytes = os.urandom(2500)
+        local_s3.put_object(BUCKET_NAME, FILE_NAME, data)
+        with app.app_context():
+
+            fetch_result: FetchResult | None = fetch(BUCKET_NAME, FILE_NAME, str(tmp_path / FILE_NAME), hashlib.md5(data).hexdigest())
+
+        assert fetch_result is not None
+        assert not fetch_result.modified
+        assert not (tmp_path / FILE_NAME).exists()
+
+    def test_fetch_unknown_object_should_return_none(self, app: Flask, local_s3: LocalS3Server, tmp_path: Path):
+        with app.app_context():
+
+            assert fetch(BUCKET_NAME, FILE_NAME, str(tmp_path / FILE_NAME)) is None
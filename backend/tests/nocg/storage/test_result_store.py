@@ -0,0 +1,123 @@
+import os
+import time
+from pathlib import Path
+from shutil import rmtree
+from tempfile import mkdtemp
+
+import pytest
+
+import storage.result_store
+from app import create_app
+from storage.result_store import FileResultStore, ResultStore, SQLiteResultStore
+
+
+@pytest.fixture(params=["sqlite", "file"])
+def result_store(request: pytest.FixtureRequest, tmp_path: Path) -> ResultStore:
+    if request.param == "sqlite":
+        return SQLiteResultStore(tmp_path / "result" / "result.db")
+    return FileResultStore(tmp_path / "result")
+
+
+class TestResultStore:
+    def test_get_raw_should_return_the_stored_bytes(self, result_store: ResultStore):
+        result_store.put("tracker", "Finish", b'{"status": "Finish"}')
+
+        assert result_store.get_raw("tracker") == b'{"status": "Finish"}'
+
+    def test_get_raw_with_unknown_tracker_id_should_return_none(self, result_store: ResultStore):
+        assert result_store.get_raw("unknown") is None
+
+    def test_put_twice_should_replace_the_result(self, result_store: ResultStore):
+        result_store.put("tracker", "Running", b"{}")
+        result_store.put("tracker", "Finish", b'{"status": "Finish"}')
+
+        assert result_store.get_raw("tracker") == b'{"status": "Finish"}'
+        assert [result["status"] for result in result_store.query()] == ["Finish"]
+
+    def test_query_with_status_should_only_return_the_results_with_the_status(self, result_store: ResultStore):
+        result_store.put("first", "Finish", b"{}")
+        result_store.put("second", "Running", b"{}")
+
+        assert [result["tracker_id"] for result in result_store.query(status="Finish")] == ["first"]
+
+    def test_query_with_time_range_and_limit_should_return_the_newest_results_in_range(self, result_store: ResultStore):
+        for tracker_id in ["first", "second", "third"]:
+            result_store.put(tracker_id, "Finish", b"{}")
+            time.sleep(0.01)
+
+        assert [result["tracker_id"] for result in result_store.query(limit=2)] == ["third", "second"]
+        assert result_store.query(since=time.time()) == []
+        assert len(result_store.query(until=time.time())) == 3
+
+
+class TestSQLiteResultStore:
+    def test_compact_should_remove_the_expired_results(self, tmp_path: Path):
+        result_store = SQLiteResultStore(tmp_path / "result.db")
+        result_store.put("expired", "Finish", b"{}")
+        time.sleep(0.05)
+        result_store.put("fresh", "Finish", b"{}")
+
+        assert result_store.compact(0.02) == 1
+        assert result_store.get_raw("expired") is None
+        assert result_store.get_raw("fresh") == b"{}"
+
+    def test_import_legacy_results_should_import_and_remove_the_files(self, tmp_path: Path):
+        (tmp_path / "legacy.result").write_bytes(b'{"status": "Finish", "flow": {}, "result": {}}')
+        os.utime(tmp_path / "legacy.result", (1000, 1000))
+        (tmp_path / "filed.result").write_bytes(b"{}")
+        (tmp_path / "filed.status").write_text("Running")
+        result_store = SQLiteResultStore(tmp_path / "result.db")
+
+        assert result_store.import_legacy_results(tmp_path) == 2
+
+        assert result_store.get_raw("legacy") == b'{"status": "Finish", "flow": {}, "result": {}}'
+        assert result_store.query(status="Finish") == [{"tracker_id": "legacy", "status": "Finish", "created_at": 1000, "updated_at": 1000}]
+        assert [result["tracker_id"] for result in result_store.query(status="Running")] == ["filed"]
+        assert list(tmp_path.glob("*.result")) == []
+        assert list(tmp_path.glob("*.status")) == []
+        assert result_store.import_legacy_results(tmp_path) == 0
+
+    def test_import_legacy_results_should_import_in_batches(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(storage.result_store, "LEGACY_IMPORT_BATCH_SIZE", 2)
+        for tracker_id in ["first", "second", "third"]:
+            (tmp_path / f"{tracker_id}.result").write_bytes(b'{"status": "Finish"}')
+        result_store = SQLiteResultStore(tmp_path / "result.db")
+
+        assert result_store.import_legacy_results(tmp_path) == 3
+
+        assert sorted(result["tracker_id"] for result in result_store.query()) == ["first", "second", "third"]
+
+    def test_import_legacy_results_should_not_replace_the_stored_results(self, tmp_path: Path):
+        result_store = SQLiteResultStore(tmp_path / "result.db")
+        result_store.put("tracker", "Finish", b"new")
+        (tmp_path / "tracker.result").write_bytes(b"old")
+
+        result_store.import_legacy_results(tmp_path)
+
+        assert result_store.get_raw("tracker") == b"new"
+
+    def test_create_app_should_import_the_legacy_results(self):
+        storage_path: str = mkdtemp()
+        try:
+            os.makedirs(f"{storage_path}/result")
+            with open(f"{storage_path}/result/legacy.result", "w") as file:
+                file.write('{"status": "Finish"}')
+
+            app = create_app({"STORAGE_PATH": storage_path})
+
+            assert app.config["result_store"].get_raw("legacy") == b'{"status": "Finish"}'
+            assert not os.path.exists(f"{storage_path}/result/legacy.result")
+        finally:
+            rmtree(storage_path)
+
+
+class TestFileResultStore:
+    def test_compact_should_remove_the_expired_results(self, tmp_path: Path):
+        result_store = FileResultStore(tmp_path)
+        result_store.put("expired", "Finish", b"{}")
+        os.utime(tmp_path / "expired.result", (0, 0))
+        result_store.put("fresh", "Finish", b"{}")
+
+        assert result_store.compact(60) == 1
+        assert result_store.get_raw("expired") is None
+        assert result_store.get_raw("fresh") == b"{}"
@@ -0,0 +1,165 @@
+import json
+import threading
+from http import HTTPStatus
+from pathlib import Path
+from queue import Queue
+from shutil import rmtree
+from tempfile import mkdtemp
+
+import pytest
+
+import api.judge.util
+import utils.isolate.util
+import utils.sandbox.box.util
+from app import create_app
+from storage.result_store import ResultStore
+from storage.submission_queue import SubmissionQueue
+from utils.metrics.util import queue_wait_seconds
+
+
+@pytest.fixture
+def queue_path(tmp_path: Path) -> Path:
+    return tmp_path / "queue" / "submission.db"
+
+
+class TestSubmissionQueue:
+    def test_get_should_return_the_tracker_ids_in_order(self, queue_path: Path):
+        submission_queue = SubmissionQueue(queue_path)
+        for tracker_id in ["first", "second", "third"]:
+            submission_queue.put(tracker_id)
+
+        assert submission_queue.qsize() == 3
+        assert [submission_queue.get() for _ in range(3)] == ["first", "second", "third"]
+
+    def test_recover_should_replay_the_queued_tracker_ids_in_order(self, queue_path: Path):
+        submission_queue = SubmissionQueue(queue_path)
+        for tracker_id in ["first", "second", "third"]:
+            submission_queue.put(tracker_id)
+
+        recovered_queue = SubmissionQueue(queue_path)
+        assert recovered_queue.recover() == (["first", "second", "third"], [])
+        assert [recovered_queue.get() for _ in range(3)] == ["first", "second", "third"]
+
+    def test_recover_should_return_the_interrupted_tracker_ids(self, queue_path: Path):
+        submission_queue = SubmissionQueue(queue_path)
+        submission_queue.put("running")
+        submission_queue.put("queued")
+        submission_queue.mark_started(submission_queue.get(), 3)
+
+        recovered_queue = SubmissionQueue(queue_path)
+        assert recovered_queue.recover() == (["queued"], [("running", 3, 1)])
+        assert recovered_queue.qsize() == 1
+
+        recovered_queue.requeue("running")
+        assert [recovered_queue.get() for _ in range(2)] == ["running", "queued"]
+
+    def test_mark_done_should_remove_the_tracker_id(self, queue_path: Path):
+        submission_queue = SubmissionQueue(queue_path)
+        submission_queue.put("tracker")
+        submission_queue.mark_started(submission_queue.get(), 0)
+        submission_queue.mark_done("tracker")
+
+        recovered_queue = SubmissionQueue(queue_path)
+        assert recovered_queue.recover() == ([], [])
+        assert recovered_queue.qsize() == 0
+
+    def test_put_batch_should_hold_the_followers_until_the_leader_is_done(self, queue_path: Path):
+        submission_queue = SubmissionQueue(queue_path)
+        submission_queue.put_batch(["leader", "first", "second"])
+
+        assert submission_queue.qsize() == 1
+        submission_queue.mark_started(submission_queue.get(), 0)
+        assert submission_queue.qsize() == 0
+
+        submission_queue.mark_done("leader")
+        assert [submission_queue.get() for _ in range(2)] == ["first", "second"]
+
+    def test_recover_should_release_the_followers_of_an_interrupted_leader(self, queue_path: Path):
+        submission_queue = SubmissionQueue(queue_path)
+        submission_queue.put_batch(["leader", "first"])
+        submission_queue.mark_started(submission_queue.get(), 0)
+        submission_queue.mark_done("leader")
+        submission_queue.put_batch(["other", "second"])
+
+        recovered_queue = SubmissionQueue(queue_path)
+        assert recovered_queue.recover() == (["first", "other", "second"], [])
+        assert [recovered_queue.get() for _ in range(2)] == ["first", "other"]
+        assert recovered_queue.qsize() == 0
+
+    def test_get_should_observe_the_queue_wait_time(self, queue_path: Path):
+        submission_queue = SubmissionQueue(queue_path)
+        observed: int = queue_wait_seconds.get_count()
+        submission_queue.put("tracker")
+        submission_queue.get()
+
+        assert queue_wait_seconds.get_count() == observed + 1
+
+
+class TestRecoverSubmissionQueue:
+    def test_create_app_should_reclaim_the_orphan_boxes(self, monkeypatch: pytest.MonkeyPatch):
+        spawned: list[list[str]] = []
+        monkeypatch.setattr(utils.sandbox.box.util, "is_box_initialized", lambda box_id: True)
+        monkeypatch.setattr(utils.isolate.util, "spawn_isolate", lambda argv: spawned.append(argv) or 0)
+        storage_path: str = mkdtemp()
+        try:
+            app = create_app({"STORAGE_PATH": storage_path})
+
+            box_number: int = app.config["setting"].sandbox_number + app.config["setting"].warm_box_number
+            cleaned_box_ids: list[str] = [argv[-2] for argv in spawned if argv[-1] == "--cleanup"]
+            assert cleaned_box_ids[:box_number] == [f"--box-id={box_id}" for box_id in range(box_number)]
+        finally:
+            rmtree(storage_path)
+
+    def test_create_app_should_fail_the_task_interrupted_too_many_times(self):
+        storage_path: str = mkdtemp()
+        try:
+            submission_queue = SubmissionQueue(Path(storage_path) / "queue" / "submission.db")
+            submission_queue.put("tracker")
+            for box_id in [0, 1]:
+                submission_queue.mark_started(submission_queue.get(), box_id)
+                submission_queue.requeue("tracker")
+            submission_queue.mark_started(submission_queue.get(), 0)
+
+            app = create_app({"STORAGE_PATH": storage_path})
+
+            result_store: ResultStore = app.config["result_store"]
+            assert json.loads(result_store.get_raw("tracker"))["result"] == {"error": "The task was interrupted."}
+            assert app.config["submission"].qsize() == 0
+            assert SubmissionQueue(Path(storage_path) / "queue" / "submission.db").recover() == ([], [])
+        finally:
+            rmtree(storage_path)
+
+    def test_wait_after_restart_should_find_the_recovered_tasks(self, monkeypatch: pytest.MonkeyPatch):
+        started = threading.Event()
+        done: Queue[str] = Queue()
+        mark_done = SubmissionQueue.mark_done
+
+        def mark_done_and_notify(self: SubmissionQueue, tracker_id: str) -> None:
+            mark_done(self, tracker_id)
+            done.put(tracker_id)
+
+        def fake_task(tracker_id: str, box_id: int) -> None:
+            started.wait(timeout=5)
+            app.config["box_pool"].release(box_id)
+
+        monkeypatch.setattr(SubmissionQueue, "mark_done", mark_done_and_notify)
+        monkeypatch.setattr(api.judge.util, "execute_task_with_specific_tracker_id", fake_task)
+        storage_path: str = mkdtemp()
+        try:
+            submission_queue = SubmissionQueue(Path(storage_path) / "queue" / "submission.db")
+            submission_queue.put_batch(["interrupted", "held"])
+            submission_queue.put("queued")
+            submission_queue.mark_started(submission_queue.get(), 0)
+
+            app = create_app({"STORAGE_PATH": storage_path})
+            client = app.test_client()
+
+            for tracker_id in ["interrupted", "held", "queued"]:
+                response = client.get(f"/api/result/{tracker_id}/wait?timeout=0.01")
+                assert response.status_code == HTTPStatus.ACCEPTED
+                assert response.json["status"] == "Pending"
+            started.set()
+            assert sorted(done.get(timeout=5) for _ in range(3)) == ["held", "interrupted", "queued"]
+        finally:
+            started.set()
+            rmtree(storage_path)
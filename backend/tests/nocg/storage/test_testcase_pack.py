@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from storage.testcase_pack import (
+    CHUNK_SIZE,
+    MappedTestcasePack,
+    convert_json_to_testcase_pack,
+    is_testcase_pack,
+    write_testcase_pack,
+)
+
+
+class TestTestcasePack:
+    def test_write_and_read_pack_should_keep_every_test_case(self, tmp_path: Path):
+        write_testcase_pack(["5 1 2 3 4 5", "", "中文"], tmp_path / "pack")
+
+        with MappedTestcasePack(tmp_path / "pack") as testcase_pack:
+            assert len(testcase_pack) == 3
+            assert testcase_pack.read(0) == b"5 1 2 3 4 5"
+            assert testcase_pack.read(1) == b""
+            assert testcase_pack.read(2) == "中文".encode("utf-8")
+
+    def test_write_to_should_copy_the_test_case_to_the_file(self, tmp_path: Path):
+        large_test_case: bytes = b"1" * (CHUNK_SIZE * 2 + 7)
+        write_testcase_pack(["3 1 2 3", large_test_case], tmp_path / "pack")
+
+        with MappedTestcasePack(tmp_path / "pack") as testcase_pack:
+            testcase_pack.write_to(0, tmp_path / "1.in")
+            testcase_pack.write_to(1, tmp_path / "2.in")
+
+        assert (tmp_path / "1.in").read_bytes() == b"3 1 2 3"
+        assert (tmp_path / "2.in").read_bytes() == large_test_case
+
+    def test_read_with_out_of_range_index_should_raise_index_error(self, tmp_path: Path):
+        write_testcase_pack(["5"], tmp_path / "pack")
+
+        with MappedTestcasePack(tmp_path / "pack") as testcase_pack:
+            with pytest.raises(IndexError):
+                testcase_pack.read(1)
+
+    def test_convert_json_should_produce_the_same_test_case(self, tmp_path: Path):
+        (tmp_path / "testcase.json").write_text(json.dumps(["5 6", "7 8"]))
+
+        convert_json_to_testcase_pack(tmp_path / "testcase.json", tmp_path / "testcase.pack")
+
+        assert is_testcase_pack(tmp_path / "testcase.pack")
+        assert not is_testcase_pack(tmp_path / "testcase.json")
+        with MappedTestcasePack(tmp_path / "testcase.pack") as testcase_pack:
+            assert [testcase_pack.read(i) for i in range(len(testcase_pack))] == [b"5 6", b"7 8"]
+
+    def test_open_json_as_pack_should_raise_value_error(self, tmp_path: Path):
+        (tmp_path / "testcase.json").write_text(json.dumps(["5 6", "7 8", "9 10"]))
+
+        with pytest.raises(ValueError):
+            MappedTestcasePack(tmp_path / "testcase.json")
@@ -0,0 +1,58 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+from utils.cache.answer import fetch_answer, make_solution_digest, store_answer
+from utils.sandbox.util import Option
+
+
+@pytest.fixture
+def box_environment():
+    subprocess.call("isolate --box-id=0 --init", shell=True)
+    Path("/var/local/lib/isolate/0/box/solution.o").write_bytes(b"binary")
+    Path("/var/local/lib/isolate/0/box/1.in").write_text("5")
+    Path("/var/local/lib/isolate/0/box/1.ans").write_text("5")
+    yield
+    subprocess.call("isolate --box-id=0 --cleanup", shell=True)
+
+
+@pytest.fixture
+def option() -> Option:
+    return Option(threading=False, time=1, wall_time=1, memory=131072)
+
+
+class TestAnswerCache:
+    def test_fetch_without_stored_answer_should_return_none(self, app: Flask, box_environment: None, option: Option):
+        with app.app_context():
+            solution_digest: str = make_solution_digest("c++14", 0)
+
+            assert fetch_answer(solution_digest, option, 0, 0) is None
+
+    def test_fetch_stored_answer_should_place_the_answer_and_return_meta(self, app: Flask, box_environment: None, option: Option):
+        with app.app_context():
+            solution_digest: str = make_solution_digest("c++14", 0)
+            store_answer(solution_digest, option, 0, 0, {"exitcode": "0"})
+            Path("/var/local/lib/isolate/0/box/1.ans").unlink()
+
+            meta_data = fetch_answer(solution_digest, option, 0, 0)
+
+        assert meta_data == {"exitcode": "0"}
+        assert Path("/var/local/lib/isolate/0/box/1.ans").read_text() == "5"
+
+    def test_fetch_with_different_input_should_return_none(self, app: Flask, box_environment: None, option: Option):
+        with app.app_context():
+            solution_digest: str = make_solution_digest("c++14", 0)
+            store_answer(solution_digest, option, 0, 0, {"exitcode": "0"})
+            Path("/var/local/lib/isolate/0/box/1.in").write_text("6")
+
+            assert fetch_answer(solution_digest, option, 0, 0) is None
+
+    def test_fetch_with_different_limits_should_return_none(self, app: Flask, box_environment: None, option: Option):
+        with app.app_context():
+            solution_digest: str = make_solution_digest("c++14", 0)
+            store_answer(solution_digest, option, 0, 0, {"exitcode": "0"})
+            option.time = 2
+
+            assert fetch_answer(solution_digest, option, 0, 0) is None
@@ -0,0 +1,55 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+from utils.cache.artifact import fetch_artifact, store_artifact
+from utils.sandbox.enum import CodeType
+
+
+@pytest.fixture
+def box_environment():
+    subprocess.call("isolate --box-id=0 --init", shell=True)
+    yield
+    subprocess.call("isolate --box-id=0 --cleanup", shell=True)
+
+
+def _place_compiled_solution(code: str) -> None:
+    Path("/var/local/lib/isolate/0/box/solution.cpp").write_text(code)
+    Path("/var/local/lib/isolate/0/box/solution.o").write_bytes(b"binary")
+
+
+class TestArtifactCache:
+    def test_fetch_without_stored_artifact_should_return_none(self, app: Flask, box_environment: None, user_code: str):
+        _place_compiled_solution(user_code)
+        with app.app_context():
+
+            assert fetch_artifact(CodeType.SOLUTION, "c++14", 0) is None
+
+    def test_fetch_stored_artifact_should_place_the_binary_and_return_meta(self, app: Flask, box_environment: None, user_code: str):
+        _place_compiled_solution(user_code)
+        with app.app_context():
+            store_artifact(CodeType.SOLUTION, "c++14", 0, {"exitcode": "0"})
+            Path("/var/local/lib/isolate/0/box/solution.o").unlink()
+
+            meta_data = fetch_artifact(CodeType.SOLUTION, "c++14", 0)
+
+        assert meta_data == {"exitcode": "0"}
+        assert Path("/var/local/lib/isolate/0/box/solution.o").read_bytes() == b"binary"
+
+    def test_fetch_with_modified_source_should_return_none(self, app: Flask, box_environment: None, user_code: str):
+        _place_compiled_solution(user_code)
+        with app.app_context():
+            store_artifact(CodeType.SOLUTION, "c++14", 0, {"exitcode": "0"})
+            _place_compiled_solution(user_code + "\n")
+
+            assert fetch_artifact(CodeType.SOLUTION, "c++14", 0) is None
+
+    def test_store_submit_code_should_not_be_cached(self, app: Flask, box_environment: None, user_code: str):
+        Path("/var/local/lib/isolate/0/box/submit.cpp").write_text(user_code)
+        Path("/var/local/lib/isolate/0/box/submit.o").write_bytes(b"binary")
+        with app.app_context():
+            store_artifact(CodeType.SUBMIT, "c++14", 0, {"exitcode": "0"})
+
+            assert fetch_artifact(CodeType.SUBMIT, "c++14", 0) is None
@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+import utils.cache.precompiled_header
+from utils.cache.precompiled_header import PrecompiledHeader, get_precompiled_header, remove_outdated_precompiled_headers
+
+
+@pytest.fixture
+def testlib_path(tmp_path: Path, testlib: str, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path: Path = tmp_path / "testlib.h"
+    path.write_text(testlib)
+    monkeypatch.setattr(utils.cache.precompiled_header, "TESTLIB_PATH", str(path))
+    return path
+
+
+class TestGetPrecompiledHeader:
+    def test_with_cpp_compiler_should_build_the_precompiled_header(self, app: Flask, testlib_path: Path):
+        with app.app_context():
+
+            precompiled_header: PrecompiledHeader | None = get_precompiled_header("c++14")
+
+        assert precompiled_header is not None
+        assert not precompiled_header.hit
+        assert (Path(precompiled_header.directory) / "testlib.h").exists()
+        assert (Path(precompiled_header.directory) / "testlib.h.gch").exists()
+
+    def test_with_built_precompiled_header_should_hit_the_cache(self, app: Flask, testlib_path: Path):
+        with app.app_context():
+            first_header: PrecompiledHeader | None = get_precompiled_header("c++14")
+
+            second_header: PrecompiledHeader | None = get_precompiled_header("c++14")
+
+        assert second_header is not None
+        assert second_header.hit
+        assert second_header.directory == first_header.directory
+
+    def test_with_modified_testlib_should_rebuild_the_precompiled_header(self, app: Flask, testlib_path: Path):
+        with app.app_context():
+            first_header: PrecompiledHeader | None = get_precompiled_header("c++14")
+            testlib_path.write_text(testlib_path.read_text() + "\n// modified\n")
+
+            second_header: PrecompiledHeader | None = get_precompiled_header("c++14")
+
+        assert second_header is not None
+        assert not second_header.hit
+        assert second_header.directory != first_header.directory
+        assert Path(first_header.directory).exists()
+
+    def test_remove_outdated_precompiled_headers_should_only_keep_the_current_version(self, app: Flask, testlib_path: Path):
+        with app.app_context():
+            first_header: PrecompiledHeader | None = get_precompiled_header("c++14")
+            testlib_path.write_text(testlib_path.read_text() + "\n// modified\n")
+            second_header: PrecompiledHeader | None = get_precompiled_header("c++14")
+
+            remove_outdated_precompiled_headers()
+
+        assert not Path(first_header.directory).exists()
+        assert Path(second_header.directory).exists()
+
+    def test_with_c_compiler_should_return_none(self, app: Flask, testlib_path: Path):
+        with app.app_context():
+
+            precompiled_header: PrecompiledHeader | None = get_precompiled_header("c11")
+
+        assert precompiled_header is None
+
+    def test_sandbox_directory_rule_should_mount_the_header_directory(self):
+        precompiled_header = PrecompiledHeader(compiler="c++14", directory="/some/directory", header_compile_time=1.0, hit=True)
+
+        assert precompiled_header.get_sandbox_header_path() == "/testlib/testlib.h"
+        assert precompiled_header.get_sandbox_directory_rule() == ("/testlib=/some/directory", "")
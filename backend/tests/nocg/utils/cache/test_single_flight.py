@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from utils.cache.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_with_the_same_key_should_share_one_execution(self):
+        single_flight = SingleFlight()
+        call_count: list[int] = []
+        results: list[int] = []
+
+        def slow_function() -> int:
+            call_count.append(1)
+            time.sleep(0.2)
+            return 42
+
+        threads = [threading.Thread(target=lambda: results.append(single_flight.do("key", slow_function))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(call_count) == 1
+        assert results == [42] * 8
+        assert single_flight.shared == 7
+
+    def test_calls_after_the_flight_finished_should_execute_again(self):
+        single_flight = SingleFlight()
+
+        assert single_flight.do("key", lambda: 1) == 1
+        assert single_flight.do("key", lambda: 2) == 2
+        assert single_flight.shared == 0
+
+    def test_waiters_should_receive_the_error_of_the_shared_execution(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        errors: list[BaseException] = []
+
+        def failing_function() -> None:
+            started.set()
+            time.sleep(0.2)
+            raise ValueError("failed")
+
+        def wait_for_flight() -> None:
+            started.wait()
+            try:
+                single_flight.do("key", lambda: None)
+            except ValueError as error:
+                errors.append(error)
+
+        waiter = threading.Thread(target=wait_for_flight)
+        waiter.start()
+        with pytest.raises(ValueError):
+            single_flight.do("key", failing_function)
+        waiter.join()
+
+        assert len(errors) == 1
@@ -0,0 +1,78 @@
+from pathlib import Path
+
+from utils.cache.store import FileCache
+
+
+def _insert_entry(cache: FileCache, key: str, data: bytes) -> Path:
+    building_directory: Path = cache.make_building_directory()
+    (building_directory / "data").write_bytes(data)
+    return cache.insert(key, building_directory)
+
+
+class TestFileCache:
+    def test_lookup_absent_key_should_return_none_and_count_miss(self, tmp_path: Path):
+        cache = FileCache(tmp_path / "cache", 1024)
+
+        assert cache.lookup("absent") is None
+        assert cache.get_statistics()["misses"] == 1
+
+    def test_lookup_inserted_key_should_return_entry_and_count_hit(self, tmp_path: Path):
+        cache = FileCache(tmp_path / "cache", 1024)
+        _insert_entry(cache, "key", b"data")
+
+        entry_path: Path | None = cache.lookup("key")
+
+        assert entry_path is not None
+        assert (entry_path / "data").read_bytes() == b"data"
+        assert cache.get_statistics()["hits"] == 1
+
+    def test_insert_over_capacity_should_evict_least_recently_used_entry(self, tmp_path: Path):
+        cache = FileCache(tmp_path / "cache", 10)
+        _insert_entry(cache, "first", b"12345")
+        _insert_entry(cache, "second", b"12345")
+        cache.lookup("first")
+
+        _insert_entry(cache, "third", b"12345")
+
+        assert cache.lookup("first") is not None
+        assert cache.lookup("second") is None
+        assert cache.lookup("third") is not None
+        assert cache.get_statistics()["evictions"] == 1
+        assert cache.get_statistics()["bytes_evicted"] == 5
+
+    def test_use_should_not_evict_the_entry_during_the_block(self, tmp_path: Path):
+        cache = FileCache(tmp_path / "cache", 10)
+        _insert_entry(cache, "first", b"12345")
+
+        with cache.use("first") as entry_path:
+            _insert_entry(cache, "second", b"12345")
+            _insert_entry(cache, "third", b"12345")
+
+            assert entry_path is not None
+            assert (entry_path / "data").read_bytes() == b"12345"
+
+        assert cache.lookup("second") is None
+        assert cache.get_statistics()["pinned"] == 0
+
+    def test_use_absent_key_should_yield_none(self, tmp_path: Path):
+        cache = FileCache(tmp_path / "cache", 10)
+
+        with cache.use("absent") as entry_path:
+            assert entry_path is None
+
+    def test_insert_existing_key_should_keep_the_original_entry(self, tmp_path: Path):
+        cache = FileCache(tmp_path / "cache", 1024)
+        _insert_entry(cache, "key", b"original")
+
+        _insert_entry(cache, "key", b"replaced")
+
+        assert (cache.lookup("key") / "data").read_bytes() == b"original"
+        assert cache.get_statistics()["entries"] == 1
+
+    def test_new_cache_on_same_directory_should_rebuild_the_index(self, tmp_path: Path):
+        _insert_entry(FileCache(tmp_path / "cache", 1024), "key", b"data")
+
+        cache = FileCache(tmp_path / "cache", 1024)
+
+        assert cache.lookup("key") is not None
+        assert cache.get_statistics()["size"] == 4
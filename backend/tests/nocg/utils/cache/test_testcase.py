@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+from flask import Flask
+
+from storage.testcase_pack import write_testcase_pack
+from utils.cache.testcase import CachedTestcase, TestcaseCache, get_testcase_directory_rules
+
+
+def _make_pack_building_directory(testcase_cache: TestcaseCache, test_case_list: list[str]) -> Path:
+    building_directory: Path = testcase_cache.make_building_directory()
+    write_testcase_pack(test_case_list, building_directory / "source")
+    return building_directory
+
+
+class TestTestcaseCache:
+    def test_insert_should_unpack_every_test_case(self, tmp_path: Path):
+        testcase_cache = TestcaseCache(tmp_path, 1 << 20)
+
+        cached_testcase: CachedTestcase = testcase_cache.insert(
+            "testcase", _make_pack_building_directory(testcase_cache, ["5 6", "7 8"]), "source", "etag", "version", 0
+        )
+
+        assert cached_testcase.size == 2
+        assert cached_testcase.etag == "etag"
+        assert cached_testcase.version_id == "version"
+        assert cached_testcase.get_input_path(0).read_text() == "5 6"
+        assert cached_testcase.get_input_path(1).read_text() == "7 8"
+
+    def test_insert_with_json_source_should_convert_it_to_pack(self, tmp_path: Path):
+        testcase_cache = TestcaseCache(tmp_path, 1 << 20)
+        building_directory: Path = testcase_cache.make_building_directory()
+        (building_directory / "source").write_text(json.dumps(["5 6"]))
+
+        cached_testcase: CachedTestcase = testcase_cache.insert("testcase", building_directory, "source", "etag", None, 0)
+
+        assert cached_testcase.get_input_path(0).read_text() == "5 6"
+        assert not (cached_testcase.directory / "source").exists()
+
+    def test_lookup_should_return_the_latest_version(self, tmp_path: Path):
+        testcase_cache = TestcaseCache(tmp_path, 1 << 20)
+        testcase_cache.insert("testcase", _make_pack_building_directory(testcase_cache, ["5 6"]), "source", "old", None, 0)
+        testcase_cache.insert("testcase", _make_pack_building_directory(testcase_cache, ["7 8"]), "source", "new", None, 0)
+
+        cached_testcase: CachedTestcase | None = testcase_cache.lookup("testcase", 1)
+
+        assert cached_testcase is not None
+        assert cached_testcase.etag == "new"
+        assert testcase_cache.lookup("unknown", 1) is None
+        assert testcase_cache.get_statistics()["stale"] == 1
+
+    def test_lookup_after_restart_should_find_the_latest_version_on_disk(self, tmp_path: Path):
+        testcase_cache = TestcaseCache(tmp_path, 1 << 20)
+        testcase_cache.insert("testcase", _make_pack_building_directory(testcase_cache, ["5 6"]), "source", "old", None, 0)
+        testcase_cache.insert("testcase", _make_pack_building_directory(testcase_cache, ["7 8"]), "source", "new", None, 0)
+
+        cached_testcase: CachedTestcase | None = TestcaseCache(tmp_path, 1 << 20).lookup("testcase", 1)
+
+        assert cached_testcase is not None
+        assert cached_testcase.etag == "new"
+
+    def test_insert_new_version_should_remove_the_unused_old_version(self, tmp_path: Path):
+        testcase_cache = TestcaseCache(tmp_path, 1 << 20)
+        old: CachedTestcase = testcase_cache.insert("testcase", _make_pack_building_directory(testcase_cache, ["5 6"]), "source", "old", None, 0)
+        testcase_cache.release(0)
+
+        testcase_cache.insert("testcase", _make_pack_building_directory(testcase_cache, ["7 8"]), "source", "new", None, 1)
+
+        assert not old.directory.exists()
+
+    def test_insert_new_version_should_remove_the_old_version_after_it_is_released(self, tmp_path: Path):
+        testcase_cache = TestcaseCache(tmp_path, 1 << 20)
+        old: CachedTestcase = testcase_cache.insert("testcase", _make_pack_building_directory(testcase_cache, ["5 6"]), "source", "old", None, 0)
+        new: CachedTestcase = testcase_cache.insert("testcase", _make_pack_building_directory(testcase_cache, ["7 8"]), "source", "new", None, 1)
+
+        assert old.directory.exists()
+
+        testcase_cache.release(0)
+
+        assert not old.directory.exists()
+        assert new.directory.exists()
+
+    def test_insert_over_capacity_should_not_evict_the_testcase_in_use(self, tmp_path: Path):
+        testcase_cache = TestcaseCache(tmp_path, 4096)
+        first: CachedTestcase = testcase_cache.insert("first", _make_pack_building_directory(testcase_cache, ["1" * 3000]), "source", "etag", None, 0)
+        second: CachedTestcase = testcase_cache.insert("second", _make_pack_building_directory(testcase_cache, ["2" * 3000]), "source", "etag", None, 1)
+
+        assert first.directory.exists()
+        assert second.directory.exists()
+
+        testcase_cache.release(0)
+
+        assert not first.directory.exists()
+        assert second.directory.exists()
+        assert testcase_cache.get_statistics()["evictions"] == 1
+        assert testcase_cache.get_statistics()["bytes_evicted"] > 6000
+
+    def test_concurrent_refresh_should_download_once(self, tmp_path: Path):
+        testcase_cache = TestcaseCache(tmp_path, 1 << 20)
+        download_count: list[int] = []
+
+        def refresher(cached_testcase: CachedTestcase | None) -> bool:
+            download_count.append(1)
+            time.sleep(0.2)
+            testcase_cache.insert("testcase", _make_pack_building_directory(testcase_cache, ["5 6"]), "source", "etag", None)
+            return True
+
+        threads = [threading.Thread(target=testcase_cache.refresh, args=("testcase", refresher)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(download_count) == 1
+        assert testcase_cache.get_statistics()["shared_downloads"] == 3
+        assert testcase_cache.lookup("testcase", 0) is not None
+
+    def test_refresh_within_validation_interval_should_skip_the_refresher(self, tmp_path: Path):
+        testcase_cache = TestcaseCache(tmp_path, 1 << 20, validation_interval=60)
+        refreshed: list[CachedTestcase | None] = []
+
+        def refresher(cached_testcase: CachedTestcase | None) -> bool:
+            refreshed.append(cached_testcase)
+            if cached_testcase is None:
+                testcase_cache.insert("testcase", _make_pack_building_directory(testcase_cache, ["5 6"]), "source", "etag", None)
+            return True
+
+        assert testcase_cache.refresh("testcase", refresher)
+        assert testcase_cache.refresh("testcase", refresher)
+
+        assert refreshed == [None]
+        assert testcase_cache.get_statistics()["hits"] == 1
+
+    def test_refresh_with_missing_testcase_should_return_false(self, tmp_path: Path):
+        testcase_cache = TestcaseCache(tmp_path, 1 << 20, validation_interval=60)
+
+        assert not testcase_cache.refresh("testcase", lambda cached_testcase: False)
+
+
+class TestTestcaseDirectoryRule:
+    def test_get_testcase_directory_rules_should_only_mount_the_pinned_version(self, app: Flask):
+        testcase_cache: TestcaseCache = app.config["testcase_cache"]
+        used: CachedTestcase = testcase_cache.insert(
+            "used", _make_pack_building_directory(testcase_cache, ["5 6"]), "source", "etag", None, 0
+        )
+        other: CachedTestcase = testcase_cache.insert(
+            "other", _make_pack_building_directory(testcase_cache, ["secret"]), "source", "etag", None, 1
+        )
+
+        with app.app_context():
+            rules: list[tuple[str, str]] = get_testcase_directory_rules(0)
+
+        assert rules == [(str(used.directory.absolute()), "")]
+        mounted: list[Path] = [Path(directory) for directory, _ in rules]
+        # 另一個題目的測資與整個快取目錄都不在沙盒可以看到的路徑中。
+        assert not any(other.get_input_path(0).absolute().is_relative_to(directory) for directory in mounted)
+        assert testcase_cache.store.directory.absolute() not in mounted
+
+    def test_get_testcase_directory_rules_should_follow_the_shared_pins(self, app: Flask):
+        testcase_cache: TestcaseCache = app.config["testcase_cache"]
+        used: CachedTestcase = testcase_cache.insert(
+            "used", _make_pack_building_directory(testcase_cache, ["5 6"]), "source", "etag", None, 0
+        )
+        testcase_cache.share(0, 1)
+
+        with app.app_context():
+            assert get_testcase_directory_rules(1) == [(str(used.directory.absolute()), "")]
+            testcase_cache.release(1)
+            assert get_testcase_directory_rules(1) == []
+            assert get_testcase_directory_rules(0) == [(str(used.directory.absolute()), "")]
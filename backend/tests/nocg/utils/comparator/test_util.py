@@ -0,0 +1,141 @@
+from pathlib import Path
+
+import pytest
+
+import utils.comparator.util
+from utils.comparator.util import (
+    ComparisonResult,
+    compare_floats,
+    compare_floats_by_token,
+    compare_lines,
+    compare_output,
+    compare_tokens,
+    read_float_blocks,
+    read_tokens,
+)
+from utils.sandbox.enum import Comparator
+
+
+def _write_files(tmp_path: Path, output: str, answer: str) -> tuple[Path, Path]:
+    (tmp_path / "1.out").write_text(output)
+    (tmp_path / "1.ans").write_text(answer)
+    return tmp_path / "1.out", tmp_path / "1.ans"
+
+
+class TestReadTokens:
+    def test_read_tokens_should_return_every_token_with_its_line(self, tmp_path: Path):
+        (tmp_path / "file").write_text("5 6\n\n  7\t8 \n9")
+
+        assert list(read_tokens(tmp_path / "file")) == [(b"5", 1), (b"6", 1), (b"7", 3), (b"8", 3), (b"9", 4)]
+
+    def test_read_tokens_across_chunks_should_not_split_the_token(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(utils.comparator.util, "CHUNK_SIZE", 4)
+        (tmp_path / "file").write_text("123456 78\n9 0")
+
+        assert list(read_tokens(tmp_path / "file")) == [(b"123456", 1), (b"78", 1), (b"9", 2), (b"0", 2)]
+
+
+class TestCompareTokens:
+    def test_same_tokens_with_different_whitespace_should_be_ok(self, tmp_path: Path):
+        result: ComparisonResult = compare_tokens(*_write_files(tmp_path, "1 2\n3\n", "1  2 3"))
+
+        assert result == ComparisonResult(0, "ok 3 tokens")
+
+    def test_different_token_should_report_the_first_mismatch(self, tmp_path: Path):
+        result: ComparisonResult = compare_tokens(*_write_files(tmp_path, "1 2\n4 5", "1 2\n3 5"))
+
+        assert result.exitcode == 1
+        assert result.log == "wrong answer 3rd words differ - expected: '3', found: '4' (line 2 of the output, line 2 of the answer)"
+
+    def test_shorter_output_should_report_unexpected_eof(self, tmp_path: Path):
+        result: ComparisonResult = compare_tokens(*_write_files(tmp_path, "1", "1 2"))
+
+        assert result.exitcode == 1
+        assert result.log.startswith("wrong answer Unexpected EOF in the participants output")
+
+    def test_longer_output_should_report_extra_tokens(self, tmp_path: Path):
+        result: ComparisonResult = compare_tokens(*_write_files(tmp_path, "1 2\n3", "1 2"))
+
+        assert result.exitcode == 1
+        assert result.log == "wrong answer Participant output contains extra tokens, found: '3' (line 2 of the output)"
+
+
+class TestCompareLines:
+    def test_same_lines_with_trailing_blank_lines_should_be_ok(self, tmp_path: Path):
+        result: ComparisonResult = compare_lines(*_write_files(tmp_path, "1  2\n3\n\n\n", "1 2\n3\n"))
+
+        assert result == ComparisonResult(0, "ok 2 lines")
+
+    def test_tokens_moved_to_another_line_should_be_wrong_answer(self, tmp_path: Path):
+        result: ComparisonResult = compare_lines(*_write_files(tmp_path, "1\n2 3\n", "1 2\n3\n"))
+
+        assert result.exitcode == 1
+        assert result.log == "wrong answer 1st lines differ - expected: '1 2', found: '1'"
+
+
+class TestCompareFloats:
+    def test_numbers_within_tolerance_should_be_ok(self, tmp_path: Path):
+        result: ComparisonResult = compare_floats(*_write_files(tmp_path, "1.0000001 2000000.1 nan", "1 2000000 nan"), 1e-6)
+
+        assert result == ComparisonResult(0, "ok 3 numbers")
+
+    def test_number_out_of_tolerance_should_report_the_error(self, tmp_path: Path):
+        result: ComparisonResult = compare_floats(*_write_files(tmp_path, "1 2.5", "1 2"), 1e-6)
+
+        assert result.exitcode == 1
+        assert result.log == "wrong answer 2nd numbers differ - expected: '2.000000', found: '2.500000', error = '0.250000' (line 1 of the output)"
+
+    def test_not_a_number_in_output_should_be_wrong_answer(self, tmp_path: Path):
+        result: ComparisonResult = compare_floats(*_write_files(tmp_path, "abc", "1"), 1e-6)
+
+        assert result.exitcode == 1
+        assert result.log.startswith('wrong answer Expected double, but "abc" found')
+
+    def test_not_a_number_in_answer_should_fail(self, tmp_path: Path):
+        result: ComparisonResult = compare_floats(*_write_files(tmp_path, "1", "abc"), 1e-6)
+
+        assert result.exitcode == 3
+
+    def test_vectorized_comparison_across_blocks_should_count_every_number(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(utils.comparator.util, "FLOAT_BLOCK_SIZE", 7)
+        output: str = " ".join(f"{i / 3:.9f}" for i in range(100))
+        answer: str = "\n".join(f"{i / 3:.7f}" for i in range(100))
+
+        result: ComparisonResult = compare_floats(*_write_files(tmp_path, output, answer), 1e-6)
+
+        assert result == ComparisonResult(0, "ok 100 numbers")
+
+    @pytest.mark.parametrize("output, answer", [
+        ("1 2 3.5 4", "1 2 3 4"),
+        ("1 2", "1 2 3"),
+        ("1 2 3 4", "1 2 3"),
+        ("1 x 3", "1 2 3"),
+        ("1 inf -inf", "1 inf inf"),
+        ("1 nan", "1 2"),
+    ])
+    def test_vectorized_comparison_should_report_the_same_log_as_token_comparison(self, tmp_path: Path, output: str, answer: str):
+        paths: tuple[Path, Path] = _write_files(tmp_path, output, answer)
+
+        result: ComparisonResult = compare_floats(*paths, 1e-6)
+
+        assert result.exitcode != 0
+        assert result == compare_floats_by_token(*paths, 1e-6)
+
+    def test_read_float_blocks_should_not_split_the_number(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(utils.comparator.util, "FLOAT_BLOCK_SIZE", 4)
+        (tmp_path / "file").write_text("1.2345 6\n7.5")
+
+        assert [value for block in read_float_blocks(tmp_path / "file") for value in block] == [1.2345, 6.0, 7.5]
+
+
+class TestCompareOutput:
+    def test_unknown_comparator_should_raise_exception(self, tmp_path: Path):
+        with pytest.raises(Exception):
+            compare_output("unknown", *_write_files(tmp_path, "1", "1"))
+
+    def test_compare_output_should_select_the_comparator(self, tmp_path: Path):
+        paths: tuple[Path, Path] = _write_files(tmp_path, "1.0\n", "1")
+
+        assert compare_output(Comparator.TOKEN.value, *paths).exitcode == 1
+        assert compare_output(Comparator.LINE.value, *paths).exitcode == 1
+        assert compare_output(Comparator.FLOAT.value, *paths).exitcode == 0
@@ -1,3 +1,4 @@
+import hashlib
 import subprocess
 from typing import Any
 from pathlib import Path
@@ -10,12 +11,17 @@ from utils.isolate.util import (
     generate_isolate_init_command, 
     generate_isolate_run_command, 
     generate_isolate_cleanup_command, 
+    generate_isolate_run_argv,
+    generate_isolate_init_argv,
+    generate_isolate_cleanup_argv,
+    spawn_isolate,
     cleanup_sandbox,
     init_sandbox,
     touch_text_file,
     touch_text_file_by_file_name,
     read_meta,
     read_output,
+    capture_output,
     compile,
     execute,
     checker
@@ -54,6 +60,8 @@ def box_environment():
         ("cg_mem", 4096, "--cg-mem=4096 "),
         ("cg_timing", 15, "--cg-timing=15 "),
         ("dir", ("random_file", "rw"), "--dir=random_file:rw "),
+        ("dir", ("/testlib=random_directory", ""), "--dir=/testlib=random_directory "),
+        ("dir", [("/first", ""), ("/second", "")], "--dir=/first --dir=/second "),
         ("mem", 131072, "--mem=131072 "),
     ]
 )
@@ -86,6 +94,29 @@ def test_generate_isolate_cleanup_command_should_generate_correct_command(app: F
         assert isolate_command == "isolate --box-id=0  --cleanup"
 
 
+def test_generate_isolate_run_argv_should_keep_file_name_with_space_as_one_argument(app: Flask):
+    with app.app_context():
+        argv: list[str] = generate_isolate_run_argv(["./submit.o"], 0, stdin="input file.in")
+
+        assert argv == ["isolate", "--box-id=0", "--open-files=2048", "--stdin=input file.in", "--full-env", "--processes", "--run", "--", "./submit.o"]
+
+
+def test_generate_isolate_init_and_cleanup_argv_should_generate_correct_argv(app: Flask):
+    with app.app_context():
+
+        assert generate_isolate_init_argv(0) == ["isolate", "--box-id=0", "--init"]
+        assert generate_isolate_cleanup_argv(0) == ["isolate", "--box-id=0", "--cleanup"]
+
+
+def test_spawn_isolate_should_return_the_exit_code_without_shell():
+    assert spawn_isolate(["sh", "-c", "exit 3"]) == 3
+    assert spawn_isolate(["echo", "$HOME;", "exit 5"]) == 0
+
+
+def test_spawn_isolate_with_absent_program_should_return_127():
+    assert spawn_isolate(["absent-program-for-nuoj-sandbox"]) == 127
+
+
 def test_init_sandbox_should_init_the_box(app: Flask):
     with app.app_context():
         init_sandbox(0)
@@ -131,6 +162,35 @@ def test_read_output_should_read_the_correct_meta_data(box_environment: None):
     assert output == "random_answer"
 
 
+def test_capture_output_with_small_output_should_keep_the_whole_output(box_environment: None):
+    with open("/var/local/lib/isolate/0/box/1.out", "w") as file:
+        file.write("random_output")
+
+    output: dict[str, Any] = capture_output(0, CodeType.SUBMIT.value, 0, capture_limit=16)
+
+    assert output == {
+        "head": "random_output",
+        "tail": "",
+        "size": 13,
+        "sha256": hashlib.sha256(b"random_output").hexdigest(),
+        "truncated": False
+    }
+
+
+def test_capture_output_with_large_output_should_keep_the_head_and_the_tail(box_environment: None):
+    content: bytes = b"a" * 100000 + b"b" * 100000 + b"c" * 100000
+    with open("/var/local/lib/isolate/0/box/1.out", "wb") as file:
+        file.write(content)
+
+    output: dict[str, Any] = capture_output(0, CodeType.SUBMIT.value, 0, capture_limit=1000)
+
+    assert output["head"] == "a" * 500
+    assert output["tail"] == "c" * 500
+    assert output["size"] == len(content)
+    assert output["sha256"] == hashlib.sha256(content).hexdigest()
+    assert output["truncated"]
+
+
 def test_cleanup_sandbox_should_clean_the_sandbox(app: Flask):
     subprocess.call("isolate --box-id=0 --init", shell=True)
     assert Path("/var/local/lib/isolate/0/box").exists()
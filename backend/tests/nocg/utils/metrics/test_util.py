@@ -0,0 +1,63 @@
+import pytest
+
+from utils.metrics.util import MetricsRegistry
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    return MetricsRegistry()
+
+
+class TestMetricsRegistry:
+    def test_render_counter_should_output_every_label_set(self, registry: MetricsRegistry):
+        counter = registry.counter("test_total", "Test counter.", ("action",))
+        counter.inc(action="run")
+        counter.inc(2, action="run")
+        counter.inc(action="init")
+
+        assert registry.render() == (
+            "# HELP test_total Test counter.\n"
+            "# TYPE test_total counter\n"
+            'test_total{action="init"} 1.0\n'
+            'test_total{action="run"} 3.0\n'
+        )
+
+    def test_render_histogram_should_output_cumulative_buckets(self, registry: MetricsRegistry):
+        histogram = registry.histogram("test_seconds", "Test histogram.", buckets=(0.1, 1))
+        for value in [0.05, 0.1, 0.5, 5]:
+            histogram.observe(value)
+
+        assert registry.render().splitlines()[2:] == [
+            'test_seconds_bucket{le="0.1"} 2',
+            'test_seconds_bucket{le="1.0"} 3',
+            'test_seconds_bucket{le="+Inf"} 4',
+            "test_seconds_sum 5.65",
+            "test_seconds_count 4",
+        ]
+
+    def test_histogram_time_should_observe_even_if_the_block_raises(self, registry: MetricsRegistry):
+        histogram = registry.histogram("test_seconds", "Test histogram.", ("phase",))
+
+        with pytest.raises(ValueError):
+            with histogram.time(phase="compile"):
+                raise ValueError()
+
+        assert histogram.get_count(phase="compile") == 1
+
+    def test_label_value_should_be_escaped(self, registry: MetricsRegistry):
+        gauge = registry.gauge("test_value", "Test gauge.", ("name",))
+        gauge.set(1, name='a"b\\c')
+
+        assert registry.render().splitlines()[-1] == 'test_value{name="a\\"b\\\\c"} 1.0'
+
+    def test_unexpected_labels_should_raise_exception(self, registry: MetricsRegistry):
+        counter = registry.counter("test_total", "Test counter.", ("action",))
+
+        with pytest.raises(Exception):
+            counter.inc(phase="run")
+
+    def test_register_duplicated_name_should_raise_exception(self, registry: MetricsRegistry):
+        registry.counter("test_total", "Test counter.")
+
+        with pytest.raises(Exception):
+            registry.counter("test_total", "Test counter.")
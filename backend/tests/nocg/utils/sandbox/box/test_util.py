@@ -0,0 +1,99 @@
+import threading
+
+from utils.sandbox.box.util import BoxPool
+
+
+class TestBoxPool:
+    def test_acquire_should_return_available_box(self):
+        box_pool = BoxPool([0, 1])
+
+        box_id: int = box_pool.acquire()
+
+        assert box_id in (0, 1)
+        assert box_pool.get_available_count() == 1
+
+    def test_release_should_make_the_box_available(self):
+        box_pool = BoxPool([0])
+        box_id: int = box_pool.acquire()
+
+        box_pool.release(box_id)
+
+        assert box_pool.get_available_count() == 1
+
+    def test_acquire_without_available_box_should_wait_for_release(self):
+        box_pool = BoxPool([0])
+        box_pool.acquire()
+        acquired_box: list[int] = []
+        thread = threading.Thread(target=lambda: acquired_box.append(box_pool.acquire()))
+        thread.start()
+        thread.join(timeout=0.1)
+        assert acquired_box == []
+
+        box_pool.release(0)
+        thread.join(timeout=5)
+
+        assert acquired_box == [0]
+
+    def test_acquire_specific_box_should_wait_until_the_box_is_released(self):
+        box_pool = BoxPool([0, 1])
+        box_pool.acquire(1)
+        acquired_box: list[int] = []
+        thread = threading.Thread(target=lambda: acquired_box.append(box_pool.acquire(1)))
+        thread.start()
+        thread.join(timeout=0.1)
+        assert acquired_box == []
+        assert box_pool.get_available_count() == 1
+
+        box_pool.release(1)
+        thread.join(timeout=5)
+
+        assert acquired_box == [1]
+        assert box_pool.get_available_count() == 1
+
+    def test_try_acquire_should_only_return_available_box(self):
+        box_pool = BoxPool([0, 1, 2])
+        box_pool.acquire(0)
+
+        leased_box: list[int] = box_pool.try_acquire(5)
+
+        assert sorted(leased_box) == [1, 2]
+        assert box_pool.get_available_count() == 0
+
+    def test_release_with_reset_box_should_reset_before_available(self):
+        reset_box_ids: list[int] = []
+        box_pool = BoxPool([0], reset_box=lambda box_id: reset_box_ids.append(box_id) or {"cleanup_time": 1.0})
+        box_id: int = box_pool.acquire()
+
+        box_pool.release(box_id)
+
+        assert reset_box_ids == [0]
+        assert box_pool.get_available_count() == 1
+        assert box_pool.get_statistics()["average_cleanup_time"] == 1.0
+
+    def test_background_reset_should_reset_every_box_before_first_acquire(self):
+        reset_box_ids: list[int] = []
+        box_pool = BoxPool([0, 1], reset_box=lambda box_id: reset_box_ids.append(box_id) or {}, background=True)
+
+        acquired_box: list[int] = [box_pool.acquire(), box_pool.acquire()]
+
+        assert sorted(acquired_box) == [0, 1]
+        assert sorted(reset_box_ids) == [0, 1]
+
+    def test_background_reset_should_not_block_release(self):
+        reset_started = threading.Event()
+        reset_finished = threading.Event()
+
+        def reset_box(box_id: int) -> dict[str, float]:
+            if reset_started.is_set():
+                reset_finished.wait(timeout=5)
+            reset_started.set()
+            return {}
+
+        box_pool = BoxPool([0], reset_box=reset_box, background=True)
+        box_id: int = box_pool.acquire()
+
+        box_pool.release(box_id)
+
+        assert box_pool.get_available_count() == 0
+        reset_finished.set()
+        assert box_pool.acquire() == 0
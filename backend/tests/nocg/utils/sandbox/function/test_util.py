@@ -0,0 +1,34 @@
+import pytest
+
+import utils.sandbox.function.util
+from utils.cache.precompiled_header import PrecompiledHeader
+from utils.sandbox.enum import CodeType
+from utils.sandbox.function.util import compile_code
+
+
+@pytest.fixture
+def compile_checker(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(utils.sandbox.function.util, "fetch_artifact", lambda type, compiler, box_id: None)
+    monkeypatch.setattr(utils.sandbox.function.util, "store_artifact", lambda type, compiler, box_id, meta_data: None)
+    monkeypatch.setattr(utils.sandbox.function.util, "compile", lambda type, compiler, box_id, precompiled_header: "time:0.1\n")
+
+    def compile_with_header(hit: bool):
+        precompiled_header = PrecompiledHeader(compiler="c++14", directory="/tmp", header_compile_time=1.5, hit=hit)
+        monkeypatch.setattr(utils.sandbox.function.util, "get_precompiled_header", lambda compiler: precompiled_header)
+        return compile_code(CodeType.CHECKER, "c++14", 0)
+
+    return compile_with_header
+
+
+class TestCompileCode:
+    def test_with_precompiled_header_hit_should_report_the_saved_time(self, compile_checker):
+        meta_data = compile_checker(True)
+
+        assert meta_data["precompiled-header"] == "hit"
+        assert meta_data["precompiled-header-saved-time"] == "1.500"
+
+    def test_with_built_precompiled_header_should_report_no_saved_time(self, compile_checker):
+        meta_data = compile_checker(False)
+
+        assert meta_data["precompiled-header"] == "built"
+        assert meta_data["precompiled-header-saved-time"] == "0.000"
@@ -9,10 +9,13 @@ from freezegun import freeze_time
 from minio import Minio
 
 from storage.minio_util import heartbeat, get_client
+from storage.testcase_pack import write_testcase_pack
 from utils.sandbox.enum import StatusType, TestCaseType
 from utils.sandbox.util import Task, TestCase
 from utils.isolate.util import init_sandbox
-from utils.sandbox.inititalize.util import initialize_task, initialize_test_case_to_sandbox
+from utils.cache.testcase import TestcaseCache
+import utils.sandbox.inititalize.util
+from utils.sandbox.inititalize.util import initialize_task, initialize_test_case_to_sandbox, prefetch_test_case, prepare_testcase
  
 # Since "TestCase", "TestCaseType" is start with "Test", so it will be confirm a Test Class by Pytest and raise the warning.
 # We need to filter the warning by warnings.filterwarnings.
@@ -168,3 +171,63 @@ class TestInitializeTestCase:
         
             with pytest.raises(AssertionError):
                 initialize_test_case_to_sandbox(test_task, test_task.test_case, 0)
+
+
+class TestPrefetchTestCase:
+    def test_prepare_testcase_should_place_the_static_file_to_cache(self, app: Flask, setup_static_file_test_case: None):
+        with app.app_context():
+            assert prepare_testcase("file1.test")
+
+            testcase_cache: TestcaseCache = app.config["testcase_cache"]
+            cached_testcase = testcase_cache.lookup("file1.test", 0)
+            testcase_cache.release(0)
+
+        assert cached_testcase is not None
+        assert cached_testcase.get_input_path(1).read_text() == "6"
+
+    def test_prepare_testcase_should_place_the_local_pack_to_cache(self, app: Flask):
+        write_testcase_pack(["5 6", "7 8"], Path(app.config["STORAGE_PATH"]) / "testcase" / "packed.pack")
+        with app.app_context():
+            assert prepare_testcase("packed")
+
+            testcase_cache: TestcaseCache = app.config["testcase_cache"]
+            cached_testcase = testcase_cache.lookup("packed", 0)
+            testcase_cache.release(0)
+
+        assert cached_testcase is not None
+        assert cached_testcase.get_input_path(1).read_text() == "7 8"
+
+    def test_prefetch_test_case_should_only_prefetch_static_files(self, app: Flask, setup_static_file_test_case: None):
+        with app.app_context():
+            prefetch_test_case([
+                {"type": TestCaseType.STATIC_FILE.value, "value": "file1.test"},
+                {"type": TestCaseType.STATIC_FILE.value, "value": "file1.test"},
+                {"type": TestCaseType.PLAIN_TEXT.value, "value": "5 6"},
+            ])
+            app.config["testcase_prefetcher"].shutdown(wait=True)
+
+            testcase_cache: TestcaseCache = app.config["testcase_cache"]
+            assert testcase_cache.get_statistics()["misses"] == 1
+            assert testcase_cache.get_latest("file1.test") is not None
+
+    def test_testcase_evicted_before_it_is_pinned_should_be_prepared_again(self, app: Flask, setup_static_file_test_case: None, monkeypatch: pytest.MonkeyPatch):
+        testcase_cache: TestcaseCache = app.config["testcase_cache"]
+        refresh = testcase_cache.refresh
+        refresh_count: list[int] = []
+
+        def refresh_and_evict(filename, refresher):
+            is_available: bool = refresh(filename, refresher)
+            refresh_count.append(1)
+            if len(refresh_count) == 1:
+                cached_testcase = testcase_cache.get_latest(filename)
+                assert testcase_cache.store.remove(cached_testcase.directory.name)
+            return is_available
+
+        monkeypatch.setattr(testcase_cache, "refresh", refresh_and_evict)
+        with app.app_context():
+            cached_testcase = utils.sandbox.inititalize.util._prepare_testcase_to_storage_directory("file1.test", 0)
+            testcase_cache.release(0)
+
+        assert cached_testcase is not None
+        assert cached_testcase.get_input_path(0).read_text() == "5"
+        assert len(refresh_count) == 2
@@ -0,0 +1,65 @@
+import threading
+import time
+from typing import Any
+
+from flask import Flask
+
+from utils.sandbox.parallel.util import lease_box, run_testcase_in_parallel
+from utils.sandbox.util import Task
+
+
+def _execute_testcase_with_verdict(verdicts: list[str]):
+    executed_index: list[int] = []
+    lock = threading.Lock()
+
+    def execute_testcase(index: int, box_id: int) -> dict[str, Any]:
+        time.sleep(0.01)
+        with lock:
+            executed_index.append(index)
+        return {"index": index, "box_id": box_id, "verdict": verdicts[index]}
+
+    return execute_testcase, executed_index
+
+
+class TestRunTestcaseInParallel:
+    def test_with_single_box_should_return_results_in_order(self, app: Flask):
+        execute_testcase, _ = _execute_testcase_with_verdict(["AC", "AC", "AC"])
+        with app.app_context():
+
+            results = run_testcase_in_parallel([0], 3, execute_testcase)
+
+        assert [result["index"] for result in results] == [0, 1, 2]
+
+    def test_with_multiple_box_should_use_every_box_and_return_results_in_order(self, app: Flask):
+        execute_testcase, _ = _execute_testcase_with_verdict(["AC"] * 12)
+        with app.app_context():
+
+            results = run_testcase_in_parallel([0, 1, 2], 12, execute_testcase)
+
+        assert [result["index"] for result in results] == list(range(12))
+        assert {result["box_id"] for result in results} == {0, 1, 2}
+
+    def test_with_failed_testcase_should_stop_at_the_first_failure(self, app: Flask):
+        verdicts: list[str] = ["AC", "AC", "WA", "AC", "TLE"] + ["AC"] * 20
+        execute_testcase, executed_index = _execute_testcase_with_verdict(verdicts)
+        with app.app_context():
+
+            results = run_testcase_in_parallel([0, 1], len(verdicts), execute_testcase, lambda result: result["verdict"] != "AC")
+
+        assert [result["verdict"] for result in results] == ["AC", "AC", "WA"]
+        assert len(executed_index) < len(verdicts)
+
+
+class TestLeaseBox:
+    def test_without_parallel_box_option_should_not_lease_box(self, app: Flask, test_task: Task):
+        test_task.test_case_size = 2
+        with app.app_context():
+
+            assert lease_box(test_task, 0, []) == []
+
+    def test_with_parallel_box_over_the_limit_should_not_lease_box(self, app: Flask, test_task: Task):
+        test_task.test_case_size = 2
+        test_task.options.parallel_box = 2
+        with app.app_context():
+
+            assert lease_box(test_task, 0, []) == []
@@ -4,9 +4,9 @@ import pytest
 from freezegun import freeze_time
 from flask import Flask
 
-from utils.sandbox.enum import ExecuteType, StatusType
+from utils.sandbox.enum import Comparator, ExecuteType, StatusType
 from utils.sandbox.inititalize.util import initialize_task, initialize_test_case_to_sandbox
-from utils.sandbox.running.util import run_task
+from utils.sandbox.running.util import _fetch_execute_info_from_meta_file, _summarize_testcase_runtime, run_task
 from utils.sandbox.util import Task
 
 class TestTaskRunning:
@@ -354,3 +354,70 @@ class TestStatus:
             last_judge_detail = test_task.result["judge_detail"][-1]
             assert last_judge_detail["verdict"] == "CMLE"
             assert "The programming has reached the memory limit." in last_judge_detail["log"]
+
+
+class TestBuiltinComparator:
+    @pytest.mark.parametrize("comparator", [Comparator.TOKEN.value, Comparator.LINE.value, Comparator.FLOAT.value])
+    def test_with_builtin_comparator_should_return_ac_status_without_checker(self, app: Flask, cleanup_test_sandbox: None, test_task: Task, comparator: str):
+        with app.app_context():
+            test_task.checker_code = None
+            test_task.options.comparator = comparator
+            initialize_task(test_task, 0)
+            initialize_test_case_to_sandbox(test_task, test_task.test_case, 0)
+
+            run_task(test_task, test_task.test_case, 0)
+
+            assert test_task.result["status"] == "AC"
+            assert "checker" not in test_task.result["compile_detail"]
+            assert test_task.result["judge_detail"][0]["log"].startswith("ok")
+
+    def test_with_builtin_comparator_and_wrong_answer_should_return_wa_status(self, app: Flask, cleanup_test_sandbox: None, test_task: Task, wrong_answer_code: str):
+        with app.app_context():
+            test_task.user_code.code = wrong_answer_code
+            test_task.options.comparator = Comparator.TOKEN.value
+            initialize_task(test_task, 0)
+            initialize_test_case_to_sandbox(test_task, test_task.test_case, 0)
+
+            run_task(test_task, test_task.test_case, 0)
+
+            assert test_task.result["status"] == "WA"
+            assert "words differ" in test_task.result["judge_detail"][-1]["log"]
+
+
+class TestPhaseTiming:
+    @freeze_time("2002-06-25 00:00:00")
+    def test_with_test_task_should_record_every_phase(self, app: Flask, cleanup_test_sandbox: None, test_task: Task):
+        with app.app_context():
+            initialize_task(test_task, 0)
+            initialize_test_case_to_sandbox(test_task, test_task.test_case, 0)
+
+            run_task(test_task, test_task.test_case, 0)
+
+            assert list(test_task.flow["phases"]) == ["compile_solution", "compile_checker", "compile_submit", "testcases"]
+            assert test_task.flow["phases"]["testcases"]["start"] == "2002-06-25 00:00:00.000000"
+            assert test_task.flow["testcase_breakdown"]["submit"]["count"] == 2
+            runtime_info = test_task.result["judge_detail"][0]["runtime_info"]["submit"]
+            assert runtime_info["elapsed_ns"] >= runtime_info["overhead_ns"] >= 0
+
+    def test_fetch_execute_info_should_subtract_the_program_wall_time_from_the_overhead(self):
+        meta = {"time": "0.100", "time-wall": "0.150", "max-rss": "1024", "exitcode": "0"}
+
+        execute_info = _fetch_execute_info_from_meta_file(meta, 210_000_000, 200_000_000)
+
+        assert execute_info == {"time": "0.100", "memory": "1024", "exitcode": "0", "elapsed_ns": 210_000_000, "overhead_ns": 50_000_000}
+
+    def test_fetch_execute_info_without_spawn_time_should_have_no_overhead(self):
+        meta = {"time": "0.100", "time-wall": "0.150", "max-rss": "1024", "exitcode": "0"}
+
+        assert _fetch_execute_info_from_meta_file(meta, 1_000_000)["overhead_ns"] == 0
+
+    def test_summarize_testcase_runtime_should_sum_every_testcase(self):
+        judge_detail = [
+            {"runtime_info": {"submit": {"elapsed_ns": 10, "overhead_ns": 4}, "checker": {"elapsed_ns": 3, "overhead_ns": 1}}},
+            {"runtime_info": {"submit": {"elapsed_ns": 20, "overhead_ns": 6}}},
+        ]
+
+        assert _summarize_testcase_runtime(judge_detail) == {
+            "submit": {"count": 2, "elapsed_ns": 30, "overhead_ns": 10},
+            "checker": {"count": 1, "elapsed_ns": 3, "overhead_ns": 1},
+        }
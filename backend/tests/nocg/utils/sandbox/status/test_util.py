@@ -0,0 +1,65 @@
+import threading
+import time
+
+from utils.sandbox.enum import StatusType
+from utils.sandbox.status.util import StatusNotifier
+
+
+class TestStatusNotifier:
+    def test_get_statuses_should_return_the_published_statuses_in_order(self):
+        status_notifier = StatusNotifier()
+
+        status_notifier.publish("tracker", StatusType.PENDING)
+        status_notifier.publish("tracker", StatusType.INITIAL)
+
+        assert status_notifier.get_statuses("tracker") == [StatusType.PENDING, StatusType.INITIAL]
+        assert status_notifier.get_statuses("unknown") == []
+
+    def test_wait_for_transition_should_wake_up_when_the_status_is_published(self):
+        status_notifier = StatusNotifier()
+        status_notifier.publish("tracker", StatusType.PENDING)
+        threading.Timer(0.05, status_notifier.publish, args=("tracker", StatusType.RUNNING)).start()
+
+        start_time: float = time.monotonic()
+        statuses = status_notifier.wait_for_transition("tracker", 1, timeout=5)
+
+        assert statuses == [StatusType.PENDING, StatusType.RUNNING]
+        assert time.monotonic() - start_time < 1
+
+    def test_wait_for_transition_without_new_status_should_return_after_timeout(self):
+        status_notifier = StatusNotifier()
+        status_notifier.publish("tracker", StatusType.PENDING)
+
+        statuses = status_notifier.wait_for_transition("tracker", 1, timeout=0.05)
+
+        assert statuses == [StatusType.PENDING]
+
+    def test_wait_for_transition_with_unknown_tracker_id_should_not_record_it(self):
+        status_notifier = StatusNotifier()
+
+        start_time: float = time.monotonic()
+        statuses = status_notifier.wait_for_transition("unknown", 0, timeout=5)
+
+        assert statuses == []
+        assert time.monotonic() - start_time < 1
+        assert "unknown" not in status_notifier._statuses
+
+    def test_publish_over_capacity_should_forget_the_oldest_finished_tracker_id(self):
+        status_notifier = StatusNotifier(capacity=2)
+
+        for tracker_id in ["first", "second", "third"]:
+            status_notifier.publish(tracker_id, StatusType.PENDING)
+            status_notifier.publish(tracker_id, StatusType.FINISH)
+
+        assert status_notifier.get_statuses("first") == []
+        assert status_notifier.get_statuses("third") == [StatusType.PENDING, StatusType.FINISH]
+
+    def test_publish_over_capacity_should_keep_the_unfinished_tracker_ids(self):
+        status_notifier = StatusNotifier(capacity=2)
+
+        for tracker_id in ["first", "second", "third"]:
+            status_notifier.publish(tracker_id, StatusType.PENDING)
+        status_notifier.publish("fourth", StatusType.FINISH)
+
+        assert status_notifier.get_statuses("first") == [StatusType.PENDING]
+        assert status_notifier.get_statuses("fourth") == [StatusType.FINISH]
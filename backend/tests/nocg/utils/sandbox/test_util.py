@@ -0,0 +1,32 @@
+import time
+
+import pytest
+from freezegun import freeze_time
+
+from utils.sandbox.util import Task, record_phase
+
+
+class TestRecordPhase:
+    @freeze_time("2002-06-25 00:00:00.123456")
+    def test_record_phase_should_record_the_start_and_monotonic_duration(self, test_task: Task):
+        with record_phase(test_task, "compile"):
+            pass
+
+        assert test_task.flow["phases"]["compile"]["start"] == "2002-06-25 00:00:00.123456"
+        assert isinstance(test_task.flow["phases"]["compile"]["duration_ns"], int)
+
+    def test_record_phase_should_measure_sub_second_durations(self, test_task: Task):
+        with record_phase(test_task, "first"):
+            time.sleep(0.01)
+        with record_phase(test_task, "second"):
+            pass
+
+        assert test_task.flow["phases"]["first"]["duration_ns"] >= 10_000_000
+        assert test_task.flow["phases"]["second"]["duration_ns"] < test_task.flow["phases"]["first"]["duration_ns"]
+
+    def test_record_phase_should_record_even_if_the_phase_raises(self, test_task: Task):
+        with pytest.raises(ValueError):
+            with record_phase(test_task, "running"):
+                raise ValueError()
+
+        assert "running" in test_task.flow["phases"]
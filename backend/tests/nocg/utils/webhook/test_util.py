@@ -0,0 +1,97 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Generator
+
+import pytest
+
+from setting.util import WebhookConfig
+from utils.webhook.util import WebhookDispatcher
+
+
+class WebhookServer(ThreadingHTTPServer):
+    def __init__(self, status_codes: list[int]) -> None:
+        super().__init__(("127.0.0.1", 0), WebhookHandler)
+        self.status_codes: list[int] = status_codes
+        self.received: list[dict[str, Any]] = []
+
+    def get_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/webhook"
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    server: WebhookServer
+
+    def do_POST(self) -> None:
+        body: bytes = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.received.append(json.loads(body))
+        status_code: int = self.server.status_codes.pop(0) if len(self.server.status_codes) > 1 else self.server.status_codes[0]
+        self.send_response(status_code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def webhook_server(request: pytest.FixtureRequest) -> Generator[WebhookServer, None, None]:
+    server = WebhookServer(getattr(request, "param", [200]))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def config() -> WebhookConfig:
+    return WebhookConfig(worker_number=1, max_attempts=3, backoff=0.01, timeout=5)
+
+
+class TestWebhookDispatcher:
+    def test_enqueue_should_deliver_the_payload_and_clear_the_outbox(self, tmp_path: Path, webhook_server: WebhookServer, config: WebhookConfig, capfd: pytest.CaptureFixture[str]):
+        dispatcher = WebhookDispatcher(tmp_path, config)
+        dispatcher.start()
+
+        dispatcher.enqueue(webhook_server.get_url(), {"tracker_id": "tracker"}, "webhook_url", "tracker")
+        dispatcher.enqueue(webhook_server.get_url(), {"tracker_id": "another"}, "webhook_url", "another")
+
+        assert dispatcher.join(timeout=5)
+        assert webhook_server.received == [{"tracker_id": "tracker"}, {"tracker_id": "another"}]
+        assert list(tmp_path.glob("*.json")) == []
+        assert dispatcher.get_statistics() == {"pending": 0, "hosts": 1}
+        assert "webhook_url http://127.0.0.1" in capfd.readouterr().out
+
+    @pytest.mark.parametrize("webhook_server", [[500, 503, 200]], indirect=True)
+    def test_enqueue_with_server_error_should_retry_until_delivered(self, tmp_path: Path, webhook_server: WebhookServer, config: WebhookConfig, capfd: pytest.CaptureFixture[str]):
+        dispatcher = WebhookDispatcher(tmp_path, config)
+        dispatcher.start()
+
+        dispatcher.enqueue(webhook_server.get_url(), {"tracker_id": "tracker"}, "webhook_url", "tracker")
+
+        assert dispatcher.join(timeout=5)
+        assert len(webhook_server.received) == 3
+        assert "send successfully" in capfd.readouterr().out
+
+    @pytest.mark.parametrize("webhook_server", [[403]], indirect=True)
+    def test_enqueue_with_client_error_should_not_retry(self, tmp_path: Path, webhook_server: WebhookServer, config: WebhookConfig, capfd: pytest.CaptureFixture[str]):
+        dispatcher = WebhookDispatcher(tmp_path, config)
+        dispatcher.start()
+
+        dispatcher.enqueue(webhook_server.get_url(), {"tracker_id": "tracker"}, "webhook_url", "tracker")
+
+        assert dispatcher.join(timeout=5)
+        assert len(webhook_server.received) == 1
+        assert "has error that occur result tracker has error." in capfd.readouterr().out
+
+    def test_start_should_deliver_the_webhook_left_in_the_outbox(self, tmp_path: Path, webhook_server: WebhookServer, config: WebhookConfig):
+        WebhookDispatcher(tmp_path, config).enqueue(webhook_server.get_url(), {"tracker_id": "tracker"}, "webhook_url", "tracker")
+        assert len(list(tmp_path.glob("*.json"))) == 1
+
+        dispatcher = WebhookDispatcher(tmp_path, config)
+        dispatcher.start()
+
+        assert dispatcher.join(timeout=5)
+        assert webhook_server.received == [{"tracker_id": "tracker"}]
+        assert list(tmp_path.glob("*.json")) == []
@@ -0,0 +1,59 @@
+import hashlib
+import json
+import shutil
+from pathlib import Path
+from typing import Any
+
+from flask import current_app
+
+from setting.util import CompilerSetting, Setting
+from utils.cache.store import FileCache
+from utils.sandbox.enum import CodeType
+from utils.sandbox.util import Option
+
+
+def make_solution_digest(compiler: str, box_id: int) -> str:
+    """
+    計算沙盒中 solution 執行檔的雜湊值，每個任務只需要計算一次。
+    """
+    setting: Setting = current_app.config["setting"]
+    compiler_setting: CompilerSetting = setting.compiler[compiler]
+    dist_filename: str = compiler_setting.get_dist_filename(CodeType.SOLUTION.value)
+    return _hash_file(Path(f"/var/local/lib/isolate/{box_id}/box/{dist_filename}"))
+
+
+def fetch_answer(solution_digest: str, option: Option, testcase_index: int, box_id: int) -> dict[str, Any] | None:
+    """
+    如果相同的 solution 已經用相同的測資與限制執行過，就把當時的輸出放回沙盒作為 N.ans，並回傳當時的 meta dict。
+    """
+    answer_cache: FileCache = current_app.config["answer_cache"]
+    with answer_cache.use(make_answer_key(solution_digest, option, testcase_index, box_id)) as entry_path:
+        if entry_path is None:
+            return None
+
+        shutil.copyfile(entry_path / "answer", f"/var/local/lib/isolate/{box_id}/box/{testcase_index+1}.ans")
+        with open(entry_path / "meta.json") as file:
+            return json.loads(file.read())
+
+
+def store_answer(solution_digest: str, option: Option, testcase_index: int, box_id: int, meta_data: dict[str, Any]) -> None:
+    answer_cache: FileCache = current_app.config["answer_cache"]
+    building_directory: Path = answer_cache.make_building_directory()
+    shutil.copyfile(f"/var/local/lib/isolate/{box_id}/box/{testcase_index+1}.ans", building_directory / "answer")
+    with open(building_directory / "meta.json", "w") as file:
+        file.write(json.dumps(meta_data))
+    answer_cache.insert(make_answer_key(solution_digest, option, testcase_index, box_id), building_directory)
+
+
+def make_answer_key(solution_digest: str, option: Option, testcase_index: int, box_id: int) -> str:
+    input_digest: str = _hash_file(Path(f"/var/local/lib/isolate/{box_id}/box/{testcase_index+1}.in"))
+    limits: str = f"{option.time}:{option.wall_time}:{option.memory}"
+    return hashlib.sha256(f"{solution_digest}:{input_digest}:{limits}".encode("utf-8")).hexdigest()
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
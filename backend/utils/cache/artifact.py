@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any
+
+from flask import current_app
+from loguru import logger
+
+from setting.util import CompilerSetting, Setting
+from utils.cache.precompiled_header import TESTLIB_PATH
+from utils.cache.store import FileCache
+from utils.sandbox.enum import CodeType
+
+CACHEABLE_CODE_TYPES: tuple[CodeType, ...] = (CodeType.SOLUTION, CodeType.CHECKER)
+
+
+def fetch_artifact(type: CodeType, compiler: str, box_id: int) -> dict[str, Any] | None:
+    """
+    如果相同的程式碼已經用相同的編譯器設定編譯過，就把編譯好的執行檔放進沙盒，並回傳當時編譯的 meta dict。
+    """
+    if type not in CACHEABLE_CODE_TYPES:
+        return None
+
+    artifact_cache: FileCache = current_app.config["artifact_cache"]
+    compiler_setting: CompilerSetting = _get_compiler_setting(compiler)
+    dist_filename: str = compiler_setting.get_dist_filename(type.value)
+    with artifact_cache.use(make_artifact_key(type, compiler, box_id)) as entry_path:
+        if entry_path is None:
+            return None
+
+        _link_or_copy(entry_path / dist_filename, Path(f"/var/local/lib/isolate/{box_id}/box/{dist_filename}"))
+        with open(entry_path / "meta.json") as file:
+            meta_data: dict[str, Any] = json.loads(file.read())
+    logger.info(f"Reuse the compiled {type.value} from the artifact cache.")
+    return meta_data
+
+
+def store_artifact(type: CodeType, compiler: str, box_id: int, meta_data: dict[str, Any]) -> None:
+    """
+    將沙盒中編譯成功的執行檔與 meta dict 存進快取。
+    """
+    if type not in CACHEABLE_CODE_TYPES:
+        return
+
+    compiler_setting: CompilerSetting = _get_compiler_setting(compiler)
+    dist_filename: str = compiler_setting.get_dist_filename(type.value)
+    dist_path: Path = Path(f"/var/local/lib/isolate/{box_id}/box/{dist_filename}")
+    if not dist_path.exists():
+        return
+
+    artifact_cache: FileCache = current_app.config["artifact_cache"]
+    building_directory: Path = artifact_cache.make_building_directory()
+    shutil.copyfile(dist_path, building_directory / dist_filename)
+    os.chmod(building_directory / dist_filename, 0o755)
+    with open(building_directory / "meta.json", "w") as file:
+        file.write(json.dumps(meta_data))
+    artifact_cache.insert(make_artifact_key(type, compiler, box_id), building_directory)
+
+
+def make_artifact_key(type: CodeType, compiler: str, box_id: int) -> str:
+    """
+    以編譯器設定、編譯指令與原始碼的雜湊值組成 key，checker 另外加上 testlib.h 的內容。
+    """
+    compiler_setting: CompilerSetting = _get_compiler_setting(compiler)
+    source_filename: str = compiler_setting.get_source_filename(type.value)
+
+    digest = hashlib.sha256()
+    digest.update(compiler.encode("utf-8"))
+    digest.update(compiler_setting.replace_parameter_in_command(compiler_setting.compile, type.value).encode("utf-8"))
+    with open(f"/var/local/lib/isolate/{box_id}/box/{source_filename}", "rb") as file:
+        digest.update(hashlib.sha256(file.read()).digest())
+    if type == CodeType.CHECKER:
+        with open(TESTLIB_PATH, "rb") as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+
+    return digest.hexdigest()
+
+
+def _link_or_copy(source: Path, destination: Path) -> None:
+    if destination.exists():
+        destination.unlink()
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def _get_compiler_setting(compiler: str) -> CompilerSetting:
+    setting: Setting = current_app.config["setting"]
+    return setting.compiler[compiler]
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final
+
+from flask import current_app
+from loguru import logger
+
+from setting.util import CompilerSetting, Setting
+
+TESTLIB_PATH: Final[str] = "/etc/nuoj-sandbox/backend/testlib.h"
+SANDBOX_HEADER_DIRECTORY: Final[str] = "/testlib"
+HEADER_NAME: Final[str] = "testlib.h"
+
+_build_lock = threading.Lock()
+_failed_fingerprints: set[str] = set()
+
+
+@dataclass
+class PrecompiledHeader:
+    compiler: str
+    directory: str
+    header_compile_time: float
+    hit: bool
+
+    def get_sandbox_header_path(self) -> str:
+        return f"{SANDBOX_HEADER_DIRECTORY}/{HEADER_NAME}"
+
+    def get_sandbox_directory_rule(self) -> tuple[str, str]:
+        return (f"{SANDBOX_HEADER_DIRECTORY}={self.directory}", "")
+
+
+def get_precompiled_header(compiler: str) -> PrecompiledHeader | None:
+    """
+    取得指定編譯器設定的 testlib.h 預編譯標頭檔，若快取不存在或已經失效（testlib.h 或編譯器有變動）就重新建置。
+    無法建置（例如 C 編譯器）時回傳 None，checker 會以一般的方式編譯。
+    """
+    setting: Setting = current_app.config["setting"]
+    compiler_setting: CompilerSetting = setting.compiler[compiler]
+    fingerprint: str = _make_fingerprint(compiler_setting)
+    directory: Path = _get_cache_directory() / f"{compiler}-{fingerprint}"
+
+    if fingerprint in _failed_fingerprints:
+        return None
+
+    with _build_lock:
+        if (directory / f"{HEADER_NAME}.gch").exists():
+            return _load_precompiled_header(compiler, directory, hit=True)
+
+        if not _build_precompiled_header(compiler, compiler_setting, directory):
+            _failed_fingerprints.add(fingerprint)
+            return None
+
+        return _load_precompiled_header(compiler, directory, hit=False)
+
+
+def _build_precompiled_header(compiler: str, compiler_setting: CompilerSetting, directory: Path) -> bool:
+    building_directory: Path = directory.with_name(f"{directory.name}.building")
+    shutil.rmtree(building_directory, ignore_errors=True)
+    building_directory.mkdir(parents=True)
+    shutil.copyfile(TESTLIB_PATH, building_directory / HEADER_NAME)
+
+    argv: list[str] = shlex.split(compiler_setting.get_header_compile_command(HEADER_NAME))
+    start_time: float = time.perf_counter()
+    try:
+        returncode: int = subprocess.run(argv, cwd=building_directory, capture_output=True).returncode
+    except FileNotFoundError:
+        returncode = 127
+    header_compile_time: float = time.perf_counter() - start_time
+
+    if returncode != 0:
+        logger.warning(f"Failed to precompile {HEADER_NAME} with compiler {compiler}.")
+        shutil.rmtree(building_directory, ignore_errors=True)
+        return False
+
+    with open(building_directory / "meta.json", "w") as file:
+        file.write(json.dumps({"header_compile_time": header_compile_time}))
+
+    os.rename(building_directory, directory)
+    logger.info(f"Precompiled {HEADER_NAME} for compiler {compiler} in {header_compile_time:.3f}s.")
+    return True
+
+
+def _load_precompiled_header(compiler: str, directory: Path, hit: bool) -> PrecompiledHeader:
+    with open(directory / "meta.json") as file:
+        meta: dict[str, float] = json.loads(file.read())
+    return PrecompiledHeader(
+        compiler=compiler,
+        directory=str(directory),
+        header_compile_time=meta["header_compile_time"],
+        hit=hit
+    )
+
+
+def remove_outdated_precompiled_headers() -> None:
+    """
+    app 建立時刪除已經失效的預編譯標頭檔，執行期間舊的版本可能還掛載在其他 box 中編譯 checker，所以不會在重新建置時刪除。
+    """
+    setting: Setting = current_app.config["setting"]
+    cache_directory: Path = _get_cache_directory()
+    if not cache_directory.exists():
+        return
+
+    try:
+        current_names: set[str] = {
+            f"{compiler}-{_make_fingerprint(compiler_setting)}" for compiler, compiler_setting in setting.compiler.items()
+        }
+    except OSError:
+        logger.warning(f"Failed to read {TESTLIB_PATH}, keep the precompiled headers.")
+        return
+    for path in cache_directory.iterdir():
+        if path.name not in current_names:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _make_fingerprint(compiler_setting: CompilerSetting) -> str:
+    """
+    以 testlib.h 的內容、編譯指令與編譯器執行檔的狀態產生指紋，任何一項變動都會讓快取失效。
+    """
+    digest = hashlib.sha256()
+    with open(TESTLIB_PATH, "rb") as file:
+        digest.update(file.read())
+    digest.update(compiler_setting.compile.encode("utf-8"))
+
+    compiler_path: str | None = shutil.which(compiler_setting.compile.split(" ", 1)[0])
+    if compiler_path is not None:
+        compiler_stat = os.stat(os.path.realpath(compiler_path))
+        digest.update(f"{os.path.realpath(compiler_path)}:{compiler_stat.st_size}:{compiler_stat.st_mtime_ns}".encode("utf-8"))
+
+    return digest.hexdigest()[:16]
+
+
+def _get_cache_directory() -> Path:
+    storage_path: str = current_app.config["STORAGE_PATH"]
+    return Path(storage_path) / "cache" / "header"
@@ -0,0 +1,47 @@
+import threading
+from typing import Any, Callable
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    相同 key 同時間只會有一個執行序真正執行 function，其他執行序會等待並共用同一個結果（或例外）。
+    """
+
+    def __init__(self) -> None:
+        self.shared: int = 0
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+
+    def do(self, key: str, function: Callable[[], Any]) -> Any:
+        with self._lock:
+            call: _Call | None = self._calls.get(key)
+            is_leader: bool = call is None
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.shared += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -0,0 +1,180 @@
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Hashable, Iterator
+
+
+class FileCache:
+    """
+    以目錄為單位的快取，每個 key 對應到 directory 底下的一個子目錄。
+    總大小超過 capacity（bytes）時會依照最近最少使用（LRU）的順序淘汰，並記錄命中與淘汰的統計資料。
+    被 pin 住（正在被任務使用）的 entry 不會被淘汰，直到擁有者呼叫 unpin。
+    """
+
+    def __init__(self, directory: Path, capacity: int) -> None:
+        self.directory: Path = directory
+        self.capacity: int = capacity
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.bytes_evicted: int = 0
+        self._lock = threading.Lock()
+        self._index: OrderedDict[str, int] | None = None
+        self._pins: dict[str, set[Hashable]] = {}
+
+    def lookup(self, key: str, owner: Hashable | None = None) -> Path | None:
+        """
+        取得 key 對應的目錄，有提供 owner 時會同時 pin 住該 entry。
+        """
+        with self._lock:
+            index: OrderedDict[str, int] = self._get_index()
+            entry_path: Path = self.directory / key
+            if key not in index or not entry_path.exists():
+                index.pop(key, None)
+                self.misses += 1
+                return None
+            index.move_to_end(key)
+            self.hits += 1
+            if owner is not None:
+                self._pins.setdefault(key, set()).add(owner)
+            os.utime(entry_path)
+        return entry_path
+
+    @contextmanager
+    def use(self, key: str) -> Iterator[Path | None]:
+        """
+        取得 key 對應的目錄並在區塊執行期間 pin 住，區塊中讀取或連結 entry 的檔案時不會被同時的 insert 淘汰。
+        """
+        owner: object = object()
+        entry_path: Path | None = self.lookup(key, owner)
+        try:
+            yield entry_path
+        finally:
+            if entry_path is not None:
+                self.unpin(owner)
+
+    def pin(self, key: str, owner: Hashable) -> bool:
+        """
+        pin 住已經存在的 entry，回傳 entry 是否存在。
+        """
+        with self._lock:
+            if key not in self._get_index():
+                return False
+            self._pins.setdefault(key, set()).add(owner)
+            return True
+
+    def get_pinned_keys(self, owner: Hashable) -> list[str]:
+        with self._lock:
+            return [key for key, owners in self._pins.items() if owner in owners]
+
+    def unpin(self, owner: Hashable) -> None:
+        """
+        解除 owner pin 住的所有 entry，並淘汰先前因為被使用而無法淘汰的 entry。
+        """
+        with self._lock:
+            for key in list(self._pins.keys()):
+                self._pins[key].discard(owner)
+                if not self._pins[key]:
+                    del self._pins[key]
+            self._evict(self._get_index())
+
+    def remove(self, key: str) -> bool:
+        """
+        移除沒有被 pin 住的 entry，回傳是否有移除。
+        """
+        with self._lock:
+            index: OrderedDict[str, int] = self._get_index()
+            if key in self._pins or key not in index:
+                return False
+            index.pop(key)
+            shutil.rmtree(self.directory / key, ignore_errors=True)
+            return True
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return list(self._get_index().keys())
+
+    def make_building_directory(self) -> Path:
+        with self._lock:
+            self._get_index()
+        building_directory: Path = self.directory / f".building-{uuid.uuid4()}"
+        building_directory.mkdir(parents=True)
+        return building_directory
+
+    def insert(self, key: str, building_directory: Path, owner: Hashable | None = None) -> Path:
+        """
+        將建置完成的目錄放入快取，同一個 key 已經存在時會保留舊的內容，有提供 owner 時會同時 pin 住該 entry。
+        """
+        entry_path: Path = self.directory / key
+        size: int = _get_directory_size(building_directory)
+        with self._lock:
+            index: OrderedDict[str, int] = self._get_index()
+            if entry_path.exists():
+                shutil.rmtree(building_directory, ignore_errors=True)
+            else:
+                os.rename(building_directory, entry_path)
+                index[key] = size
+            index.move_to_end(key)
+            if owner is not None:
+                self._pins.setdefault(key, set()).add(owner)
+            self._evict(index)
+        return entry_path
+
+    def get_statistics(self) -> dict[str, Any]:
+        with self._lock:
+            index: OrderedDict[str, int] = self._get_index()
+            lookups: int = self.hits + self.misses
+            return {
+                "entries": len(index),
+                "pinned": len(self._pins),
+                "size": sum(index.values()),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups > 0 else 0.0,
+                "evictions": self.evictions,
+                "bytes_evicted": self.bytes_evicted,
+            }
+
+    def _evict(self, index: OrderedDict[str, int]) -> None:
+        total_size: int = sum(index.values())
+        for key in list(index.keys())[:-1]:
+            if total_size <= self.capacity:
+                return
+            if key in self._pins:
+                continue
+            size: int = index.pop(key)
+            shutil.rmtree(self.directory / key, ignore_errors=True)
+            total_size -= size
+            self.evictions += 1
+            self.bytes_evicted += size
+
+    def _get_index(self) -> OrderedDict[str, int]:
+        """
+        第一次使用時從磁碟重建索引，以修改時間當作最後使用時間，讓重新啟動後仍保有 LRU 的順序。
+        """
+        if self._index is not None:
+            return self._index
+
+        self._index = OrderedDict()
+        if not self.directory.exists():
+            return self._index
+
+        entries: list[Path] = []
+        for path in self.directory.iterdir():
+            if path.name.startswith(".building-"):
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.is_dir():
+                entries.append(path)
+
+        for path in sorted(entries, key=lambda path: path.stat().st_mtime_ns):
+            self._index[path.name] = _get_directory_size(path)
+        return self._index
+
+
+def _get_directory_size(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
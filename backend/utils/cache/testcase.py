@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Hashable
+
+from flask import current_app
+from loguru import logger
+
+from storage.testcase_pack import MappedTestcasePack, convert_json_to_testcase_pack, is_testcase_pack
+from utils.cache.single_flight import SingleFlight
+from utils.cache.store import FileCache
+
+PACK_NAME = "testcase.pack"
+UNPACKED_DIRECTORY_NAME = "unpacked"
+
+
+@dataclass
+class CachedTestcase:
+    filename: str
+    directory: Path
+    etag: str
+    version_id: str | None
+    size: int
+
+    def get_input_path(self, index: int) -> Path:
+        return self.directory / UNPACKED_DIRECTORY_NAME / f"{index+1}.in"
+
+
+class TestcaseCache:
+    """
+    本機的測資快取，每個測資版本（以 ETag 區分）是一個 FileCache entry，裡面有 pack、解開的測資與記錄 ETag 與版本的 meta.json。
+    解開的測資會唯讀掛載到沙盒中，所以正在被任務使用的版本會被 pin 住，不會被淘汰或因為更新而被刪除。
+    同一個測資同時只會有一個執行序在驗證或下載（single flight），驗證過的版本在 validation_interval 秒內不會再次驗證。
+    """
+
+    __test__ = False
+
+    def __init__(self, directory: Path, capacity: int, validation_interval: float = 0) -> None:
+        self.store: FileCache = FileCache(directory, capacity)
+        self.validation_interval: float = validation_interval
+        self.hits: int = 0
+        self.misses: int = 0
+        self.stale: int = 0
+        self._lock = threading.Lock()
+        self._latest_keys: dict[str, str] | None = None
+        self._validated_at: dict[str, float] = {}
+        self._stale_keys: set[str] = set()
+        self._single_flight = SingleFlight()
+
+    def refresh(self, filename: str, refresher: Callable[[CachedTestcase | None], bool]) -> bool:
+        """
+        確保 filename 最新的版本已經在快取中，refresher 會收到目前快取的版本，負責驗證並在需要時下載新的版本，回傳測資是否存在。
+        同時間對同一個測資的呼叫會共用同一次 refresher 的結果。
+        """
+        def refresh_once() -> bool:
+            cached_testcase: CachedTestcase | None = self.get_latest(filename)
+            with self._lock:
+                validated_at: float | None = self._validated_at.get(filename)
+            if cached_testcase is not None and validated_at is not None and time.monotonic() - validated_at < self.validation_interval:
+                self._record_lookup(hit=True)
+                return True
+
+            is_available: bool = refresher(cached_testcase)
+            with self._lock:
+                if is_available:
+                    self._validated_at[filename] = time.monotonic()
+                else:
+                    self._validated_at.pop(filename, None)
+            return is_available
+
+        return self._single_flight.do(filename, refresh_once)
+
+    def get_latest(self, filename: str) -> CachedTestcase | None:
+        with self._lock:
+            key: str | None = self._get_latest_keys().get(filename)
+        if key is None or not (self.store.directory / key).exists():
+            return None
+        return _load_cached_testcase(self.store.directory / key)
+
+    def lookup(self, filename: str, owner: Hashable) -> CachedTestcase | None:
+        """
+        將 filename 最新的快取版本 pin 給 owner，owner 呼叫 release 之前這個版本都不會被刪除。
+        """
+        with self._lock:
+            key: str | None = self._get_latest_keys().get(filename)
+        entry_path: Path | None = None if key is None else self.store.lookup(key, owner)
+        return None if entry_path is None else _load_cached_testcase(entry_path)
+
+    def record_validation(self, hit: bool) -> None:
+        """
+        記錄快取的版本是否仍然有效（命中），或是需要下載新的版本。
+        """
+        self._record_lookup(hit)
+
+    def make_building_directory(self) -> Path:
+        return self.store.make_building_directory()
+
+    def insert(self, filename: str, building_directory: Path, source_name: str, etag: str, version_id: str | None, owner: Hashable | None = None) -> CachedTestcase:
+        """
+        將建置目錄中的測資（pack 或舊的 JSON 格式）轉成 pack 並解開，放入快取後成為 filename 最新的版本，有提供 owner 時會 pin 給 owner。
+        沒有被使用的舊版本會直接被刪除，正在被使用的舊版本則會在最後一個使用者 release 後刪除。
+        """
+        source_path: Path = building_directory / source_name
+        if is_testcase_pack(source_path):
+            os.rename(source_path, building_directory / PACK_NAME)
+        else:
+            convert_json_to_testcase_pack(source_path, building_directory / PACK_NAME)
+            source_path.unlink()
+
+        unpacked_directory: Path = building_directory / UNPACKED_DIRECTORY_NAME
+        unpacked_directory.mkdir()
+        with MappedTestcasePack(building_directory / PACK_NAME) as testcase_pack:
+            size: int = len(testcase_pack)
+            for i in range(size):
+                testcase_pack.write_to(i, unpacked_directory / f"{i+1}.in")
+        building_directory.chmod(0o755)
+
+        with open(building_directory / "meta.json", "w") as file:
+            file.write(json.dumps({
+                "filename": filename, "etag": etag, "version_id": version_id, "size": size, "fetched_at": time.time()
+            }))
+
+        key: str = f"{filename}.{hashlib.sha256(etag.encode('utf-8')).hexdigest()[:16]}"
+        entry_path: Path = self.store.insert(key, building_directory, owner)
+        with self._lock:
+            latest_keys: dict[str, str] = self._get_latest_keys()
+            previous_key: str | None = latest_keys.get(filename)
+            latest_keys[filename] = key
+            self._stale_keys.discard(key)
+        if previous_key is not None and previous_key != key:
+            self.stale += 1
+            if not self.store.remove(previous_key):
+                with self._lock:
+                    self._stale_keys.add(previous_key)
+        logger.info(f"Cache the testcase {filename} with ETag {etag}.")
+        return _load_cached_testcase(entry_path)
+
+    def share(self, owner: Hashable, new_owner: Hashable) -> None:
+        """
+        將 owner pin 住的所有版本也 pin 給 new_owner，平行評測借用的 box 會使用主要 box 的測資。
+        """
+        for key in self.store.get_pinned_keys(owner):
+            self.store.pin(key, new_owner)
+
+    def get_pinned_directories(self, owner: Hashable) -> list[Path]:
+        return [self.store.directory / key for key in self.store.get_pinned_keys(owner)]
+
+    def release(self, owner: Hashable) -> None:
+        """
+        解除 owner pin 住的所有版本，並刪除已經不再被使用的舊版本。
+        """
+        self.store.unpin(owner)
+        with self._lock:
+            stale_keys: list[str] = list(self._stale_keys)
+        for key in stale_keys:
+            if self.store.remove(key) or not (self.store.directory / key).exists():
+                with self._lock:
+                    self._stale_keys.discard(key)
+
+    def get_statistics(self) -> dict[str, Any]:
+        with self._lock:
+            lookups: int = self.hits + self.misses
+            statistics: dict[str, Any] = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups > 0 else 0.0,
+                "stale": self.stale,
+                "shared_downloads": self._single_flight.shared,
+            }
+        return self.store.get_statistics() | statistics
+
+    def _record_lookup(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _get_latest_keys(self) -> dict[str, str]:
+        """
+        第一次使用時從各個 entry 的 meta.json 找出每個測資最新的版本。
+        """
+        if self._latest_keys is not None:
+            return self._latest_keys
+
+        latest: dict[str, tuple[float, str]] = {}
+        for key in self.store.keys():
+            try:
+                with open(self.store.directory / key / "meta.json") as file:
+                    meta: dict[str, Any] = json.loads(file.read())
+            except (OSError, ValueError):
+                continue
+            if meta["filename"] not in latest or latest[meta["filename"]][0] < meta["fetched_at"]:
+                latest[meta["filename"]] = (meta["fetched_at"], key)
+        self._latest_keys = {filename: key for filename, (_, key) in latest.items()}
+        return self._latest_keys
+
+
+def get_testcase_directory_rules(box_id: int) -> list[tuple[str, str]]:
+    """
+    只把 box pin 住的測資版本以相同的路徑唯讀掛載到沙盒中，box 裡指向快取測資的 N.in 連結在沙盒內外都可以使用，
+    沙盒中的程式看不到快取中其他題目的測資。
+    """
+    testcase_cache: TestcaseCache = current_app.config["testcase_cache"]
+    return [(str(directory.absolute()), "") for directory in testcase_cache.get_pinned_directories(box_id)]
+
+
+def make_local_etag(path: str | Path) -> str:
+    """
+    直接放在 storage 中的測資沒有 ETag，以檔案的大小與修改時間代替。
+    """
+    stat = os.stat(path)
+    return f"local-{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def _load_cached_testcase(entry_path: Path) -> CachedTestcase:
+    with open(entry_path / "meta.json") as file:
+        meta: dict[str, Any] = json.loads(file.read())
+    return CachedTestcase(
+        filename=meta["filename"], directory=entry_path, etag=meta["etag"], version_id=meta["version_id"], size=meta["size"]
+    )
@@ -0,0 +1,273 @@
+import math
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+
+from utils.sandbox.enum import Comparator
+
+CHUNK_SIZE = 1 << 16
+FLOAT_BLOCK_SIZE = 1 << 22
+LOG_TOKEN_LENGTH = 64
+WHITESPACE = b" \t\n\r\x0b\x0c"
+
+_TOKEN = re.compile(rb"\S+")
+
+
+@dataclass
+class ComparisonResult:
+    """
+    比對的結果，exitcode 與 log 的格式與 testlib checker 相同（0 為 ok、1 為 wrong answer、3 為 fail）。
+    """
+    exitcode: int
+    log: str
+
+
+def compare_testcase(comparator: str, testcase_index: int, box_id: int, float_tolerance: float) -> dict[str, Any]:
+    """
+    在評測程序中直接比對 box 中的 N.out 與 N.ans，不需要編譯與執行 checker。
+    比對的訊息會寫到 checker 的訊息檔，回傳與 checker meta 相同格式的 dict。
+    """
+    box_path: Path = Path(f"/var/local/lib/isolate/{box_id}/box")
+    start_time: float = time.perf_counter()
+    result: ComparisonResult = compare_output(
+        comparator, box_path / f"{testcase_index+1}.out", box_path / f"{testcase_index+1}.ans", float_tolerance
+    )
+    elapsed_time: float = time.perf_counter() - start_time
+
+    (box_path / f"{testcase_index+1}.checker.msg").write_text(result.log)
+    return {
+        "time": f"{elapsed_time:.3f}",
+        "time-wall": f"{elapsed_time:.3f}",
+        "max-rss": "0",
+        "exitcode": str(result.exitcode),
+        "comparator": comparator,
+    }
+
+
+def compare_output(comparator: str, output_path: Path, answer_path: Path, float_tolerance: float = 1e-6) -> ComparisonResult:
+    if comparator == Comparator.TOKEN.value:
+        return compare_tokens(output_path, answer_path)
+    if comparator == Comparator.LINE.value:
+        return compare_lines(output_path, answer_path)
+    if comparator == Comparator.FLOAT.value:
+        return compare_floats(output_path, answer_path, float_tolerance)
+    raise Exception("Unexcepted comparator:", comparator)
+
+
+def compare_tokens(output_path: Path, answer_path: Path) -> ComparisonResult:
+    """
+    以空白分隔的 token 逐一比對，與 testlib 的 wcmp 相同。
+    """
+    output_tokens: Iterator[tuple[bytes, int]] = read_tokens(output_path)
+    count: int = 0
+    for answer, answer_line in read_tokens(answer_path):
+        count += 1
+        output: tuple[bytes, int] | None = next(output_tokens, None)
+        if output is None:
+            return _wrong_answer(
+                f"Unexpected EOF in the participants output, expected: '{_compress(answer)}' "
+                f"({_ordinal(count)} token, line {answer_line} of the answer)"
+            )
+        if output[0] != answer:
+            return _wrong_answer(
+                f"{_ordinal(count)} words differ - expected: '{_compress(answer)}', found: '{_compress(output[0])}' "
+                f"(line {output[1]} of the output, line {answer_line} of the answer)"
+            )
+
+    extra: tuple[bytes, int] | None = next(output_tokens, None)
+    if extra is not None:
+        return _wrong_answer(f"Participant output contains extra tokens, found: '{_compress(extra[0])}' (line {extra[1]} of the output)")
+    return ComparisonResult(0, f"ok {count} tokens")
+
+
+def compare_lines(output_path: Path, answer_path: Path) -> ComparisonResult:
+    """
+    逐行比對每一行的 token，行內空白的數量與檔案結尾的空行不影響結果，與 testlib 的 lcmp 相同。
+    """
+    with open(output_path, "rb") as output_file, open(answer_path, "rb") as answer_file:
+        line_number: int = 0
+        blank_lines: int = 0
+        while True:
+            output_line: bytes | None = output_file.readline() or None
+            answer_line: bytes | None = answer_file.readline() or None
+            if output_line is None and answer_line is None:
+                return ComparisonResult(0, f"ok {line_number - blank_lines} lines")
+
+            line_number += 1
+            output_tokens: list[bytes] = [] if output_line is None else output_line.split()
+            answer_tokens: list[bytes] = [] if answer_line is None else answer_line.split()
+            if output_tokens != answer_tokens:
+                return _wrong_answer(
+                    f"{_ordinal(line_number)} lines differ - expected: '{_compress(b' '.join(answer_tokens))}', "
+                    f"found: '{_compress(b' '.join(output_tokens))}'"
+                )
+            blank_lines = blank_lines + 1 if len(answer_tokens) == 0 else 0
+
+
+def compare_floats(output_path: Path, answer_path: Path, tolerance: float) -> ComparisonResult:
+    """
+    以 NumPy 一次解析一整個區塊的數字並向量化比對，判斷方式與 compare_floats_by_token 相同。
+    有不同的數字、無法解析的 token 或數量不同時，改用 compare_floats_by_token 從頭比對到第一個錯誤，產生相同格式的訊息。
+    """
+    try:
+        count: int | None = _count_close_floats(output_path, answer_path, tolerance)
+    except ValueError:
+        count = None
+    if count is None:
+        return compare_floats_by_token(output_path, answer_path, tolerance)
+    return ComparisonResult(0, f"ok {count} numbers")
+
+
+def compare_floats_by_token(output_path: Path, answer_path: Path, tolerance: float) -> ComparisonResult:
+    """
+    逐一將每個 token 視為浮點數比對，絕對誤差或相對誤差不超過 tolerance 即視為相同，與 testlib 的 doubleCompare 相同。
+    """
+    output_tokens: Iterator[tuple[bytes, int]] = read_tokens(output_path)
+    count: int = 0
+    for answer, answer_line in read_tokens(answer_path):
+        count += 1
+        expected: float | None = _parse_float(answer)
+        if expected is None:
+            return ComparisonResult(3, f"FAIL Expected double in the answer, but \"{_compress(answer)}\" found (line {answer_line})")
+
+        output: tuple[bytes, int] | None = next(output_tokens, None)
+        if output is None:
+            return _wrong_answer(f"Unexpected EOF in the participants output, expected {count} numbers at least")
+        found: float | None = _parse_float(output[0])
+        if found is None:
+            return _wrong_answer(
+                f"Expected double, but \"{_compress(output[0])}\" found ({_ordinal(count)} number, line {output[1]} of the output)"
+            )
+        if not is_double_close(expected, found, tolerance):
+            return _wrong_answer(
+                f"{_ordinal(count)} numbers differ - expected: '{expected:.6f}', found: '{found:.6f}', "
+                f"error = '{double_delta(expected, found):.6f}' (line {output[1]} of the output)"
+            )
+
+    extra: tuple[bytes, int] | None = next(output_tokens, None)
+    if extra is not None:
+        return _wrong_answer(f"Participant output contains extra tokens, found: '{_compress(extra[0])}' (line {extra[1]} of the output)")
+    return ComparisonResult(0, f"ok {count} numbers")
+
+
+def _count_close_floats(output_path: Path, answer_path: Path, tolerance: float) -> int | None:
+    """
+    回傳比對的數字數量，有任何不同時回傳 None，有無法解析的 token 時會產生 ValueError。
+    """
+    output_blocks: Iterator[np.ndarray] = read_float_blocks(output_path)
+    answer_blocks: Iterator[np.ndarray] = read_float_blocks(answer_path)
+    output_block: np.ndarray = np.empty(0)
+    answer_block: np.ndarray = np.empty(0)
+    count: int = 0
+    while True:
+        if len(answer_block) == 0:
+            answer_block = next(answer_blocks, None)
+            if answer_block is None:
+                return count if len(output_block) == 0 and next(output_blocks, None) is None else None
+        if len(output_block) == 0:
+            output_block = next(output_blocks, None)
+            if output_block is None:
+                return None
+
+        length: int = min(len(output_block), len(answer_block))
+        if not is_double_close_vectorized(answer_block[:length], output_block[:length], tolerance).all():
+            return None
+        count += length
+        output_block, answer_block = output_block[length:], answer_block[length:]
+
+
+def read_float_blocks(path: Path) -> Iterator[np.ndarray]:
+    """
+    以 FLOAT_BLOCK_SIZE 為單位讀取檔案，將每個區塊完整的 token 一次轉換成 float64 陣列。
+    """
+    carry: bytes = b""
+    with open(path, "rb") as file:
+        while chunk := file.read(FLOAT_BLOCK_SIZE):
+            data: bytes = carry + chunk
+            boundary: int = max(data.rfind(character) for character in WHITESPACE) + 1
+            tokens: list[bytes] = data[:boundary].split()
+            carry = data[boundary:]
+            if tokens:
+                yield np.array(tokens, dtype=np.float64)
+    if carry:
+        yield np.array([carry], dtype=np.float64)
+
+
+def is_double_close_vectorized(expected: np.ndarray, found: np.ndarray, tolerance: float) -> np.ndarray:
+    with np.errstate(invalid="ignore", over="ignore"):
+        is_nan: np.ndarray = np.isnan(expected) | np.isnan(found)
+        is_inf: np.ndarray = np.isinf(expected) | np.isinf(found)
+        minimum: np.ndarray = np.minimum(expected * (1 - tolerance), expected * (1 + tolerance))
+        maximum: np.ndarray = np.maximum(expected * (1 - tolerance), expected * (1 + tolerance))
+        is_close: np.ndarray = (np.abs(found - expected) <= tolerance + 1e-15) | (
+            (found + 1e-15 >= minimum) & (found <= maximum + 1e-15)
+        )
+    return np.where(is_nan, np.isnan(expected) & np.isnan(found), np.where(is_inf, expected == found, is_close))
+
+
+def is_double_close(expected: float, found: float, tolerance: float) -> bool:
+    if math.isnan(expected) or math.isnan(found):
+        return math.isnan(expected) and math.isnan(found)
+    if math.isinf(expected) or math.isinf(found):
+        return expected == found
+    if abs(found - expected) <= tolerance + 1e-15:
+        return True
+    minimum, maximum = sorted((expected * (1 - tolerance), expected * (1 + tolerance)))
+    return found + 1e-15 >= minimum and found <= maximum + 1e-15
+
+
+def double_delta(expected: float, found: float) -> float:
+    absolute: float = abs(found - expected)
+    if abs(expected) > 1e-9:
+        return min(absolute, absolute / abs(expected))
+    return absolute
+
+
+def read_tokens(path: Path) -> Iterator[tuple[bytes, int]]:
+    """
+    以固定大小的區塊讀取檔案，依序產生每個 token 與所在的行號，不需要把整個檔案讀進記憶體。
+    """
+    line_number: int = 1
+    carry: bytes = b""
+    with open(path, "rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            data: bytes = carry + chunk
+            # 最後一個 token 可能被區塊切開，留到下一個區塊一起處理。
+            boundary: int = max(data.rfind(character) for character in WHITESPACE) + 1
+            body, carry = data[:boundary], data[boundary:]
+            position: int = 0
+            for match in _TOKEN.finditer(body):
+                line_number += body.count(b"\n", position, match.start())
+                position = match.start()
+                yield match.group(), line_number
+            line_number += body.count(b"\n", position)
+    if carry:
+        yield carry, line_number
+
+
+def _parse_float(token: bytes) -> float | None:
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+
+def _wrong_answer(message: str) -> ComparisonResult:
+    return ComparisonResult(1, f"wrong answer {message}")
+
+
+def _compress(token: bytes) -> str:
+    text: str = token.decode("utf-8", errors="replace")
+    if len(text) <= LOG_TOKEN_LENGTH:
+        return text
+    return f"{text[:30]}...{text[-31:]}"
+
+
+def _ordinal(number: int) -> str:
+    if number % 100 in (11, 12, 13):
+        return f"{number}th"
+    return f"{number}{({1: 'st', 2: 'nd', 3: 'rd'}).get(number % 10, 'th')}"
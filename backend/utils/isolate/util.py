@@ -4,15 +4,23 @@ The Isolate toolbox by Uriah Xuan for developing NuOJ System.
 Due to isolate is a command-execute program, so you can use this tool if you want :D
 """
 
-import subprocess
+import hashlib
 import os
+import shlex
+import subprocess
+from collections import deque
+from typing import Any
 from utils.sandbox.enum import CodeType, Language
 
 from flask import current_app
+from loguru import logger
 
 from setting.util import CompilerSetting, Setting
+from utils.cache.precompiled_header import PrecompiledHeader
+from utils.cache.testcase import get_testcase_directory_rules
+from utils.metrics.util import isolate_invocations
 
-def generate_options_with_parameter(
+def generate_option_list_with_parameter(
     box_id: int | None = None,
     time: int | None = None,
     wall_time: int | None = None,
@@ -31,9 +39,9 @@ def generate_options_with_parameter(
     cg: bool = False,
     cg_mem: int | None = None,
     cg_timing: int | None = None,
-    dir: tuple[str, str] = None,
+    dir: tuple[str, str] | list[tuple[str, str]] | None = None,
     mem: int | None = None
-) -> str:
+) -> list[str]:
     values_options_map = {
         "--time": time,
         "--wall-time": wall_time,
@@ -58,24 +66,28 @@ def generate_options_with_parameter(
         "--cg": cg,
     }
 
-    options = ""
+    options: list[str] = []
 
     for key in values_options_map.keys():
         if values_options_map[key] == None:
             continue
-        options += f"{key}={values_options_map[key]} "
+        options.append(f"{key}={values_options_map[key]}")
 
     for key in boolean_options_map.keys():
         if boolean_options_map[key] == False:
             continue
-        options += f"{key} "
+        options.append(key)
 
-    if dir is not None:
-        options += f"--dir={dir[0]}:{dir[1]} "
+    for rule in [dir] if isinstance(dir, tuple) else dir or []:
+        options.append(f"--dir={rule[0]}:{rule[1]}" if rule[1] else f"--dir={rule[0]}")
 
     return options
 
 
+def generate_options_with_parameter(*args, **kwargs) -> str:
+    return "".join(f"{option} " for option in generate_option_list_with_parameter(*args, **kwargs))
+
+
 def generate_isolate_run_command(
     execute_command: str,
     box_id: int,
@@ -85,12 +97,49 @@ def generate_isolate_run_command(
     stdout: str | None = None,
     stderr: str | None = None,
     meta: str | None = None,
-    dir: tuple[str, str] | None = None,
+    dir: tuple[str, str] | list[tuple[str, str]] | None = None,
     mem: int | None = None,
+    fsize: int | None = None,
 ) -> str:
+    options = _generate_run_option_list(box_id, wall_time, time, stdin, stdout, stderr, meta, dir, mem, fsize)
+    return f"isolate {''.join(f'{option} ' for option in options)} --run -- {execute_command}"
+
+
+def generate_isolate_run_argv(
+    execute_argv: list[str],
+    box_id: int,
+    wall_time: int | None = None,
+    time: int | None = None,
+    stdin: str | None = None,
+    stdout: str | None = None,
+    stderr: str | None = None,
+    meta: str | None = None,
+    dir: tuple[str, str] | list[tuple[str, str]] | None = None,
+    mem: int | None = None,
+    fsize: int | None = None,
+) -> list[str]:
+    """
+    Generate the argument list of the isolate run, it can be spawned directly without the shell.
+    """
+    options = _generate_run_option_list(box_id, wall_time, time, stdin, stdout, stderr, meta, dir, mem, fsize)
+    return ["isolate", *options, "--run", "--", *execute_argv]
+
+
+def _generate_run_option_list(
+    box_id: int,
+    wall_time: int | None,
+    time: int | None,
+    stdin: str | None,
+    stdout: str | None,
+    stderr: str | None,
+    meta: str | None,
+    dir: tuple[str, str] | list[tuple[str, str]] | None,
+    mem: int | None,
+    fsize: int | None = None,
+) -> list[str]:
     control_group: bool = current_app.config["control_group"]
     # --box-id=%d --time=%d --wall-time=%d --cg-mem 256000 -p --full-env --meta='%s' --stdin='%d.in' --stdout='%s' --meta='%s'
-    options = generate_options_with_parameter(
+    return generate_option_list_with_parameter(
         box_id=box_id,
         time=time,
         wall_time=wall_time,
@@ -103,9 +152,9 @@ def generate_isolate_run_command(
         open_files=2048,
         cg=control_group,
         dir=dir,
-        mem=mem
+        mem=mem,
+        fsize=fsize
     )
-    return f"isolate {options} --run -- {execute_command}"
 
 
 def generate_isolate_init_command(box_id: int) -> str:
@@ -120,6 +169,39 @@ def generate_isolate_cleanup_command(box_id: int) -> str:
     return f"isolate {options} --cleanup"
 
 
+def generate_isolate_init_argv(box_id: int) -> list[str]:
+    control_group: bool = current_app.config["control_group"]
+    return ["isolate", *generate_option_list_with_parameter(cg=control_group, box_id=box_id), "--init"]
+
+
+def generate_isolate_cleanup_argv(box_id: int) -> list[str]:
+    control_group: bool = current_app.config["control_group"]
+    return ["isolate", *generate_option_list_with_parameter(cg=control_group, box_id=box_id), "--cleanup"]
+
+
+def spawn_isolate(argv: list[str]) -> int:
+    """
+    Spawn the isolate process with the argument list and wait for it.
+    It uses posix_spawn directly, so there is only one process spawned for each isolate invocation and no shell involved.
+
+        Parameters:
+            argv: The argument list, the first element is the program.
+
+        Return:
+            The exit code of the isolate process, 127 if the program is not found like the shell does.
+    """
+    isolate_invocations.inc(action=next((arg[2:] for arg in argv if arg in ("--init", "--run", "--cleanup")), "other"))
+    try:
+        if not hasattr(os, "posix_spawnp"):
+            return subprocess.call(argv)
+        pid = os.posix_spawnp(argv[0], argv, os.environ)
+    except FileNotFoundError:
+        logger.error(f"{argv[0]}: command not found")
+        return 127
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
 def get_compiler_settings():
     compiler_settings: dict[str, CompilerSetting] | None = None
 
@@ -130,7 +212,7 @@ def get_compiler_settings():
     assert compiler_settings is not None
     return compiler_settings
 
-def get_compile_command(type: str, compiler: str):
+def get_compile_command(type: str, compiler: str, precompiled_header: str | None = None):
     compiler_settings: dict[str, CompilerSetting] = get_compiler_settings()
 
     if type == CodeType.SUBMIT.value:
@@ -139,7 +221,7 @@ def get_compile_command(type: str, compiler: str):
     if type == CodeType.SOLUTION.value:
         return compiler_settings[compiler].get_solution_compile_command()
     
-    return compiler_settings[compiler].get_checker_compile_command()
+    return compiler_settings[compiler].get_checker_compile_command(precompiled_header)
 
 def get_execute_command(type, compiler: str):
     compiler_settings: dict[str, CompilerSetting] = get_compiler_settings()
@@ -159,8 +241,7 @@ def init_sandbox(box_id=0):
             box_id: The specific ID of the sandbox
 
     """
-    command = generate_isolate_init_command(box_id)
-    subprocess.call(command, shell=True)
+    spawn_isolate(generate_isolate_init_argv(box_id))
 
 
 def touch_text_file(text, type: CodeType, compiler: str, box_id=0) -> tuple:
@@ -245,7 +326,54 @@ def read_output(output_index, type, box_id=0) -> str:
     output_path = ("/var/local/lib/isolate/%d/box/" + output_file) % (box_id)
     with open(output_path, "r") as code_file:
         return code_file.read()
-    
+
+
+def capture_output(output_index, type, box_id=0, capture_limit=65536) -> dict[str, Any]:
+    """
+    Capture the output file in chunks, only the head and the tail of the output are kept if it is larger than the limit.
+
+        Parameters:
+            output_index: The index of the output file you want to capture.
+            type: The type of code, reference CodeType class.
+            box_id: The ID of the sandbox you want to capture the output.
+            capture_limit: The maximum bytes of the output kept, the head and the tail take half of it respectively.
+
+        Return:
+            A dict with the head and the tail of the output, the total size, the sha256 of the whole output and whether it is truncated.
+
+    """
+    output_file = (
+        "%d.out" % (output_index+1)
+        if type == CodeType.SUBMIT.value
+        else "%d.ans" % (output_index+1)
+    )
+    output_path = ("/var/local/lib/isolate/%d/box/" + output_file) % (box_id)
+    digest = hashlib.sha256()
+    size: int = 0
+    head: bytearray = bytearray()
+    tail: deque[bytes] = deque()
+    tail_size: int = 0
+    with open(output_path, "rb") as output:
+        for chunk in iter(lambda: output.read(1 << 16), b""):
+            digest.update(chunk)
+            size += len(chunk)
+            if len(head) < capture_limit:
+                head += chunk[:capture_limit - len(head)]
+            tail.append(chunk)
+            tail_size += len(chunk)
+            while tail_size - len(tail[0]) >= capture_limit // 2:
+                tail_size -= len(tail.popleft())
+
+    truncated: bool = size > capture_limit
+    return {
+        "head": bytes(head[:capture_limit // 2] if truncated else head).decode("utf-8", errors="replace"),
+        "tail": b"".join(tail)[-(capture_limit // 2):].decode("utf-8", errors="replace") if truncated else "",
+        "size": size,
+        "sha256": digest.hexdigest(),
+        "truncated": truncated,
+    }
+
+
 def read_checker_log(output_index, box_id=0) -> str:
     """
     Return the output file of text, the result after the Isolate run.
@@ -271,11 +399,10 @@ def cleanup_sandbox(box_id=0):
             box_id: The ID of the sandbox you want to cleanup.
 
     """
-    command = generate_isolate_cleanup_command(box_id)
-    subprocess.call(command, shell=True)
+    spawn_isolate(generate_isolate_cleanup_argv(box_id))
 
 
-def compile(type, language, box_id=0) -> str:
+def compile(type, language, box_id=0, precompiled_header: PrecompiledHeader | None = None) -> str:
     """
     Compile the program on the specific ID of the sandbox.
 
@@ -283,6 +410,7 @@ def compile(type, language, box_id=0) -> str:
             type: The type of code, reference CodeType class.
             langauge: The language of code, reference Langauge class.
             box_id: The ID of the sandbox you want to compile the program.
+            precompiled_header: The precompiled testlib.h, it will be mounted read-only and included by the compile command.
 
         Return:
             A string of results on the meta file after finished compiled.
@@ -290,12 +418,14 @@ def compile(type, language, box_id=0) -> str:
     """
     meta_name = f"{type}.compile"
     meta_path = f"/var/local/lib/isolate/{box_id}/box/{meta_name}.mt"
-    compile_command = get_compile_command(type, language)
-    command = generate_isolate_run_command(
-        compile_command, box_id, time=10, meta=meta_path
+    header_path = None if precompiled_header is None else precompiled_header.get_sandbox_header_path()
+    directory_rule = None if precompiled_header is None else precompiled_header.get_sandbox_directory_rule()
+    compile_command = get_compile_command(type, language, header_path)
+    argv = generate_isolate_run_argv(
+        shlex.split(compile_command), box_id, time=10, meta=meta_path, dir=directory_rule
     )
     touch_text_file_by_file_name("init", f"{meta_name}.mt", box_id)
-    subprocess.call(command, shell=True)
+    spawn_isolate(argv)
     return read_meta(box_id, name=meta_name)
 
 
@@ -316,19 +446,21 @@ def execute(type, test_case_index, time, wall_time, memory, language, box_id=0)
 
     """
     exec_command = get_execute_command(type, language)
+    setting: Setting = current_app.config["setting"]
     extension = "out" if CodeType.SUBMIT.value == type else "ans"
     meta_name = f"{test_case_index+1}.{extension}"
     meta_path = f"/var/local/lib/isolate/{box_id}/box/{meta_name}.mt"
     touch_text_file_by_file_name("init", f"{meta_name}.mt", box_id)
     input_file = f"{test_case_index+1}.in"
     output_file = f"{test_case_index+1}.{extension}"
-    command = generate_isolate_run_command(
-        exec_command, box_id, wall_time, time, input_file, output_file, meta=meta_path, mem=memory
+    argv = generate_isolate_run_argv(
+        shlex.split(exec_command), box_id, wall_time, time, input_file, output_file, meta=meta_path,
+        dir=get_testcase_directory_rules(box_id), mem=memory, fsize=setting.output.file_size_limit
     )
     touch_text_file_by_file_name("init", output_file, box_id)
     
     print(f"Execute testcase {test_case_index+1}")
-    subprocess.call(command, shell=True)
+    spawn_isolate(argv)
     print(f"read meta {meta_name}.mt")
     meta = read_meta(box_id, name=meta_name)
     return meta
@@ -356,11 +488,12 @@ def checker(test_case_index, time, wall_time, box_id):
     input_name = f"{test_case_index+1}.in"
     output_name = f"{test_case_index+1}.out"
     answer_name = f"{test_case_index+1}.ans"
-    execute_command = f"{code_output} {input_name} {output_name} {answer_name}"
-    command = generate_isolate_run_command(
-        execute_command, box_id, wall_time=wall_time, time=time, meta=meta_path, stderr=checker_msg_file_name, mem=131072
+    execute_argv = [code_output, input_name, output_name, answer_name]
+    argv = generate_isolate_run_argv(
+        execute_argv, box_id, wall_time=wall_time, time=time, meta=meta_path, stderr=checker_msg_file_name,
+        dir=get_testcase_directory_rules(box_id), mem=131072
     )
     
-    subprocess.call(command, shell=True)
+    spawn_isolate(argv)
     meta = read_meta(box_id, name=meta_name)
     return meta
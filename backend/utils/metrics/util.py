@@ -0,0 +1,205 @@
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Final, Iterator
+
+DEFAULT_BUCKETS: Final[tuple[float, ...]] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUEUE_WAIT_BUCKETS: Final[tuple[float, ...]] = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+class _Metric(ABC):
+    """
+    所有指標共用的部分，每個指標有自己的鎖，更新時只需要一次字典操作，不會掃描任何檔案。
+    """
+    type: str = ""
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = ()) -> None:
+        self.name: str = name
+        self.help: str = help
+        self.label_names: tuple[str, ...] = label_names
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if labels.keys() != set(self.label_names):
+            raise Exception("Unexcepted labels:", self.name, labels)
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _format_labels(self, key: tuple[str, ...], extra: tuple[tuple[str, str], ...] = ()) -> str:
+        pairs: list[tuple[str, str]] = list(zip(self.label_names, key)) + list(extra)
+        if len(pairs) == 0:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}", *self._render_samples()]
+
+    @abstractmethod
+    def _render_samples(self) -> list[str]:
+        pass
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key: tuple[str, ...] = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self) -> list[str]:
+        with self._lock:
+            values: list[tuple[tuple[str, ...], float]] = sorted(self._values.items())
+        return [f"{self.name}{self._format_labels(key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key: tuple[str, ...] = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self) -> list[str]:
+        with self._lock:
+            values: list[tuple[tuple[str, ...], float]] = sorted(self._values.items())
+        return [f"{self.name}{self._format_labels(key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    """
+    每個 bucket 只記錄落在該區間的數量，輸出時才累加成 Prometheus 需要的累積數量。
+    """
+    type = "histogram"
+
+    def __init__(
+        self, name: str, help: str, label_names: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, help, label_names)
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets))
+        # 每個 label 組合對應 [各 bucket 的數量..., +Inf 的數量]、總和與次數。
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key: tuple[str, ...] = self._key(labels)
+        index: int = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = ([0] * (len(self.buckets) + 1), [0.0, 0])
+            counts, total = self._values[key]
+            counts[index] += 1
+            total[0] += value
+            total[1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """
+        以 monotonic clock 計算區塊執行的秒數，發生例外時也會記錄。
+        """
+        start_time: int = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.observe((time.perf_counter_ns() - start_time) / 1e9, **labels)
+
+    def get_count(self, **labels: str) -> int:
+        with self._lock:
+            value = self._values.get(self._key(labels))
+            return 0 if value is None else int(value[1][1])
+
+    def _render_samples(self) -> list[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), list(total))) for key, (counts, total) in self._values.items())
+
+        samples: list[str] = []
+        for key, (counts, (total, count)) in values:
+            cumulative: int = 0
+            for bound, bucket_count in zip([*self.buckets, math.inf], counts):
+                cumulative += bucket_count
+                labels: str = self._format_labels(key, (("le", _format_value(bound)),))
+                samples.append(f"{self.name}_bucket{labels} {cumulative}")
+            samples.append(f"{self.name}_sum{self._format_labels(key)} {_format_value(total)}")
+            samples.append(f"{self.name}_count{self._format_labels(key)} {int(count)}")
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, label_names: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, label_names))
+
+    def gauge(self, name: str, help: str, label_names: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help, label_names))
+
+    def histogram(
+        self, name: str, help: str, label_names: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, label_names, buckets))
+
+    def render(self) -> str:
+        """
+        以 Prometheus text exposition format（0.0.4）輸出所有指標。
+        """
+        with self._lock:
+            metrics: list[_Metric] = list(self._metrics.values())
+        return "".join(f"{line}\n" for metric in metrics for line in metric.render())
+
+    def _register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise Exception("Unexcepted duplicated metric:", metric.name)
+            self._metrics[metric.name] = metric
+        return metric
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return f"{value:.1f}"
+    return repr(float(value))
+
+
+registry: Final[MetricsRegistry] = MetricsRegistry()
+
+queue_depth: Final[Gauge] = registry.gauge("nuoj_queue_depth", "Number of submissions waiting in the queue.")
+free_boxes: Final[Gauge] = registry.gauge("nuoj_free_boxes", "Number of idle sandbox boxes.")
+queue_wait_seconds: Final[Histogram] = registry.histogram(
+    "nuoj_queue_wait_seconds", "Time a submission waits in the queue before a worker takes it.", buckets=QUEUE_WAIT_BUCKETS
+)
+phase_duration_seconds: Final[Histogram] = registry.histogram(
+    "nuoj_phase_duration_seconds", "Duration of each phase of the judge pipeline.", ("phase", "code_type")
+)
+isolate_invocations: Final[Counter] = registry.counter(
+    "nuoj_isolate_invocations_total", "Number of isolate processes spawned.", ("action",)
+)
+minio_fetches: Final[Counter] = registry.counter("nuoj_minio_fetches_total", "Number of objects fetched from MinIO.", ("modified",))
+minio_requests: Final[Counter] = registry.counter("nuoj_minio_requests_total", "Number of HTTP requests sent to MinIO for fetches.")
+minio_fetched_bytes: Final[Counter] = registry.counter("nuoj_minio_fetched_bytes_total", "Bytes fetched from MinIO.")
+submissions: Final[Counter] = registry.counter("nuoj_submissions_total", "Number of finished submissions.", ("execute_type",))
@@ -0,0 +1,139 @@
+import threading
+import time
+from pathlib import Path
+from queue import Queue
+from typing import Any, Callable
+
+from flask import Flask
+from loguru import logger
+
+from utils.isolate.util import cleanup_sandbox, init_sandbox
+
+
+class BoxPool:
+    """
+    管理空閒沙盒編號的集合，取得沙盒時如果沒有空的 box 會阻塞，直到有 box 被釋放時被喚醒。
+    有提供 reset_box 時，釋放的 box 會先被重置才能再被取得；background 為 True 時重置會在背景執行序進行，
+    並且在建立時就先把所有 box 重置一次，讓取得的 box 都是已經初始化好的空 box。
+    """
+
+    def __init__(self, box_ids: list[int], reset_box: Callable[[int], dict[str, float]] | None = None, background: bool = False) -> None:
+        self._available_box: set[int] = set()
+        self._condition = threading.Condition()
+        self._reset_box = reset_box
+        self._background: bool = reset_box is not None and background
+        self._resetting_box: Queue[int] = Queue()
+        self._reset_count: int = 0
+        self._reset_time: dict[str, float] = {}
+
+        if not self._background:
+            self._available_box = set(box_ids)
+            return
+
+        for box_id in box_ids:
+            self._resetting_box.put(box_id)
+        threading.Thread(target=self._reset_box_in_background, daemon=True).start()
+
+    def acquire(self, box_id: int | None = None) -> int:
+        """
+        取得任意一個空的 box，或是指定 box_id 時等待該 box 被釋放後取得。
+        """
+        with self._condition:
+            while not self._is_acquirable(box_id):
+                self._condition.wait()
+            if box_id is None:
+                return self._available_box.pop()
+            self._available_box.remove(box_id)
+            return box_id
+
+    def try_acquire(self, box_number: int) -> list[int]:
+        """
+        不等待地取得最多 box_number 個目前空閒的 box。
+        """
+        with self._condition:
+            return [self._available_box.pop() for _ in range(min(box_number, len(self._available_box)))]
+
+    def release(self, box_id: int) -> None:
+        if self._background:
+            self._resetting_box.put(box_id)
+            return
+
+        if self._reset_box is not None:
+            self._record_reset_time(self._reset_box(box_id))
+        self._make_box_available(box_id)
+
+    def get_available_count(self) -> int:
+        with self._condition:
+            return len(self._available_box)
+
+    def get_statistics(self) -> dict[str, Any]:
+        with self._condition:
+            statistics: dict[str, Any] = {
+                "ready": len(self._available_box),
+                "resetting": self._resetting_box.qsize(),
+                "reset_count": self._reset_count,
+            }
+            for phase, total_time in self._reset_time.items():
+                statistics[f"average_{phase}"] = total_time / self._reset_count if self._reset_count > 0 else 0.0
+            return statistics
+
+    def _reset_box_in_background(self) -> None:
+        while True:
+            box_id: int = self._resetting_box.get()
+            try:
+                self._record_reset_time(self._reset_box(box_id))
+            except Exception:
+                logger.exception(f"Failed to reset the box {box_id}.")
+            self._make_box_available(box_id)
+
+    def _make_box_available(self, box_id: int) -> None:
+        with self._condition:
+            self._available_box.add(box_id)
+            self._condition.notify_all()
+
+    def _record_reset_time(self, reset_time: dict[str, float]) -> None:
+        with self._condition:
+            self._reset_count += 1
+            for phase, elapsed_time in reset_time.items():
+                self._reset_time[phase] = self._reset_time.get(phase, 0.0) + elapsed_time
+
+    def _is_acquirable(self, box_id: int | None) -> bool:
+        if box_id is None:
+            return len(self._available_box) > 0
+        return box_id in self._available_box
+
+
+def make_box_resetter(app: Flask, initialize: bool) -> Callable[[int], dict[str, float]]:
+    """
+    產生重置 box 的函數，會清除 box，initialize 為 True 時再重新初始化，並回傳各步驟花費的時間。
+    """
+    def reset_box(box_id: int) -> dict[str, float]:
+        reset_time: dict[str, float] = {}
+        with app.app_context():
+            start_time: float = time.perf_counter()
+            cleanup_sandbox(box_id)
+            reset_time["cleanup_time"] = time.perf_counter() - start_time
+
+            if initialize:
+                start_time = time.perf_counter()
+                init_sandbox(box_id)
+                reset_time["init_time"] = time.perf_counter() - start_time
+        return reset_time
+
+    return reset_box
+
+
+def is_box_initialized(box_id: int) -> bool:
+    return Path(f"/var/local/lib/isolate/{box_id}/box").exists()
+
+
+def reclaim_orphan_boxes(box_ids: list[int]) -> list[int]:
+    """
+    清除上次關閉前還沒有被釋放的 box（例如執行到一半被中斷的任務），回傳被清除的 box 編號。
+    """
+    orphan_box_ids: list[int] = [box_id for box_id in box_ids if is_box_initialized(box_id)]
+    for box_id in orphan_box_ids:
+        cleanup_sandbox(box_id)
+    if len(orphan_box_ids) > 0:
+        logger.info(f"Reclaim the orphan boxes {orphan_box_ids}.")
+    return orphan_box_ids
@@ -22,6 +22,19 @@ class StatusType(Enum):
     FINISH = "Finish"
 
 
+class Comparator(Enum):
+    CHECKER = "checker"
+    TOKEN = "token"
+    LINE = "line"
+    FLOAT = "float"
+
+
+class ProblemStatus(Enum):
+    PREPARING = "Preparing"
+    READY = "Ready"
+    FAILED = "Failed"
+
+
 class TestCaseType(Enum):
     STATIC_FILE = "static-file"
     PLAIN_TEXT = "plain-text"
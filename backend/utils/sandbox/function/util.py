@@ -1,17 +1,43 @@
 import traceback
 from typing import Any
 
-from utils.sandbox.enum import CodeType
+from utils.comparator.util import compare_testcase
+from utils.metrics.util import phase_duration_seconds
+from utils.sandbox.enum import CodeType, Comparator
 from utils.sandbox.util import Task, TestCase, Option, meta_data_to_dict
 from utils.isolate.util import compile, execute, checker, read_checker_log
+from utils.cache.artifact import fetch_artifact, store_artifact
+from utils.cache.precompiled_header import PrecompiledHeader, get_precompiled_header
 
 def compile_code(type: CodeType, compiler: str, box_id: int) -> dict[str, Any] | None:
     """
     這是一個編譯的函數，主要會將程式碼進行編譯，並回傳 meta dict。
+    編譯 checker 時會自動使用預編譯的 testlib.h，solution 與 checker 編譯過的執行檔會直接從快取取得。
     """
-    meta: str = compile(type.value, compiler, box_id)
+    with phase_duration_seconds.time(phase="compile", code_type=type.value):
+        return _compile_code(type, compiler, box_id)
+
+
+def _compile_code(type: CodeType, compiler: str, box_id: int) -> dict[str, Any]:
+    cached_meta_data: dict[str, Any] | None = fetch_artifact(type, compiler, box_id)
+    if cached_meta_data is not None:
+        cached_meta_data["artifact-cache"] = "hit"
+        return cached_meta_data
+
+    precompiled_header: PrecompiledHeader | None = None
+    if type == CodeType.CHECKER:
+        precompiled_header = get_precompiled_header(compiler)
+
+    meta: str = compile(type.value, compiler, box_id, precompiled_header)
     meta_data = meta_data_to_dict(meta)
     meta_data["compile-status"] = "OK" if _is_compile_success(meta_data) else "Failed"
+    if _is_compile_success(meta_data):
+        store_artifact(type, compiler, box_id, meta_data)
+    if precompiled_header is not None:
+        meta_data["precompiled-header"] = "hit" if precompiled_header.hit else "built"
+        # 只有命中時才省下編譯 header 的時間，建置時 header 是這次才編譯的。
+        saved_time: float = precompiled_header.header_compile_time if precompiled_header.hit else 0
+        meta_data["precompiled-header-saved-time"] = f"{saved_time:.3f}"
     return meta_data
 
 
@@ -22,7 +48,8 @@ def execute_code(type: CodeType, compiler: str, option: Option, testcase_index:
     time = option.time
     wall_time = option.wall_time
     memory = option.memory
-    meta = execute(type.value, testcase_index, time, wall_time, memory, compiler, box_id)
+    with phase_duration_seconds.time(phase="execute", code_type=type.value):
+        meta = execute(type.value, testcase_index, time, wall_time, memory, compiler, box_id)
     meta_data = meta_data_to_dict(meta)
     return meta_data
     
@@ -30,9 +57,13 @@ def execute_code(type: CodeType, compiler: str, option: Option, testcase_index:
 def judge_code(task: Task, testcase_index: int, box_id) -> dict[str, Any] | None:
     """
     這是一個評測的函數，主要會編譯、執行並使用 checker 進行評測，回傳結果。
+    選擇內建比對方式的任務不會執行 checker，直接在評測程序中比對輸出。
     """
     options: Option = task.options
-    meta = checker(testcase_index, options.time, options.wall_time, box_id)
+    with phase_duration_seconds.time(phase="checker", code_type=CodeType.CHECKER.value):
+        if options.comparator != Comparator.CHECKER.value:
+            return compare_testcase(options.comparator, testcase_index, box_id, options.float_tolerance)
+        meta = checker(testcase_index, options.time, options.wall_time, box_id)
     meta_data = meta_data_to_dict(meta)
     return meta_data
 
@@ -1,15 +1,23 @@
-import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Final
 
-from flask import current_app
+from flask import Flask, current_app
 
 from loguru import logger
 from setting.util import Setting
 from storage.util import is_file_exists, TunnelCode
-from storage.minio_util import download, is_testcase_in_storage_server
+from storage.minio_util import FetchResult, fetch, heartbeat
+from utils.cache.precompiled_header import TESTLIB_PATH
+from utils.cache.testcase import CachedTestcase, TestcaseCache, make_local_etag
+from utils.sandbox.box.util import is_box_initialized
 from utils.sandbox.util import Task, TestCase, get_timestamp
 from utils.sandbox.enum import CodeType, StatusType, TestCaseType
 from utils.isolate.util import init_sandbox, touch_text_file, touch_text_file_by_file_name
 
+PREPARE_TESTCASE_ATTEMPTS: Final[int] = 3
+
 
 def initialize_task(task: Task, box_id: int) -> None:
     task.status = StatusType.INITIAL
@@ -29,9 +37,10 @@ def initialize_test_case_to_sandbox(task: Task, test_case_list: list[TestCase],
 
 def _initilize_sandbox(box_id: int) -> None:
     """
-    這是一個初始化的函數，會將沙盒初始化。
+    這是一個初始化的函數，會將沙盒初始化，已經由 box pool 初始化好的沙盒則會直接使用。
     """
-    init_sandbox(box_id)
+    if not is_box_initialized(box_id):
+        init_sandbox(box_id)
 
 
 def _initialize_code(task: Task, box_id: int) -> None:
@@ -61,16 +70,19 @@ def _initialize_code(task: Task, box_id: int) -> None:
 
 
 def _initialize_testlib_to_sandbox(box_id: int) -> None:
-    with open("/etc/nuoj-sandbox/backend/testlib.h") as file:        
+    with open(TESTLIB_PATH) as file:
         touch_text_file_by_file_name(file.read(), "testlib.h", box_id)
 
 
 def _initialize_test_case_from_storage_and_return_last_index(filename: str, start_index: int, box_id: int) -> int:
-    assert _prepare_testcase_to_storage_directory(filename)
-    test_case_list: list[str] = _fetch_test_case_from_storage(filename)
-    for i in range(len(test_case_list)):
-        touch_text_file_by_file_name(test_case_list[i], f"{i + start_index}.in", box_id)
-    return start_index + len(test_case_list)
+    """
+    測資會解開到測資快取並唯讀掛載到沙盒中，box 裡的 N.in 只是指向快取測資的連結，不需要複製測資內容。
+    """
+    cached_testcase: CachedTestcase | None = _prepare_testcase_to_storage_directory(filename, box_id)
+    assert cached_testcase is not None
+    for i in range(cached_testcase.size):
+        os.symlink(cached_testcase.get_input_path(i), f"/var/local/lib/isolate/{box_id}/box/{i + start_index}.in")
+    return start_index + cached_testcase.size
 
 
 def _initialize_test_case_from_plain_text_and_return_last_index(text: str, start_index: int, box_id: int) -> int:
@@ -78,22 +90,103 @@ def _initialize_test_case_from_plain_text_and_return_last_index(text: str, start
     return start_index + 1
 
 
-def _fetch_test_case_from_storage(filename: str) -> list[str]:
-    json_object: list[str]
+def prefetch_test_case(test_case_list: list[dict]) -> None:
+    """
+    任務排入佇列時就在背景把靜態測資準備到測資快取中，任務初始化時如果下載還沒完成，會直接等待同一次下載。
+    """
+    app = current_app._get_current_object()  # type: ignore[attr-defined]
+    prefetcher: ThreadPoolExecutor = app.config["testcase_prefetcher"]
+    filenames: set[str] = {
+        test_case["value"] for test_case in test_case_list if test_case["type"] == TestCaseType.STATIC_FILE.value
+    }
+    for filename in filenames:
+        prefetcher.submit(_prefetch_testcase, app, filename)
+
+
+def _prefetch_testcase(app: Flask, filename: str) -> None:
+    with app.app_context():
+        try:
+            if not prepare_testcase(filename):
+                logger.warning(f"The prefetched testcase {filename} does not exist.")
+        except Exception:
+            logger.exception(f"Failed to prefetch the testcase {filename}.")
+
+
+def prepare_testcase(filename: str) -> bool:
+    """
+    確保 filename 最新的版本已經在測資快取中，回傳測資是否存在，同一個測資同時只會驗證或下載一次。
+    """
+    testcase_cache: TestcaseCache = current_app.config["testcase_cache"]
+    return testcase_cache.refresh(filename, lambda cached_testcase: _refresh_testcase(filename, cached_testcase))
+
+
+def _prepare_testcase_to_storage_directory(filename: str, box_id: int) -> CachedTestcase | None:
+    """
+    從測資快取取得測資並 pin 給 box，box 被釋放前這個版本的測資都不會被淘汰。
+    準備好的測資在 pin 之前可能被同時放入快取的其他測資淘汰，這時會重新準備，最多嘗試 PREPARE_TESTCASE_ATTEMPTS 次。
+    """
+    testcase_cache: TestcaseCache = current_app.config["testcase_cache"]
+    for _ in range(PREPARE_TESTCASE_ATTEMPTS):
+        if not prepare_testcase(filename):
+            return None
+        cached_testcase: CachedTestcase | None = testcase_cache.lookup(filename, box_id)
+        if cached_testcase is not None:
+            return cached_testcase
+        logger.warning(f"The testcase {filename} was evicted before it was pinned, prepare it again.")
+    return None
+
+
+def _get_local_testcase_path(filename: str) -> str | None:
+    """
+    直接放在 storage 中的測資，pack（例如 CLI convert 的輸出）優先於舊的 JSON 格式。
+    """
     storage_path: str = current_app.config["STORAGE_PATH"]
-    with open(f"{storage_path}/testcase/{filename}.json", "r") as f:
-        json_object = json.loads(f.read())
-    return json_object
+    for extension in ["pack", "json"]:
+        if is_file_exists(f"{filename}.{extension}", TunnelCode.TESTCASE):
+            return f"{storage_path}/testcase/{filename}.{extension}"
+    return None
 
 
-def _prepare_testcase_to_storage_directory(filename: str) -> bool:
-    if is_file_exists(f"{filename}.json", TunnelCode.TESTCASE):
+def _refresh_testcase(filename: str, cached_testcase: CachedTestcase | None) -> bool:
+    """
+    直接放在 storage 中的 pack 或 JSON 測資以檔案的修改時間驗證，MinIO 上的測資以 ETag 驗證，版本改變時會重新取得。
+    """
+    testcase_cache: TestcaseCache = current_app.config["testcase_cache"]
+
+    local_path: str | None = _get_local_testcase_path(filename)
+    if local_path is not None:
+        local_etag: str = make_local_etag(local_path)
+        if cached_testcase is not None and cached_testcase.etag == local_etag:
+            testcase_cache.record_validation(hit=True)
+            return True
+        testcase_cache.record_validation(hit=False)
+        building_directory = testcase_cache.make_building_directory()
+        shutil.copyfile(local_path, building_directory / "source")
+        testcase_cache.insert(filename, building_directory, "source", local_etag, None)
         return True
-    
+
     setting: Setting = current_app.config["setting"]
-    if setting.minio.enable and is_testcase_in_storage_server("testcase", filename):
-        storage_path: str = current_app.config["STORAGE_PATH"]
-        download("testcase", filename, f"{storage_path}/testcase/{filename}.json")
+    if not setting.minio.enable:
+        return cached_testcase is not None
+
+    if cached_testcase is not None and not heartbeat():
+        logger.warning(f"MinIO is unavailable, use the cached testcase {filename} without validation.")
+        testcase_cache.record_validation(hit=True)
         return True
-    
-    return False
\ No newline at end of file
+
+    building_directory = testcase_cache.make_building_directory()
+    try:
+        fetch_result: FetchResult | None = fetch(
+            "testcase", filename, str(building_directory / "source"), None if cached_testcase is None else cached_testcase.etag
+        )
+    except Exception:
+        shutil.rmtree(building_directory, ignore_errors=True)
+        raise
+
+    if fetch_result is None or not fetch_result.modified:
+        shutil.rmtree(building_directory, ignore_errors=True)
+        testcase_cache.record_validation(hit=fetch_result is not None)
+        return fetch_result is not None
+    testcase_cache.record_validation(hit=False)
+    testcase_cache.insert(filename, building_directory, "source", fetch_result.etag or "", fetch_result.version_id)
+    return True
@@ -0,0 +1,104 @@
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from flask import Flask, current_app
+
+from setting.util import Setting
+from utils.isolate.util import init_sandbox
+from utils.cache.testcase import TestcaseCache
+from utils.sandbox.box.util import BoxPool, is_box_initialized
+from utils.sandbox.enum import CodeType
+from utils.sandbox.util import CodePackage, Task
+
+
+def lease_box(task: Task, box_id: int, code_types: list[CodeType]) -> list[int]:
+    """
+    依照 task.options.parallel_box 向 BoxPool 借用目前空閒的 box（不會等待），數量受 setting 中的 parallel_box_limit 限制。
+    借到的 box 如果還沒初始化會先初始化，並複製主要 box 中編譯好的執行檔與測資，指向共用測資的連結只會複製連結本身。
+    """
+    setting: Setting = current_app.config["setting"]
+    box_pool: BoxPool = current_app.config["box_pool"]
+    testcase_cache: TestcaseCache = current_app.config["testcase_cache"]
+    box_number: int = min(task.options.parallel_box, setting.parallel_box_limit, task.test_case_size) - 1
+    if box_number <= 0:
+        return []
+
+    file_names: list[str] = [f"{i+1}.in" for i in range(task.test_case_size)]
+    file_names += [_get_dist_filename(setting, _get_code_package(task, type), type) for type in code_types]
+
+    leased_box_ids: list[int] = box_pool.try_acquire(box_number)
+    for leased_box_id in leased_box_ids:
+        testcase_cache.share(box_id, leased_box_id)
+        if not is_box_initialized(leased_box_id):
+            init_sandbox(leased_box_id)
+        for file_name in file_names:
+            shutil.copy2(
+                f"/var/local/lib/isolate/{box_id}/box/{file_name}",
+                f"/var/local/lib/isolate/{leased_box_id}/box/{file_name}",
+                follow_symlinks=False
+            )
+    return leased_box_ids
+
+
+def release_leased_box(box_ids: list[int]) -> None:
+    box_pool: BoxPool = current_app.config["box_pool"]
+    testcase_cache: TestcaseCache = current_app.config["testcase_cache"]
+    for box_id in box_ids:
+        testcase_cache.release(box_id)
+        box_pool.release(box_id)
+
+
+def run_testcase_in_parallel(
+    box_ids: list[int],
+    test_case_size: int,
+    execute_testcase: Callable[[int, int], dict[str, Any]],
+    is_failed: Callable[[dict[str, Any]], bool] | None = None
+) -> list[dict[str, Any]]:
+    """
+    在多個 box 上同時執行測資，每個 box 依序領取下一筆測資，結果依照測資編號排序後回傳。
+    如果有提供 is_failed，第一筆失敗之後的測資不會再被執行，回傳的結果會停在第一筆失敗的測資，與依序執行的結果相同。
+    """
+    app: Flask = current_app._get_current_object()  # type: ignore[attr-defined]
+    lock = threading.Lock()
+    results: dict[int, dict[str, Any]] = {}
+    state: dict[str, int] = {"next_index": 0, "first_failed_index": test_case_size}
+
+    def execute_testcase_in_box(box_id: int) -> None:
+        with app.app_context():
+            while True:
+                with lock:
+                    index: int = state["next_index"]
+                    if index >= state["first_failed_index"]:
+                        return
+                    state["next_index"] += 1
+
+                result: dict[str, Any] = execute_testcase(index, box_id)
+
+                with lock:
+                    results[index] = result
+                    if is_failed is not None and is_failed(result):
+                        state["first_failed_index"] = min(state["first_failed_index"], index)
+
+    if len(box_ids) == 1:
+        execute_testcase_in_box(box_ids[0])
+    else:
+        with ThreadPoolExecutor(max_workers=len(box_ids)) as executor:
+            for future in [executor.submit(execute_testcase_in_box, box_id) for box_id in box_ids]:
+                future.result()
+
+    last_index: int = min(state["first_failed_index"] + 1, test_case_size)
+    return [results[i] for i in range(last_index)]
+
+
+def _get_code_package(task: Task, type: CodeType) -> CodePackage:
+    if type == CodeType.SUBMIT:
+        return task.user_code
+    if type == CodeType.SOLUTION:
+        return task.solution_code
+    return task.checker_code
+
+
+def _get_dist_filename(setting: Setting, code_package: CodePackage, type: CodeType) -> str:
+    return setting.compiler[code_package.compiler].get_dist_filename(type.value)
@@ -1,9 +1,15 @@
+import time
 from typing import Any
 
-from utils.isolate.util import read_output, read_checker_log
+from flask import current_app
+
+from setting.util import Setting
+from utils.cache.answer import fetch_answer, make_solution_digest, store_answer
+from utils.isolate.util import capture_output, read_checker_log
 from utils.sandbox.function.util import compile_code, execute_code, judge_code
-from utils.sandbox.util import Task, TestCase, get_timestamp
-from utils.sandbox.enum import CodeType, ExecuteType, StatusType, Verdict
+from utils.sandbox.parallel.util import lease_box, release_leased_box, run_testcase_in_parallel
+from utils.sandbox.util import Task, TestCase, get_timestamp, record_phase
+from utils.sandbox.enum import CodeType, Comparator, ExecuteType, StatusType, Verdict
 
 
 def run_task(task: Task, test_case: list[str], box_id: int):
@@ -11,17 +17,24 @@ def run_task(task: Task, test_case: list[str], box_id: int):
     task.flow["running"] = get_timestamp()
 
     if task.execute_type == ExecuteType.COMPILE.value:
-        task.result = compile_code(CodeType.SUBMIT, task.user_code.compiler, box_id)
+        with record_phase(task, "compile_submit"):
+            task.result = compile_code(CodeType.SUBMIT, task.user_code.compiler, box_id)
     elif task.execute_type == ExecuteType.EXECUTE.value:
-        result = {
-            "compile": compile_code(CodeType.SUBMIT, task.user_code.compiler, box_id), 
-            "report": []
-        }
-        report = []
-        for i in range(task.test_case_size):
-            execute_meta_data = execute_code(CodeType.SUBMIT, task.user_code.compiler, task.options, i, box_id)
-            report.append(execute_meta_data)
-        result["report"] = report
+        with record_phase(task, "compile_submit"):
+            result = {
+                "compile": compile_code(CodeType.SUBMIT, task.user_code.compiler, box_id),
+                "report": []
+            }
+        box_ids: list[int] = [box_id] + lease_box(task, box_id, [CodeType.SUBMIT])
+        try:
+            with record_phase(task, "testcases"):
+                result["report"] = run_testcase_in_parallel(
+                    box_ids,
+                    task.test_case_size,
+                    lambda i, testcase_box_id: execute_code(CodeType.SUBMIT, task.user_code.compiler, task.options, i, testcase_box_id)
+                )
+        finally:
+            release_leased_box(box_ids[1:])
         task.result = result
     elif task.execute_type == ExecuteType.JUDGE.value:
         task.result = _judge_code(task, box_id)
@@ -36,33 +49,50 @@ def _judge_code(task: Task, box_id: int):
         "compile_detail": {}
     }
 
-    compiled_solution_meta = compile_code(CodeType.SOLUTION, task.solution_code.compiler, box_id)
+    with record_phase(task, "compile_solution"):
+        compiled_solution_meta = compile_code(CodeType.SOLUTION, task.solution_code.compiler, box_id)
     result["compile_detail"]["solution"] = _fetch_compile_info_from_meta_file(compiled_solution_meta)
     if not _is_compiled_success(compiled_solution_meta):
         result["status"] = Verdict.SCE.value
         result["message"] = "Solution compile failed."
         return result
 
-    compiled_checker_meta = compile_code(CodeType.CHECKER, task.checker_code.compiler, box_id)
-    result["compile_detail"]["checker"] = _fetch_compile_info_from_meta_file(compiled_checker_meta)
-    if not _is_compiled_success(compiled_checker_meta):
-        result["status"] = Verdict.CCE.value
-        result["message"] = "Checker compile failed."
-        return result
+    # 內建的比對方式不需要 checker。
+    code_types: list[CodeType] = [CodeType.SOLUTION, CodeType.SUBMIT]
+    if task.options.comparator == Comparator.CHECKER.value:
+        with record_phase(task, "compile_checker"):
+            compiled_checker_meta = compile_code(CodeType.CHECKER, task.checker_code.compiler, box_id)
+        result["compile_detail"]["checker"] = _fetch_compile_info_from_meta_file(compiled_checker_meta)
+        task.flow["checker_precompiled_header"] = _fetch_precompiled_header_info_from_meta_file(compiled_checker_meta)
+        if not _is_compiled_success(compiled_checker_meta):
+            result["status"] = Verdict.CCE.value
+            result["message"] = "Checker compile failed."
+            return result
+        code_types.append(CodeType.CHECKER)
 
-    compiled_submit_meta = compile_code(CodeType.SUBMIT, task.user_code.compiler, box_id)
+    with record_phase(task, "compile_submit"):
+        compiled_submit_meta = compile_code(CodeType.SUBMIT, task.user_code.compiler, box_id)
     result["compile_detail"]["submit"] = _fetch_compile_info_from_meta_file(compiled_submit_meta)
     if not _is_compiled_success(compiled_submit_meta):
         result["status"] = Verdict.CE.value
         result["message"] = "Submit code compile failed."
         return result
 
-    result["judge_detail"]: list[dict[str, Any]] = []
-
-    for i in range(task.test_case_size):
-        execute_result: dict[str, Any] = _execute_testcase(task, i, box_id)
-        result["judge_detail"].append(execute_result)
-        
+    solution_digest: str = make_solution_digest(task.solution_code.compiler, box_id)
+    box_ids: list[int] = [box_id] + lease_box(task, box_id, code_types)
+    try:
+        with record_phase(task, "testcases"):
+            result["judge_detail"] = run_testcase_in_parallel(
+                box_ids,
+                task.test_case_size,
+                lambda i, testcase_box_id: _execute_testcase(task, i, testcase_box_id, solution_digest),
+                lambda execute_result: execute_result["verdict"] != Verdict.AC.value
+            )
+    finally:
+        release_leased_box(box_ids[1:])
+    task.flow["testcase_breakdown"] = _summarize_testcase_runtime(result["judge_detail"])
+
+    for execute_result in result["judge_detail"]:
         if(execute_result["verdict"] != Verdict.AC.value):
             result["status"] = execute_result["verdict"]
             result["message"] = execute_result["log"]
@@ -72,35 +102,55 @@ def _judge_code(task: Task, box_id: int):
     result["message"] = "OK."
     return result
 
-def _execute_testcase(task: Task, testcase_index: int, box_id: int):
+def _execute_testcase(task: Task, testcase_index: int, box_id: int, solution_digest: str):
+    setting: Setting = current_app.config["setting"]
     execute_result = {
         "verdict": "",
         "output_set": {
-            "submit": "",
-            "answer": ""
+            "submit": {},
+            "answer": {}
         },
         "runtime_info": {},
         "log": ""
     }
     
-    execute_solution_meta = execute_code(CodeType.SOLUTION, task.solution_code.compiler, task.options, testcase_index, box_id)
-    execute_result["runtime_info"] |= {"solution": _fetch_execute_info_from_meta_file(execute_solution_meta)}
+    # 答案快取的查詢與寫入也算在 solution 的時間內，只有實際執行 solution 的部分會計算 isolate 的額外時間。
+    start_time: int = time.monotonic_ns()
+    spawn_time: int | None = None
+    execute_solution_meta = fetch_answer(solution_digest, task.options, testcase_index, box_id)
+    if execute_solution_meta is None:
+        spawn_start_time: int = time.monotonic_ns()
+        execute_solution_meta = execute_code(CodeType.SOLUTION, task.solution_code.compiler, task.options, testcase_index, box_id)
+        spawn_time = time.monotonic_ns() - spawn_start_time
+        if not _is_execute_failed(execute_solution_meta):
+            store_answer(solution_digest, task.options, testcase_index, box_id, execute_solution_meta)
+    execute_result["runtime_info"] |= {
+        "solution": _fetch_execute_info_from_meta_file(execute_solution_meta, time.monotonic_ns() - start_time, spawn_time)
+    }
     
     if _handle_execute_exception(execute_solution_meta, execute_result, Verdict.SRE, Verdict.STLE, Verdict.SMLE):
         return execute_result
 
-    execute_result["output_set"]["answer"] = read_output(testcase_index, CodeType.SOLUTION, box_id)
+    execute_result["output_set"]["answer"] = capture_output(testcase_index, CodeType.SOLUTION.value, box_id, setting.output.capture_limit)
 
+    start_time = time.monotonic_ns()
     execute_user_code_meta = execute_code(CodeType.SUBMIT, task.user_code.compiler, task.options, testcase_index, box_id)
-    execute_result["runtime_info"] |= {"submit": _fetch_execute_info_from_meta_file(execute_user_code_meta)}
+    elapsed_time: int = time.monotonic_ns() - start_time
+    execute_result["runtime_info"] |= {
+        "submit": _fetch_execute_info_from_meta_file(execute_user_code_meta, elapsed_time, elapsed_time)
+    }
     
     if _handle_execute_exception(execute_user_code_meta, execute_result, Verdict.RE, Verdict.TLE, Verdict.MLE):
         return execute_result
     
-    execute_result["output_set"]["submit"] = read_output(testcase_index, CodeType.SOLUTION, box_id)
+    execute_result["output_set"]["submit"] = capture_output(testcase_index, CodeType.SUBMIT.value, box_id, setting.output.capture_limit)
     
+    start_time = time.monotonic_ns()
     execute_checker_code_meta = judge_code(task, testcase_index, box_id)
-    execute_result["runtime_info"] |= {"checker": _fetch_execute_info_from_meta_file(execute_checker_code_meta)}
+    elapsed_time = time.monotonic_ns() - start_time
+    execute_result["runtime_info"] |= {
+        "checker": _fetch_execute_info_from_meta_file(execute_checker_code_meta, elapsed_time, elapsed_time)
+    }
     
     if _handle_execute_exception(execute_checker_code_meta, execute_result, Verdict.CRE, Verdict.CTLE, Verdict.CMLE):
         return execute_result
@@ -123,6 +173,12 @@ def _handle_execute_exception(meta: dict[str, Any], result: dict[str, Any], re_v
         result["log"] = f"The programming has reached the memory limit. ({memory}KB)"
         return True
     
+    # Handle the output exceeding the file size limit, the program receives SIGXFSZ.
+    if "exitsig" in meta and meta["exitsig"] == "25":
+        result["verdict"] = re_verdict.value
+        result["log"] = "The programming has reached the output size limit."
+        return True
+
     # Handle RE situation.
     if "exitsig" in meta:
         exitsig = meta["exitsig"]
@@ -139,11 +195,27 @@ def _handle_execute_exception(meta: dict[str, Any], result: dict[str, Any], re_v
     
     return False
 
+def _is_execute_failed(meta: dict[str, Any]):
+    return "exitsig" in meta or "status" in meta
+
+
 def _fetch_compile_info_from_meta_file(meta: dict[str, Any]):
     return {"time": meta["time"], "memory": meta["max-rss"], "exitcode": meta["exitcode"]}
 
 
-def _fetch_execute_info_from_meta_file(meta: dict[str, Any]):
+def _fetch_precompiled_header_info_from_meta_file(meta: dict[str, Any]):
+    if "artifact-cache" in meta:
+        return {"status": "skipped", "saved_time": "0"}
+    if "precompiled-header" not in meta:
+        return {"status": "unavailable", "saved_time": "0"}
+    return {"status": meta["precompiled-header"], "saved_time": meta["precompiled-header-saved-time"]}
+
+
+def _fetch_execute_info_from_meta_file(meta: dict[str, Any], elapsed_time: int | None = None, spawn_time: int | None = None):
+    """
+    elapsed_time 是這個步驟以 monotonic clock 量測的總時間（ns），spawn_time 是其中執行程式的部分，
+    扣掉程式本身的 time-wall 就是 isolate 啟動與讀寫 meta 的額外時間；沒有執行程式（例如答案快取）時 spawn_time 為 None。
+    """
     execute_info: dict[str, Any] = {"time": meta["time"], "memory": meta["max-rss"]}
 
     if "exitsig" in meta:
@@ -151,7 +223,26 @@ def _fetch_execute_info_from_meta_file(meta: dict[str, Any]):
     elif "exitcode" in meta:
         execute_info |= {"exitcode": meta["exitcode"]}
 
+    if elapsed_time is not None:
+        execute_info["elapsed_ns"] = elapsed_time
+        execute_info["overhead_ns"] = 0 if spawn_time is None else max(spawn_time - round(float(meta.get("time-wall", 0)) * 1e9), 0)
     return execute_info
 
+def _summarize_testcase_runtime(judge_detail: list[dict[str, Any]]) -> dict[str, dict[str, int]]:
+    """
+    加總每個測資的 solution、submit 與 checker 的執行時間與 isolate 的額外時間，評測變慢時可以看出時間花在哪裡。
+    """
+    breakdown: dict[str, dict[str, int]] = {}
+    for execute_result in judge_detail:
+        for name, runtime_info in execute_result["runtime_info"].items():
+            if "elapsed_ns" not in runtime_info:
+                continue
+            summary: dict[str, int] = breakdown.setdefault(name, {"count": 0, "elapsed_ns": 0, "overhead_ns": 0})
+            summary["count"] += 1
+            summary["elapsed_ns"] += runtime_info["elapsed_ns"]
+            summary["overhead_ns"] += runtime_info["overhead_ns"]
+    return breakdown
+
+
 def _is_compiled_success(meta: dict[str, Any]):
     return meta["exitcode"] == "0"
@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+
+from utils.sandbox.enum import StatusType
+
+
+class StatusNotifier:
+    """
+    記錄每個 tracker_id 在行程內的狀態轉換（Pending、Initial、Running、Finish），並喚醒等待該 tracker_id 的請求。
+    每個 tracker_id 有自己的 condition，狀態改變時只會喚醒等待同一個 tracker_id 的執行序。
+    還在佇列中或執行中的 tracker_id 不會被淘汰，大量的批次評測也能等待；已經完成的 tracker_id 最多記錄 capacity 個。
+    只有 publish 會新增 tracker_id，查詢與等待不知道的 tracker_id 不會佔用記錄的空間。
+    """
+
+    def __init__(self, capacity: int = 10000) -> None:
+        self.capacity: int = capacity
+        self._lock = threading.Lock()
+        self._statuses: dict[str, list[StatusType]] = {}
+        self._conditions: dict[str, threading.Condition] = {}
+        self._finished: OrderedDict[str, None] = OrderedDict()
+
+    def publish(self, tracker_id: str, status: StatusType) -> None:
+        with self._lock:
+            if tracker_id not in self._statuses:
+                self._statuses[tracker_id] = []
+                self._conditions[tracker_id] = threading.Condition(self._lock)
+            self._statuses[tracker_id].append(status)
+            self._conditions[tracker_id].notify_all()
+            if status == StatusType.FINISH:
+                self._finished[tracker_id] = None
+                self._finished.move_to_end(tracker_id)
+                self._evict_finished()
+
+    def get_statuses(self, tracker_id: str) -> list[StatusType]:
+        with self._lock:
+            return list(self._statuses.get(tracker_id, []))
+
+    def wait_for_transition(self, tracker_id: str, known_count: int, timeout: float) -> list[StatusType]:
+        """
+        等待 tracker_id 的狀態轉換超過 known_count 個或是逾時，回傳目前為止所有的狀態轉換。
+        不知道（或是已經被淘汰）的 tracker_id 會直接回傳空的 list。
+        """
+        with self._lock:
+            if tracker_id not in self._statuses:
+                return []
+            statuses: list[StatusType] = self._statuses[tracker_id]
+            self._conditions[tracker_id].wait_for(
+                lambda: len(statuses) > known_count or tracker_id not in self._statuses, timeout
+            )
+            return list(self._statuses.get(tracker_id, []))
+
+    def _evict_finished(self) -> None:
+        while len(self._finished) > self.capacity:
+            evicted_tracker_id, _ = self._finished.popitem(last=False)
+            del self._statuses[evicted_tracker_id]
+            self._conditions.pop(evicted_tracker_id).notify_all()
@@ -1,8 +1,10 @@
-from typing import Any
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
 from datetime import datetime
 
 from dataclasses import dataclass, field
-from utils.sandbox.enum import ExecuteType, TestCaseType, StatusType
+from utils.sandbox.enum import Comparator, ExecuteType, TestCaseType, StatusType
 
 
 @dataclass
@@ -21,12 +23,15 @@ class Option:
     time: float
     wall_time: float
     memory: int
+    parallel_box: int = 1
     webhook_url: str | None = None
     debug_webhook_initialize_url: str | None = None
+    comparator: str = Comparator.CHECKER.value
+    float_tolerance: float = 1e-6
 
 @dataclass
 class Task:
-    checker_code: CodePackage
+    checker_code: CodePackage | None
     solution_code: CodePackage
     user_code: CodePackage
     execute_type: ExecuteType
@@ -42,6 +47,24 @@ def get_timestamp() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
+def get_precise_timestamp() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+@contextmanager
+def record_phase(task: Task, name: str) -> Iterator[None]:
+    """
+    以 time.monotonic_ns 計算階段的執行時間，與開始的時間一起記錄在 task.flow["phases"][name]。
+    flow 中其他以秒為單位的時間只能看出順序，各階段實際花費的時間要看這裡。
+    """
+    started_at: str = get_precise_timestamp()
+    start_time: int = time.monotonic_ns()
+    try:
+        yield
+    finally:
+        task.flow.setdefault("phases", {})[name] = {"start": started_at, "duration_ns": time.monotonic_ns() - start_time}
+
+
 def meta_data_to_dict(meta):
     """
     將 meta text 轉成 meta dict。
@@ -0,0 +1,164 @@
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from setting.util import WebhookConfig
+from utils.metrics.util import phase_duration_seconds
+
+
+class WebhookDispatcher:
+    """
+    在背景執行序傳送 webhook，評測執行序只需要把通知寫進 outbox 就可以繼續處理下一個任務。
+    每個 host 共用一個連線池，失敗時會以指數退避重試，outbox 中的通知在重新啟動後會再次傳送。
+    """
+
+    def __init__(self, outbox_directory: Path, config: WebhookConfig) -> None:
+        self.outbox_directory: Path = outbox_directory
+        self.config: WebhookConfig = config
+        self._condition = threading.Condition()
+        self._schedule: list[tuple[float, int, Path]] = []
+        self._sequence = itertools.count()
+        self._pending: int = 0
+        self._sessions: dict[str, requests.Session] = {}
+        self._sessions_lock = threading.Lock()
+
+    def start(self) -> None:
+        """
+        將上次關閉前沒有送出的通知放回排程，並啟動傳送的執行序。
+        """
+        if self.outbox_directory.exists():
+            outbox_paths: list[Path] = sorted(self.outbox_directory.glob("*.json"), key=lambda path: path.stat().st_mtime_ns)
+            for outbox_path in outbox_paths:
+                self._schedule_delivery(outbox_path, time.monotonic())
+            if outbox_paths:
+                logger.info(f"Replay {len(outbox_paths)} webhooks from the outbox.")
+
+        for _ in range(self.config.worker_number):
+            threading.Thread(target=self._deliver_forever, daemon=True).start()
+
+    def enqueue(self, url: str, payload: dict[str, Any], description: str, tracker_id: str) -> None:
+        self.outbox_directory.mkdir(parents=True, exist_ok=True)
+        outbox_path: Path = self.outbox_directory / f"{uuid.uuid4()}.json"
+        _write_outbox(outbox_path, {
+            "url": url,
+            "body": json.dumps(payload),
+            "description": description,
+            "tracker_id": tracker_id,
+            "attempts": 0
+        })
+        self._schedule_delivery(outbox_path, time.monotonic())
+
+    def join(self, timeout: float | None = None) -> bool:
+        """
+        等待所有通知送出或放棄，回傳是否在 timeout 之前完成。
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending == 0, timeout)
+
+    def get_statistics(self) -> dict[str, Any]:
+        with self._sessions_lock:
+            host_number: int = len(self._sessions)
+        with self._condition:
+            return {"pending": self._pending, "hosts": host_number}
+
+    def _schedule_delivery(self, outbox_path: Path, due_time: float, is_new: bool = True) -> None:
+        with self._condition:
+            heapq.heappush(self._schedule, (due_time, next(self._sequence), outbox_path))
+            if is_new:
+                self._pending += 1
+            self._condition.notify_all()
+
+    def _take(self) -> Path:
+        with self._condition:
+            while True:
+                if not self._schedule:
+                    self._condition.wait()
+                    continue
+                delay: float = self._schedule[0][0] - time.monotonic()
+                if delay <= 0:
+                    return heapq.heappop(self._schedule)[2]
+                self._condition.wait(delay)
+
+    def _deliver_forever(self) -> None:
+        while True:
+            outbox_path: Path = self._take()
+            try:
+                self._deliver(outbox_path)
+            except Exception:
+                logger.exception(f"Failed to deliver the webhook {outbox_path}.")
+                self._finish(outbox_path)
+
+    def _deliver(self, outbox_path: Path) -> None:
+        with open(outbox_path) as file:
+            record: dict[str, Any] = json.loads(file.read())
+
+        status_code: int | None = None
+        try:
+            with phase_duration_seconds.time(phase="webhook", code_type=""):
+                response = self._get_session(record["url"]).post(
+                    record["url"],
+                    data=record["body"],
+                    headers={"content-type": "application/json"},
+                    timeout=self.config.timeout,
+                )
+            status_code = response.status_code
+        except requests.RequestException as exception:
+            logger.warning(f"Failed to send the webhook to {record['url']}: {exception}")
+
+        if status_code == 200:
+            print(f"{record['description']} {record['url']} send successfully.")
+            self._finish(outbox_path)
+            return
+
+        record["attempts"] += 1
+        if _is_retryable(status_code) and record["attempts"] < self.config.max_attempts:
+            _write_outbox(outbox_path, record)
+            delay: float = self.config.backoff * 2 ** (record["attempts"] - 1)
+            self._schedule_delivery(outbox_path, time.monotonic() + delay, is_new=False)
+            return
+
+        print(f"{record['description']} {record['url']} has error that occur result {record['tracker_id']} has error.")
+        self._finish(outbox_path)
+
+    def _finish(self, outbox_path: Path) -> None:
+        outbox_path.unlink(missing_ok=True)
+        with self._condition:
+            self._pending -= 1
+            self._condition.notify_all()
+
+    def _get_session(self, url: str) -> requests.Session:
+        parsed_url = urlsplit(url)
+        host: str = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        with self._sessions_lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.config.worker_number)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return self._sessions[host]
+
+
+def _is_retryable(status_code: int | None) -> bool:
+    """
+    連線失敗、逾時、429 與 5xx 才需要重試，其他的錯誤重試也不會成功。
+    """
+    return status_code is None or status_code in (408, 429) or status_code >= 500
+
+
+def _write_outbox(outbox_path: Path, record: dict[str, Any]) -> None:
+    temporary_path: Path = outbox_path.with_suffix(".tmp")
+    with open(temporary_path, "w") as file:
+        file.write(json.dumps(record))
+    os.rename(temporary_path, outbox_path)